@@ -1,5 +1,12 @@
 """Ambrogio - An opinionated dev agent who tackles tech."""
 
-from ambrogio.__main__ import run_ambrogio
-
 __all__ = ["run_ambrogio"]
+
+
+def __getattr__(name):
+    # Imported on first access, so that importing a subpackage stays cheap
+    if name == "run_ambrogio":
+        from ambrogio.__main__ import run_ambrogio
+
+        return run_ambrogio
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
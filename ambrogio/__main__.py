@@ -1,14 +1,47 @@
 import argparse
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from dotenv import load_dotenv
 
-from ambrogio.ambr_coverage.ambr_pipeline import run_pipeline
-from ambrogio.ambr_docstring import AmbrogioDocstring
-from ambrogio.llm_manager import LLMManager
+# Only the dependencies of every mode are imported here: each mode imports
+# its own stack (litellm, libcst, langgraph, coverage) when it runs, so that
+# --help and the other mode do not pay for it
+from ambrogio.ambr_coverage.prompt_builder import DEFAULT_PROMPT_TOKEN_BUDGET
+from ambrogio.ambr_coverage.test_executor import DEFAULT_TEST_TIMEOUT
+from ambrogio.ambr_docstring.defaults import (
+    DEFAULT_BATCH_TOKEN_BUDGET,
+    DEFAULT_WORKERS,
+)
+from ambrogio.llm_cache import CACHE_FILE_NAME
+from ambrogio.rate_limiter import DEFAULT_MAX_RETRIES
 from ambrogio.repo_manager import RepoPathManager
+from ambrogio.telemetry import configure_telemetry, get_telemetry
+
+
+def _get_cache_path(use_cache: bool) -> Optional[Path]:
+    """Get the location of the completion cache for the current repository.
+
+    Args:
+        use_cache: Whether the completion cache is enabled.
+
+    Returns:
+        The cache file path, or None if caching is disabled.
+    """
+    if not use_cache:
+        return None
+    return RepoPathManager.cache_dir() / CACHE_FILE_NAME
+
+
+def _print_cache_stats() -> None:
+    """Print the completion cache counters, if the cache is enabled."""
+    from ambrogio.llm_manager import LLMManager
+
+    cache = LLMManager.get_instance().cache
+    if cache:
+        stats = cache.stats()
+        print(f"\n💾 Completion cache: {stats.hits} hits, {stats.misses} misses")
 
 
 def run_ambrogio(
@@ -17,6 +50,18 @@ def run_ambrogio(
     model: str = "gpt-4o-mini",
     max_api_calls: int = 12,
     api_base: str = None,
+    concurrency: int = 1,
+    batch: bool = False,
+    batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+    changed_only: bool = False,
+    since: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    use_cache: bool = True,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    telemetry_path: Optional[str] = None,
+    exclude: Optional[List[str]] = None,
 ) -> List[str]:
     """Run the Ambrogio process to modify documentation strings in a repository.
 
@@ -33,6 +78,18 @@ def run_ambrogio(
         max_api_calls: The maximum number of API calls to make. Default is 12.
         api_base: The base URL for the OpenAI API. If not provided,
                  the default OpenAI endpoint will be used.
+        concurrency: The maximum number of API calls in flight at once. Default is 1.
+        batch: Whether to document several functions and classes of a file per API call.
+        batch_token_budget: The maximum code tokens packed into one batched API call.
+        changed_only: Whether to only document code changed in the git working tree.
+        since: The git reference changes are looked up from. Implies changed_only.
+        workers: The number of processes parsing and rewriting files. Default is 1.
+        use_cache: Whether to reuse completions cached by previous runs. Default is True.
+        requests_per_minute: Optional request quota of the model, shared by all calls.
+        tokens_per_minute: Optional token quota of the model, shared by all calls.
+        max_retries: Maximum retries of a throttled or failed API call. Default is 5.
+        telemetry_path: Optional JSONL file recording every API call and step.
+        exclude: Optional gitignore patterns of paths to leave out, on top of .gitignore.
 
     Returns:
         A list of modified file paths that were updated during the process.
@@ -46,15 +103,36 @@ def run_ambrogio(
         raise ValueError(
             "API key must be provided either as argument or in OPENAI_API_KEY environment variable"
         )
+    from ambrogio.ambr_docstring import AmbrogioDocstring
+    from ambrogio.llm_manager import LLMManager
 
     # Initialize repo path manager
-    RepoPathManager.initialize(path=repo_path)
+    RepoPathManager.initialize(path=repo_path, exclude=exclude)
     # Initialize LLM manager
-    LLMManager.initialize(api_key=api_key, model=model, api_base=api_base)
+    LLMManager.initialize(
+        api_key=api_key,
+        model=model,
+        api_base=api_base,
+        cache_path=_get_cache_path(use_cache),
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_retries=max_retries,
+    )
+    configure_telemetry(Path(telemetry_path) if telemetry_path else None)
 
     # Initialize and run Ambrogio
-    ambrogio = AmbrogioDocstring(max_api_calls=max_api_calls)
+    ambrogio = AmbrogioDocstring(
+        max_api_calls=max_api_calls,
+        concurrency=concurrency,
+        batch=batch,
+        batch_token_budget=batch_token_budget,
+        changed_only=changed_only,
+        since=since,
+        workers=workers,
+    )
     modified_files = ambrogio.run()
+    _print_cache_stats()
+    get_telemetry().print_summary()
     print("\nAmbrogio: my work is done here, going to take a pizza 🍕")
     return modified_files
 
@@ -65,6 +143,18 @@ def run_coverage(
     model: str = "gpt-4o-mini",
     max_iterations: int = 3,
     api_base: str = None,
+    use_cache: bool = True,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    max_files: int = 1,
+    concurrency: int = 1,
+    test_workers: int = 1,
+    test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+    test_memory_limit: Optional[int] = None,
+    telemetry_path: Optional[str] = None,
+    exclude: Optional[List[str]] = None,
 ) -> (bool, str):
     """Run the coverage analysis on a repository and generate missing tests.
 
@@ -76,6 +166,19 @@ def run_coverage(
         model: Model to use for generating tests. Defaults to "gpt-4".
         max_iterations: Maximum number of test generation attempts per file. Default is 3.
         api_base: Optional base URL for the API endpoint.
+        use_cache: Whether to reuse completions cached by previous runs. Default is True.
+        requests_per_minute: Optional request quota of the model, shared by all calls.
+        tokens_per_minute: Optional token quota of the model, shared by all calls.
+        max_retries: Maximum retries of a throttled or failed API call. Default is 5.
+        prompt_token_budget: Maximum tokens of source context per prompt. Default is 4000.
+        max_files: Number of files, ranked by missing statements, to generate tests
+                   for concurrently. Default is 1, a random file.
+        concurrency: The maximum number of API calls in flight at once. Default is 1.
+        test_workers: The maximum number of test runs in flight at once. Default is 1.
+        test_timeout: Seconds after which a generated test run is killed. Default is 60.
+        test_memory_limit: Optional memory limit of a generated test run, in megabytes.
+        telemetry_path: Optional JSONL file recording every API call and step.
+        exclude: Optional gitignore patterns of paths to leave out, on top of .gitignore.
 
     Returns:
         A dictionary mapping file paths to their coverage percentage.
@@ -89,15 +192,53 @@ def run_coverage(
         raise ValueError(
             "API key must be provided either as argument or in OPENAI_API_KEY environment variable"
         )
+    from ambrogio.ambr_coverage.ambr_pipeline import run_pipeline, run_pipelines
+    from ambrogio.llm_manager import LLMManager
 
-    RepoPathManager.initialize(path=repo_path)
+    RepoPathManager.initialize(path=repo_path, exclude=exclude)
     # Initialize LLM manager
-    LLMManager.initialize(api_key=api_key, model=model, api_base=api_base)
+    LLMManager.initialize(
+        api_key=api_key,
+        model=model,
+        api_base=api_base,
+        cache_path=_get_cache_path(use_cache),
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_retries=max_retries,
+    )
+    configure_telemetry(Path(telemetry_path) if telemetry_path else None)
+
+    if max_files > 1:
+        results = run_pipelines(
+            max_iterations=max_iterations,
+            max_files=max_files,
+            repo_path=Path(repo_path) if repo_path else None,
+            prompt_token_budget=prompt_token_budget,
+            llm_concurrency=concurrency,
+            test_workers=test_workers,
+            test_timeout=test_timeout,
+            test_memory_limit=test_memory_limit,
+        )
+        _print_cache_stats()
+        get_telemetry().print_summary()
+        print("\n📊 Test generation results:")
+        for source_file_path, file_success, filename in results:
+            if file_success:
+                print(f"✨ {source_file_path}: generated test file {filename}")
+            else:
+                print(f"❌ {source_file_path}: failed to generate tests")
+        return any(file_success for _, file_success, _ in results)
 
     success, filename = run_pipeline(
-        max_iterations=max_iterations, repo_path=Path(repo_path) if repo_path else None
+        max_iterations=max_iterations,
+        repo_path=Path(repo_path) if repo_path else None,
+        prompt_token_budget=prompt_token_budget,
+        test_timeout=test_timeout,
+        test_memory_limit=test_memory_limit,
     )
 
+    _print_cache_stats()
+    get_telemetry().print_summary()
     if success:
         print(f"\n✨ Successfully generated test file: {filename}")
     else:
@@ -106,26 +247,136 @@ def run_coverage(
     return success
 
 
+def run_server(
+    repo_path: str = None,
+    api_key: str = None,
+    model: str = "gpt-4o-mini",
+    api_base: str = None,
+    socket_path: Optional[str] = None,
+    max_api_calls: int = 12,
+    batch: bool = False,
+    batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+    max_iterations: int = 3,
+    concurrency: int = 1,
+    use_cache: bool = True,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    test_workers: int = 1,
+    test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+    test_memory_limit: Optional[int] = None,
+    telemetry_path: Optional[str] = None,
+    exclude: Optional[List[str]] = None,
+) -> None:
+    """Serve docstring and coverage requests for single files until shut down.
+
+    Args:
+        repo_path: The path to the repository to serve.
+                  If not provided, defaults to the current directory.
+        api_key: API key for the LLM provider.
+                If not provided, it will attempt to use the OPENAI_API_KEY environment variable.
+        model: Model to use for API calls. Defaults to "gpt-4o-mini".
+        api_base: Optional base URL for the API endpoint.
+        socket_path: Unix socket to listen on. Defaults to .ambrogio/server.sock.
+        max_api_calls: The maximum number of API calls per docstring request. Default is 12.
+        batch: Whether to document several functions and classes of a file per API call.
+        batch_token_budget: The maximum code tokens packed into one batched API call.
+        max_iterations: Maximum number of test generation attempts per file. Default is 3.
+        concurrency: The maximum number of API calls in flight at once. Default is 1.
+        use_cache: Whether to reuse completions cached by previous runs. Default is True.
+        requests_per_minute: Optional request quota of the model, shared by all calls.
+        tokens_per_minute: Optional token quota of the model, shared by all calls.
+        max_retries: Maximum retries of a throttled or failed API call. Default is 5.
+        prompt_token_budget: Maximum tokens of source context per prompt. Default is 4000.
+        test_workers: The maximum number of test runs in flight at once. Default is 1.
+        test_timeout: Seconds after which a generated test run is killed. Default is 60.
+        test_memory_limit: Optional memory limit of a generated test run, in megabytes.
+        telemetry_path: Optional JSONL file recording every API call and step.
+        exclude: Optional gitignore patterns of paths to leave out, on top of .gitignore.
+
+    Raises:
+        ValueError: If no API key is provided or found in environment.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "API key must be provided either as argument or in OPENAI_API_KEY environment variable"
+        )
+    from ambrogio.llm_manager import LLMManager
+    from ambrogio.server import AmbrogioServer
+
+    RepoPathManager.initialize(path=repo_path, exclude=exclude)
+    LLMManager.initialize(
+        api_key=api_key,
+        model=model,
+        api_base=api_base,
+        cache_path=_get_cache_path(use_cache),
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_retries=max_retries,
+    )
+    configure_telemetry(Path(telemetry_path) if telemetry_path else None)
+
+    server = AmbrogioServer(
+        socket_path=Path(socket_path) if socket_path else None,
+        max_api_calls=max_api_calls,
+        batch=batch,
+        batch_token_budget=batch_token_budget,
+        max_iterations=max_iterations,
+        prompt_token_budget=prompt_token_budget,
+        llm_concurrency=concurrency,
+        test_workers=test_workers,
+        test_timeout=test_timeout,
+        test_memory_limit=test_memory_limit,
+    )
+    server.warm_up()
+    server.serve_forever()
+    _print_cache_stats()
+    get_telemetry().print_summary()
+
+
 def main():
     """Main entry point for Ambrogio.
 
     This function sets up the command-line interface for the Ambrogio tool.
-    It provides two main functionalities:
+    It provides three main functionalities:
     1. Docstring generation: Add or update docstrings in Python files
     2. Test coverage: Analyze test coverage and generate missing tests
+    3. Server: Keep both warm and serve requests for single files over a Unix socket
 
     Args:
         --repo-path: Path to the repository to process. Defaults to current directory.
         --api-key: OpenAI API key. If not provided, will use OPENAI_API_KEY environment variable.
         --model: Model to use for API calls. Default: gpt-4o-mini
         --api-base: Base URL for OpenAI API. If not provided, uses default endpoint.
-        --mode: Mode to run in ('docstring' or 'coverage'). Default: docstring
+        --mode: Mode to run in ('docstring', 'coverage' or 'server'). Default: docstring
+        --no-cache: Always call the LLM provider instead of reusing cached completions.
+        --requests-per-minute: Request quota of the model. Default: unlimited
+        --tokens-per-minute: Token quota of the model. Default: unlimited
+        --max-retries: Maximum retries of a throttled or failed API call. Default: 5
+        --concurrency: Maximum number of API calls in flight at once. Default: 1
+        --telemetry: JSONL file recording every API call and step, summarized at exit.
+        --exclude: Gitignore pattern of paths to leave out, on top of .gitignore. Repeatable.
 
         Docstring mode arguments:
             --max-api-calls: Maximum number of API calls to make. Default: 12
+            --batch: Document several functions and classes of a file per API call.
+            --batch-token-budget: Maximum code tokens packed into one batched API call.
+            --changed-only: Only document code changed in the git working tree.
+            --since: Only document code changed since this git reference.
+            --workers: Number of processes parsing and rewriting files. Default: 1
 
         Coverage mode arguments:
             --max-iterations: Maximum number of test generation attempts per file. Default: 3
+            --prompt-token-budget: Maximum tokens of source context per prompt. Default: 4000
+            --max-files: Number of files, ranked by missing statements, to process concurrently. Default: 1
+            --test-workers: Maximum number of test runs in flight at once. Default: 1
+            --test-timeout: Seconds after which a generated test run is killed. Default: 60
+            --test-memory-limit: Memory limit of a generated test run, in megabytes. Default: unlimited
+
+        Server mode arguments, on top of the docstring and coverage ones:
+            --socket: Unix socket to listen on. Default: .ambrogio/server.sock
 
     Raises:
         ValueError: If no API key is provided or found in environment.
@@ -155,10 +406,48 @@ def main():
     )
     parser.add_argument(
         "--mode",
-        choices=["docstring", "coverage"],
+        choices=["docstring", "coverage", "server"],
         default="docstring",
         help="Mode to run in. Default: docstring",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM provider instead of reusing cached completions.",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        help="Request quota of the model. Default: unlimited",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        help="Token quota of the model. Default: unlimited",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Maximum retries of a throttled or failed API call. Default: {DEFAULT_MAX_RETRIES}",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of API calls in flight at once. Default: 1",
+    )
+    parser.add_argument(
+        "--telemetry",
+        metavar="PATH",
+        help="JSONL file recording every API call and step, summarized at exit.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Gitignore pattern of paths to leave out, on top of .gitignore. Repeatable.",
+    )
 
     # Mode-specific arguments
     docstring_group = parser.add_argument_group("Docstring mode arguments")
@@ -168,6 +457,33 @@ def main():
         default=12,
         help="Maximum number of API calls to make. Default: 12",
     )
+    docstring_group.add_argument(
+        "--batch",
+        action="store_true",
+        help="Document several functions and classes of a file per API call.",
+    )
+    docstring_group.add_argument(
+        "--batch-token-budget",
+        type=int,
+        default=DEFAULT_BATCH_TOKEN_BUDGET,
+        help="Maximum code tokens packed into one batched API call. "
+        f"Default: {DEFAULT_BATCH_TOKEN_BUDGET}",
+    )
+    docstring_group.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only document code changed in the git working tree.",
+    )
+    docstring_group.add_argument(
+        "--since",
+        help="Only document code changed since this git reference.",
+    )
+    docstring_group.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of processes parsing and rewriting files. Default: 1",
+    )
 
     coverage_group = parser.add_argument_group("Coverage mode arguments")
     coverage_group.add_argument(
@@ -176,6 +492,46 @@ def main():
         default=3,
         help="Maximum number of test generation attempts per file. Default: 3",
     )
+    coverage_group.add_argument(
+        "--prompt-token-budget",
+        type=int,
+        default=DEFAULT_PROMPT_TOKEN_BUDGET,
+        help="Maximum tokens of source context per prompt. "
+        f"Default: {DEFAULT_PROMPT_TOKEN_BUDGET}",
+    )
+    coverage_group.add_argument(
+        "--max-files",
+        type=int,
+        default=1,
+        help="Number of files, ranked by missing statements, to generate tests for "
+        "concurrently. Default: 1, a random file",
+    )
+    coverage_group.add_argument(
+        "--test-workers",
+        type=int,
+        default=1,
+        help="Maximum number of test runs in flight at once. Default: 1",
+    )
+    coverage_group.add_argument(
+        "--test-timeout",
+        type=float,
+        default=DEFAULT_TEST_TIMEOUT,
+        help="Seconds after which a generated test run is killed. "
+        f"Default: {DEFAULT_TEST_TIMEOUT:g}",
+    )
+    coverage_group.add_argument(
+        "--test-memory-limit",
+        type=int,
+        help="Memory limit of a generated test run, in megabytes. Default: unlimited",
+    )
+
+    server_group = parser.add_argument_group(
+        "Server mode arguments, on top of the docstring and coverage ones"
+    )
+    server_group.add_argument(
+        "--socket",
+        help="Unix socket to listen on. Default: .ambrogio/server.sock",
+    )
 
     args = parser.parse_args()
 
@@ -193,14 +549,62 @@ def main():
             model=args.model,
             max_api_calls=args.max_api_calls,
             api_base=args.api_base,
+            concurrency=args.concurrency,
+            batch=args.batch,
+            batch_token_budget=args.batch_token_budget,
+            changed_only=args.changed_only,
+            since=args.since,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            requests_per_minute=args.requests_per_minute,
+            tokens_per_minute=args.tokens_per_minute,
+            max_retries=args.max_retries,
+            telemetry_path=args.telemetry,
+            exclude=args.exclude,
         )
-    else:
+    elif args.mode == "coverage":
         run_coverage(
             repo_path=args.repo_path,
             api_key=args.api_key,
             model=args.model,
             max_iterations=args.max_iterations,
             api_base=args.api_base,
+            use_cache=not args.no_cache,
+            requests_per_minute=args.requests_per_minute,
+            tokens_per_minute=args.tokens_per_minute,
+            max_retries=args.max_retries,
+            prompt_token_budget=args.prompt_token_budget,
+            max_files=args.max_files,
+            concurrency=args.concurrency,
+            test_workers=args.test_workers,
+            test_timeout=args.test_timeout,
+            test_memory_limit=args.test_memory_limit,
+            telemetry_path=args.telemetry,
+            exclude=args.exclude,
+        )
+
+    else:
+        run_server(
+            repo_path=args.repo_path,
+            api_key=args.api_key,
+            model=args.model,
+            api_base=args.api_base,
+            socket_path=args.socket,
+            max_api_calls=args.max_api_calls,
+            batch=args.batch,
+            batch_token_budget=args.batch_token_budget,
+            max_iterations=args.max_iterations,
+            concurrency=args.concurrency,
+            use_cache=not args.no_cache,
+            requests_per_minute=args.requests_per_minute,
+            tokens_per_minute=args.tokens_per_minute,
+            max_retries=args.max_retries,
+            prompt_token_budget=args.prompt_token_budget,
+            test_workers=args.test_workers,
+            test_timeout=args.test_timeout,
+            test_memory_limit=args.test_memory_limit,
+            telemetry_path=args.telemetry,
+            exclude=args.exclude,
         )
 
 
@@ -1,4 +1,26 @@
-from .ambr_coverage import CoverageAnalyzer
-from .ambr_test_generator import AmbrogioTestGenerator
+from importlib import import_module
 
-__all__ = ["CoverageAnalyzer", "AmbrogioTestGenerator"]
+from .prompt_builder import DEFAULT_PROMPT_TOKEN_BUDGET, PromptBuilder
+from .test_executor import DEFAULT_TEST_TIMEOUT, TestExecutor, TestRunResult
+
+# Names imported on first access, as their modules load coverage and litellm
+_LAZY_IMPORTS = {
+    "CoverageAnalyzer": ".ambr_coverage",
+    "AmbrogioTestGenerator": ".ambr_test_generator",
+}
+
+__all__ = [
+    "CoverageAnalyzer",
+    "AmbrogioTestGenerator",
+    "PromptBuilder",
+    "TestExecutor",
+    "TestRunResult",
+    "DEFAULT_PROMPT_TOKEN_BUDGET",
+    "DEFAULT_TEST_TIMEOUT",
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,27 +1,73 @@
+import json
 import os
+import threading
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
-import pytest
-from coverage import Coverage
+from coverage import Coverage, CoverageData
 
 from ambrogio.repo_manager import RepoPathManager
 from .pytest_reportert import silence_stdout
+from .test_executor import TestExecutor
+
+
+# File, in the Ambrogio cache directory, describing the files .coverage was measured on
+FINGERPRINT_FILE_NAME = "coverage_fingerprint.json"
+
+# File, in the Ambrogio cache directory, mapping source files to the tests executing them
+TEST_IMPACT_FILE_NAME = "test_impact.json"
+
+# Files besides Python modules whose changes can change the measured coverage
+COVERAGE_CONFIG_FILES = {
+    ".coveragerc",
+    "pyproject.toml",
+    "pytest.ini",
+    "setup.cfg",
+    "tox.ini",
+}
+
+# Size and modification time of a file, None if it does not exist
+FileStamp = Optional[Tuple[int, int]]
+
+# Statements and missing lines of a source file
+Analysis = Tuple[List[int], List[int]]
 
 
 class CoverageAnalyzer:
-    """Analyzes and provides insights about code coverage in Python projects."""
+    """Analyzes and provides insights about code coverage in Python projects.
 
-    def __init__(self):
+    Running the whole suite is the expensive part, so its result is reused
+    while no source, test or configuration file has changed, and the coverage
+    of each passing generated test is merged into it instead of re-measuring.
+    Every measured run records which tests execute which files, so that when
+    only source files change, only the tests executing them are re-run.
+    Per-file analyses are memoized as well, until the file or the data changes.
+    """
+
+    def __init__(self, test_executor: Optional[TestExecutor] = None):
         """Initialize the coverage analyzer.
 
         Args:
-            repo_path: Path to the repository root. If not provided, uses current directory.
+            test_executor: Executor running the test suite, shared with the
+                           rest of the pipeline if given
         """
         self.repo_manager = RepoPathManager.get_instance()
         self.repo_path = self.repo_manager.path()
-        self.coverage = Coverage(
-            data_file=str(self.repo_path / ".coverage"),
+        self.test_executor = test_executor or TestExecutor(self.repo_path)
+        self.data_file = self.repo_path / ".coverage"
+        self.coverage = self._create_coverage()
+        self.missing_statements: Dict[str, int] = {}
+        self.reused_baseline = False
+        self.refreshed_files: List[str] = []
+        self._loaded_data_stamp: FileStamp = None
+        self._analyses: Dict[str, Tuple[Tuple[FileStamp, FileStamp], Analysis]] = {}
+        # Coverage data is loaded lazily and is not safe to share across threads
+        self._lock = threading.Lock()
+
+    def _create_coverage(self) -> Coverage:
+        """Create the coverage instance reading the project's data file."""
+        return Coverage(
+            data_file=str(self.data_file),
             config_file=True,
             source=[str(self.repo_path)],
         )
@@ -30,20 +76,38 @@ class CoverageAnalyzer:
     def analyze_coverage(self) -> Dict[str, float]:
         """Run coverage analysis on the project.
 
+        The suite is only run if the files it depends on changed since the
+        coverage data was last measured, otherwise that data is reused. When
+        only source files changed, only the tests known to execute them run.
+
         Returns:
             Dict mapping file paths to their coverage percentage
         """
-        self.coverage.start()
-        self._run_tests()
-        self.coverage.stop()
-        self.coverage.save()
+        # Every run starts from the files on disk, which may have been edited
+        self.repo_manager.get_discovery().refresh()
+        file_stamps = self._get_file_stamps()
+        saved_stamps = self._load_file_stamps()
+        self.reused_baseline = file_stamps == saved_stamps
+        self.refreshed_files = []
+        if not self.reused_baseline:
+            changed_files = self._get_changed_sources(saved_stamps, file_stamps)
+            if changed_files and self.refresh_coverage(changed_files):
+                self.refreshed_files = changed_files
+            else:
+                self._run_tests()
+            self._save_file_stamps(file_stamps)
 
         # Get coverage data
-        self.coverage.load()
+        with self._lock:
+            self._load_data()
+            measured_files = list(self.coverage.get_data().measured_files())
+            analyses = {
+                filename: self._analyze(filename) for filename in measured_files
+            }
         file_coverage = {}
+        self.missing_statements = {}
 
-        for filename in self.coverage.get_data().measured_files():
-            _, statements, _, missing, _ = self.coverage.analysis2(filename)
+        for filename, (statements, missing) in analyses.items():
             if not statements:
                 continue
 
@@ -51,9 +115,241 @@ class CoverageAnalyzer:
             coverage_percent = (executed / len(statements)) * 100
             rel_path = os.path.abspath(filename)
             file_coverage[rel_path] = coverage_percent
+            self.missing_statements[rel_path] = len(missing)
 
         return file_coverage
 
+    def merge_coverage(self, data_file: Path) -> None:
+        """Add the coverage measured by a single test run to the baseline.
+
+        Args:
+            data_file: Coverage data file written by the run
+        """
+        with self._lock:
+            baseline = CoverageData(basename=str(self.data_file))
+            baseline.read()
+            measured = CoverageData(basename=str(data_file))
+            measured.read()
+            baseline.update(measured)
+            baseline.write()
+            self._update_test_impact(measured)
+            # The new test file is part of the measured state from now on
+            self._save_file_stamps(self._get_file_stamps())
+
+    def refresh_coverage(self, file_paths: List[str]) -> bool:
+        """Re-measure some source files by only running the tests executing them.
+
+        Their data in the baseline is replaced by the new measurement, while
+        every other file keeps its data.
+
+        Args:
+            file_paths: Paths of the source files, relative to the repository
+
+        Returns:
+            False if the files cannot be refreshed this way, e.g. because no
+            test is known to execute one of them, in which case the whole
+            suite has to be run
+        """
+        test_impact = self._load_test_impact()
+        if test_impact is None or not self.data_file.exists():
+            return False
+        node_ids = set()
+        for file_path in file_paths:
+            if not test_impact.get(file_path):
+                return False
+            node_ids.update(test_impact[file_path])
+
+        data_file = RepoPathManager.cache_dir() / "refresh.coverage"
+        try:
+            result = self.test_executor.run(
+                sorted(node_ids),
+                coverage_data_file=data_file,
+                limited=False,
+                record_contexts=True,
+            )
+            # Exit codes above 1 mean the tests could not even run, e.g. a
+            # test was renamed since the impact map was recorded
+            if result.exit_code not in (0, 1) or not data_file.exists():
+                return False
+            with self._lock:
+                measured = CoverageData(basename=str(data_file))
+                measured.read()
+                refreshed = {str(self.repo_path / path) for path in file_paths}
+                self._replace_file_data(measured, refreshed)
+                self._update_test_impact(measured)
+        finally:
+            data_file.unlink(missing_ok=True)
+        return True
+
+    def _replace_file_data(self, measured: CoverageData, filenames: Set[str]) -> None:
+        """Rewrite the baseline with the data of some files taken from a new run.
+
+        Must be called with the lock held.
+        """
+        baseline = CoverageData(basename=str(self.data_file))
+        baseline.read()
+        combined = CoverageData(basename=f"{self.data_file}.refresh")
+        combined.erase()
+        for filename in set(baseline.measured_files()) | filenames:
+            source = measured if filename in filenames else baseline
+            if baseline.has_arcs():
+                combined.add_arcs({filename: source.arcs(filename) or []})
+            else:
+                combined.add_lines({filename: source.lines(filename) or []})
+        combined.write()
+        os.replace(f"{self.data_file}.refresh", self.data_file)
+        # A loaded instance keeps reading the replaced file through its open
+        # database connection
+        self.coverage = self._create_coverage()
+        self._loaded_data_stamp = None
+
+    @staticmethod
+    def _read_test_impact(measured: CoverageData) -> Dict[str, Set[str]]:
+        """Map every measured file to the pytest node ids that executed it."""
+        test_impact: Dict[str, Set[str]] = {}
+        for filename in measured.measured_files():
+            node_ids = test_impact.setdefault(filename, set())
+            for contexts in measured.contexts_by_lineno(filename).values():
+                node_ids.update(context for context in contexts if context)
+        return test_impact
+
+    def _update_test_impact(self, measured: CoverageData) -> None:
+        """Record which files the tests of a run executed, and which they no longer do."""
+        test_impact = self._load_test_impact() or {}
+        measured_impact = self._read_test_impact(measured)
+        ran = set().union(*measured_impact.values()) if measured_impact else set()
+        for node_ids in test_impact.values():
+            node_ids.difference_update(ran)
+        for filename, node_ids in measured_impact.items():
+            relative = os.path.relpath(filename, self.repo_path)
+            test_impact.setdefault(relative, set()).update(node_ids)
+        self._save_test_impact(test_impact)
+
+    def _load_test_impact(self) -> Optional[Dict[str, Set[str]]]:
+        """Load the map of source files to the tests executing them, if recorded."""
+        try:
+            with open(RepoPathManager.cache_dir() / TEST_IMPACT_FILE_NAME) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {path: set(node_ids) for path, node_ids in saved.items()}
+
+    def _save_test_impact(self, test_impact: Dict[str, Set[str]]) -> None:
+        """Persist the map of source files to the tests executing them."""
+        with open(RepoPathManager.cache_dir() / TEST_IMPACT_FILE_NAME, "w") as f:
+            json.dump(
+                {path: sorted(node_ids) for path, node_ids in test_impact.items()},
+                f,
+            )
+
+    def _get_file_stamps(self) -> Dict[str, List[int]]:
+        """Get the size and modification time of every file coverage depends on.
+
+        Python files come from the repository's shared discovery, configuration
+        files are looked up at the repository root.
+
+        Returns:
+            Mapping of repository-relative paths to their size and mtime
+        """
+        file_stamps = {
+            path: list(stamp)
+            for path, stamp in self.repo_manager.get_discovery().get_files().items()
+        }
+        for name in sorted(COVERAGE_CONFIG_FILES):
+            try:
+                stat = os.stat(self.repo_path / name)
+            except OSError:
+                continue
+            file_stamps[name] = [stat.st_size, stat.st_mtime_ns]
+        return file_stamps
+
+    def _get_changed_sources(
+        self,
+        saved_stamps: Optional[Dict[str, List[int]]],
+        file_stamps: Dict[str, List[int]],
+    ) -> Optional[List[str]]:
+        """List the changed files, if they are all existing, non-test source files.
+
+        Returns:
+            Repository-relative paths of the changed files, or None if a test
+            or configuration file changed or a file was added or removed, in
+            which case the whole suite has to be run
+        """
+        if saved_stamps is None or saved_stamps.keys() != file_stamps.keys():
+            return None
+        changed = sorted(
+            path for path in file_stamps if file_stamps[path] != saved_stamps[path]
+        )
+        if any(
+            not path.endswith(".py") or self._is_test_file(Path(path))
+            for path in changed
+        ):
+            return None
+        return changed
+
+    def _get_data_file_stamp(self) -> FileStamp:
+        """Get the size and modification time of the coverage data file, if any."""
+        try:
+            stat = self.data_file.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_file_stamps(self) -> Optional[Dict[str, List[int]]]:
+        """Get the file stamps the coverage data was measured with, if still valid.
+
+        The data file itself is stamped too, so that data rewritten by
+        anything else than Ambrogio is not trusted.
+        """
+        try:
+            with open(RepoPathManager.cache_dir() / FINGERPRINT_FILE_NAME) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stamp = self._get_data_file_stamp()
+        if stamp is None or tuple(saved.get("data_file") or ()) != stamp:
+            return None
+        return saved.get("files")
+
+    def _save_file_stamps(self, file_stamps: Dict[str, List[int]]) -> None:
+        """Record the file stamps the current coverage data was measured with."""
+        with open(RepoPathManager.cache_dir() / FINGERPRINT_FILE_NAME, "w") as f:
+            json.dump(
+                {"files": file_stamps, "data_file": self._get_data_file_stamp()},
+                f,
+            )
+
+    def rank_files(self, max_files: Optional[int] = None) -> List[Path]:
+        """Rank the measured source files by their number of missing statements.
+
+        Test files and fully covered files are left out. Must be called after
+        analyze_coverage.
+
+        Args:
+            max_files: Maximum number of files to return, or None for all
+
+        Returns:
+            File paths, the one with the most missing statements first
+        """
+        ranked = sorted(
+            (
+                path
+                for path, missing in self.missing_statements.items()
+                if missing and not self._is_test_file(Path(path))
+            ),
+            key=lambda path: (-self.missing_statements[path], path),
+        )
+        return [Path(path) for path in ranked[:max_files]]
+
+    @staticmethod
+    def _is_test_file(file_path: Path) -> bool:
+        """Check whether a file follows pytest's test file naming conventions."""
+        return (
+            file_path.name.startswith("test_")
+            or file_path.name.endswith("_test.py")
+            or file_path.name == "conftest.py"
+        )
+
     def get_uncovered_lines(self, file_path: Path) -> List[int]:
         """Get line numbers that are not covered by tests.
 
@@ -63,13 +359,58 @@ class CoverageAnalyzer:
         Returns:
             List of line numbers that lack test coverage
         """
-        self.coverage.load()
-
-        _, _, _, missing, _ = self.coverage.analysis2(str(file_path))
+        with self._lock:
+            _, missing = self._analyze(str(file_path))
         return missing
 
+    def _load_data(self) -> FileStamp:
+        """Load the coverage data, unless it is unchanged since the last load.
+
+        Must be called with the lock held.
+
+        Returns:
+            The stamp of the loaded data file, which versions the analyses
+        """
+        stamp = self._get_data_file_stamp()
+        if stamp is None or stamp != self._loaded_data_stamp:
+            self.coverage.load()
+            self._loaded_data_stamp = stamp
+        return stamp
+
+    def _analyze(self, filename: str) -> Analysis:
+        """Get the statements and missing lines of a file, parsing it only once.
+
+        Analyses are reused while both the file and the coverage data are
+        unchanged. Must be called with the lock held.
+        """
+        data_stamp = self._load_data()
+        try:
+            stat = os.stat(filename)
+            file_stamp = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            file_stamp = None
+        key = (file_stamp, data_stamp)
+        cached = self._analyses.get(filename)
+        if cached and cached[0] == key and None not in key:
+            return cached[1]
+        _, statements, _, missing, _ = self.coverage.analysis2(filename)
+        self._analyses[filename] = (key, (statements, missing))
+        return statements, missing
+
     def _run_tests(self) -> None:
-        """Run all tests in the project using pytest's test discovery."""
+        """Run all tests in the project under coverage, in a worker subprocess."""
         # Use pytest's test discovery by pointing it to the project root
         # It will automatically find and run tests following standard conventions
-        pytest.main([str(self.repo_path)])
+        self.test_executor.run(
+            [str(self.repo_path)],
+            coverage_data_file=self.data_file,
+            limited=False,
+            record_contexts=True,
+        )
+        if self.data_file.exists():
+            measured = CoverageData(basename=str(self.data_file))
+            measured.read()
+            with self._lock:
+                # Start from a fresh map: tests may have been removed
+                self._save_test_impact({})
+                self._update_test_impact(measured)
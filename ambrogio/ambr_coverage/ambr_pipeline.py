@@ -1,16 +1,20 @@
 """Langraph-based test generation pipeline for Ambrogio."""
 
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Any, TypedDict, Annotated
+from typing import Callable, Dict, List, Optional, Any, Tuple, TypedDict, Annotated
 
-import pytest
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
 
+from ambrogio.repo_manager import RepoPathManager
+from ambrogio.telemetry import attribute_to_file, get_telemetry
 from .ambr_coverage import CoverageAnalyzer
 from .ambr_test_generator import AmbrogioTestGenerator
-from .pytest_reportert import PytestReporter, silence_stdout
+from .prompt_builder import DEFAULT_PROMPT_TOKEN_BUDGET
+from .test_executor import DEFAULT_TEST_TIMEOUT, TestExecutor
 
 
 class TestState(TypedDict):
@@ -25,28 +29,90 @@ class TestState(TypedDict):
     iteration: Annotated[int, "last"]
 
 
+def _print_baseline_status(coverage_analyzer: CoverageAnalyzer) -> None:
+    """Tell how much of the test suite the coverage analysis had to run."""
+    if coverage_analyzer.reused_baseline:
+        print("\nNo file changed since the last run, reusing its coverage data")
+    elif coverage_analyzer.refreshed_files:
+        print(
+            "\nOnly re-ran the tests executing the changed files: "
+            + ", ".join(coverage_analyzer.refreshed_files)
+        )
+
+
+def _timed_node(
+    name: str, node: Callable[[TestState], Dict[str, Any]]
+) -> Callable[[TestState], Dict[str, Any]]:
+    """Wrap a pipeline node so that its runs are timed in the telemetry.
+
+    The records of the node, its LLM calls included, are attributed to the
+    source file of the state.
+    """
+
+    def run(state: TestState) -> Dict[str, Any]:
+        with attribute_to_file(state.get("source_file_path")):
+            with get_telemetry().step(name):
+                return node(state)
+
+    return run
+
+
 def create_test_pipeline(
-    max_iterations: int, repo_path: Optional[Path] = None
+    max_iterations: int,
+    repo_path: Optional[Path] = None,
+    prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    coverage_analyzer: Optional[CoverageAnalyzer] = None,
+    test_generator: Optional[AmbrogioTestGenerator] = None,
+    llm_concurrency: int = 1,
+    test_workers: int = 1,
+    test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+    test_memory_limit: Optional[int] = None,
 ) -> CompiledStateGraph:
     """Create a langraph pipeline for test generation.
 
+    The pipeline starts with a coverage analysis that picks a file, unless the
+    initial state already names a source file. The same compiled pipeline can
+    then be run from several threads, one per source file.
+
     Args:
         max_iterations: Maximum number of iterations for test refinement
         repo_path: Optional path to the repository root
+        prompt_token_budget: Maximum tokens of source context per prompt
+        coverage_analyzer: Analyzer whose coverage data is reused, if already run
+        test_generator: Generator shared with the caller, if any
+        llm_concurrency: Maximum number of test generations in flight at once
+        test_workers: Maximum number of test executions in flight at once,
+                      unless the coverage analyzer brings its own executor
+        test_timeout: Wall-clock limit of a generated test run in seconds
+        test_memory_limit: Memory limit of a generated test run in megabytes
 
     Returns:
         A langgraph StateGraph instance representing the pipeline
     """
     # Initialize components
-    coverage_analyzer = CoverageAnalyzer()
+    coverage_analyzer = coverage_analyzer or CoverageAnalyzer(
+        TestExecutor(
+            RepoPathManager.get_instance().path(),
+            test_workers,
+            timeout=test_timeout,
+            memory_limit=test_memory_limit,
+        )
+    )
+    test_executor = coverage_analyzer.test_executor
 
     # Initialize test generator for test management
-    test_generator = AmbrogioTestGenerator()
+    test_generator = test_generator or AmbrogioTestGenerator(
+        prompt_token_budget=prompt_token_budget
+    )
+
+    # Cap shared by every file processed concurrently, the executor caps test runs
+    llm_semaphore = threading.BoundedSemaphore(llm_concurrency)
 
     def analyze_coverage(state: TestState) -> Dict[str, Any]:
         """Run coverage analysis and find files needing tests."""
         # Run coverage analysis
         coverage_data = coverage_analyzer.analyze_coverage()
+        _print_baseline_status(coverage_analyzer)
 
         print("\nInitial Coverage Analysis Results:")
         for source_file_path, coverage in coverage_data.items():
@@ -84,15 +150,16 @@ def create_test_pipeline(
         uncovered_lines = coverage_analyzer.get_uncovered_lines(source_file_path)
 
         try:
-            (
-                test_source_file_path,
-                test_content,
-            ) = test_generator.generate_and_save_tests(
-                source_file_path=source_file_path,
-                test_file_path=test_file_path,
-                test_execution_error=test_execution_error,
-                uncovered_lines=uncovered_lines,
-            )
+            with llm_semaphore:
+                (
+                    test_source_file_path,
+                    test_content,
+                ) = test_generator.generate_and_save_tests(
+                    source_file_path=source_file_path,
+                    test_file_path=test_file_path,
+                    test_execution_error=test_execution_error,
+                    uncovered_lines=uncovered_lines,
+                )
 
             if not test_source_file_path or not test_content:
                 return {
@@ -111,17 +178,40 @@ def create_test_pipeline(
                 "iteration": state["iteration"],
             }
 
-    @silence_stdout
     def execute_test(state: TestState) -> Dict[str, Any]:
-        """Execute the generated test and return results."""
+        """Execute the generated test in a worker subprocess and return results.
+
+        The run is measured, and if the test passes its coverage is merged
+        into the baseline, so the next generations see the lines it covers.
+        """
         try:
-            reporter = PytestReporter()
-            result = pytest.main([str(state["test_file_path"])], plugins=[reporter])
+            test_file_path = Path(state["test_file_path"])
+            data_file = RepoPathManager.cache_dir() / f"{test_file_path.stem}.coverage"
+            try:
+                result = test_executor.run(
+                    [str(test_file_path)],
+                    coverage_data_file=data_file,
+                    record_contexts=True,
+                )
+                if result.passed and data_file.exists():
+                    source_file_path = state.get("source_file_path")
+                    telemetry = get_telemetry()
+                    if telemetry.enabled and source_file_path:
+                        before = coverage_analyzer.get_uncovered_lines(source_file_path)
+                        coverage_analyzer.merge_coverage(data_file)
+                        after = coverage_analyzer.get_uncovered_lines(source_file_path)
+                        telemetry.record(
+                            "coverage", covered_lines=len(before) - len(after)
+                        )
+                    else:
+                        coverage_analyzer.merge_coverage(data_file)
+            finally:
+                data_file.unlink(missing_ok=True)
 
             return {
-                "success": result == 0,
-                "test_execution_error": "\n".join(reporter.errors)
-                if result != 0
+                "success": result.passed,
+                "test_execution_error": "\n".join(result.errors)
+                if not result.passed
                 else None,
                 "iteration": state["iteration"],
                 "test_file_path": state["test_file_path"],
@@ -145,10 +235,11 @@ def create_test_pipeline(
 
         Returns:
             None: This function does not return a value."""
-        if "test_file_path" in state:
+        if state.get("test_file_path"):
             test_file = Path(state["test_file_path"])
             if test_file.exists():
                 test_file.unlink()
+                RepoPathManager.get_discovery().update([test_file])
 
         return {"success": False}
 
@@ -156,10 +247,12 @@ def create_test_pipeline(
     workflow = StateGraph(TestState)
 
     # Add nodes
-    workflow.add_node("analyze_coverage", analyze_coverage)
-    workflow.add_node("generate_test", generate_test)
-    workflow.add_node("execute_test", execute_test)
-    workflow.add_node("error_clean_up", error_clean_up)
+    workflow.add_node(
+        "analyze_coverage", _timed_node("analyze_coverage", analyze_coverage)
+    )
+    workflow.add_node("generate_test", _timed_node("generate_test", generate_test))
+    workflow.add_node("execute_test", _timed_node("execute_test", execute_test))
+    workflow.add_node("error_clean_up", _timed_node("error_clean_up", error_clean_up))
 
     # Define routing function
     def route_next(state: TestState) -> str:
@@ -185,8 +278,16 @@ def create_test_pipeline(
         else:
             return "retry"
 
+    def route_start(state: TestState) -> str:
+        """Skip the coverage analysis when the source file is already chosen."""
+        return "generate_test" if state.get("source_file_path") else "analyze_coverage"
+
     # Build the workflow
-    workflow.add_edge(START, "analyze_coverage")
+    workflow.add_conditional_edges(
+        START,
+        route_start,
+        {"analyze_coverage": "analyze_coverage", "generate_test": "generate_test"},
+    )
     workflow.add_edge("analyze_coverage", "generate_test")
     workflow.add_edge("generate_test", "execute_test")
     workflow.add_conditional_edges(
@@ -198,14 +299,29 @@ def create_test_pipeline(
     return workflow.compile()
 
 
-def run_pipeline(max_iterations, repo_path: Optional[Path] = None) -> (bool, str):
+def run_pipeline(
+    max_iterations,
+    repo_path: Optional[Path] = None,
+    prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+    test_memory_limit: Optional[int] = None,
+) -> (bool, str):
     """Run the test generation pipeline.
 
     Args:
         max_iterations: Maximum number of iterations for test refinement
         repo_path: Optional path to the repository root
+        prompt_token_budget: Maximum tokens of source context per prompt
+        test_timeout: Wall-clock limit of a generated test run in seconds
+        test_memory_limit: Memory limit of a generated test run in megabytes
     """
-    graph: CompiledStateGraph = create_test_pipeline(max_iterations, repo_path)
+    graph: CompiledStateGraph = create_test_pipeline(
+        max_iterations,
+        repo_path,
+        prompt_token_budget,
+        test_timeout=test_timeout,
+        test_memory_limit=test_memory_limit,
+    )
 
     # Initialize state
     state = TestState(
@@ -227,3 +343,102 @@ def run_pipeline(max_iterations, repo_path: Optional[Path] = None) -> (bool, str
     # Get the first dictionary from the state
     first_state = next(iter(final_state.values()))
     return first_state.get("success", False), first_state.get("test_file_path", None)
+
+
+def run_file_pipeline(
+    graph: CompiledStateGraph,
+    test_generator: AmbrogioTestGenerator,
+    source_file_path: Path,
+) -> Tuple[Path, bool, Optional[Path]]:
+    """Run the refinement loop of one source file with its own test file.
+
+    Args:
+        graph: Pipeline created with the same test generator
+        test_generator: Generator reserving the test file path
+        source_file_path: Absolute path of the source file
+
+    Returns:
+        The source file path, whether a passing test was generated and the
+        path of that test file
+    """
+    state = TestState(
+        iteration=0,
+        success=False,
+        cleaning=False,
+        error=None,
+        source_file_path=source_file_path,
+        test_file_path=test_generator.reserve_test_file_path(source_file_path),
+        test_execution_error=None,
+    )
+    final_state = graph.invoke(state)
+    success = final_state.get("success", False)
+    return source_file_path, success, final_state.get("test_file_path")
+
+
+def run_pipelines(
+    max_iterations: int,
+    max_files: int,
+    repo_path: Optional[Path] = None,
+    prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    llm_concurrency: int = 1,
+    test_workers: int = 1,
+    test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+    test_memory_limit: Optional[int] = None,
+) -> List[Tuple[Path, bool, Optional[Path]]]:
+    """Run the test generation pipeline on several files concurrently.
+
+    Coverage is measured once, then the files with the most missing
+    statements are each given their own test file and refinement loop.
+
+    Args:
+        max_iterations: Maximum number of iterations for test refinement
+        max_files: Maximum number of source files to generate tests for
+        repo_path: Optional path to the repository root
+        prompt_token_budget: Maximum tokens of source context per prompt
+        llm_concurrency: Maximum number of test generations in flight at once
+        test_workers: Maximum number of test executions in flight at once
+        test_timeout: Wall-clock limit of a generated test run in seconds
+        test_memory_limit: Memory limit of a generated test run in megabytes
+
+    Returns:
+        For each processed file, its path, whether a passing test was
+        generated and the path of that test file
+    """
+    coverage_analyzer = CoverageAnalyzer(
+        TestExecutor(
+            RepoPathManager.get_instance().path(),
+            test_workers,
+            timeout=test_timeout,
+            memory_limit=test_memory_limit,
+        )
+    )
+    coverage_analyzer.analyze_coverage()
+    _print_baseline_status(coverage_analyzer)
+    source_files = coverage_analyzer.rank_files(max_files)
+
+    print("\nFiles ranked by missing statements:")
+    for source_file_path in source_files:
+        missing = coverage_analyzer.missing_statements[str(source_file_path)]
+        print(f"{source_file_path}: {missing} missing statements")
+
+    test_generator = AmbrogioTestGenerator(prompt_token_budget=prompt_token_budget)
+    graph: CompiledStateGraph = create_test_pipeline(
+        max_iterations,
+        repo_path,
+        prompt_token_budget,
+        coverage_analyzer=coverage_analyzer,
+        test_generator=test_generator,
+        llm_concurrency=llm_concurrency,
+    )
+
+    def process_file(source_file_path: Path) -> Tuple[Path, bool, Optional[Path]]:
+        """Run the refinement loop of one file with its own test file."""
+        return run_file_pipeline(graph, test_generator, source_file_path)
+
+    if not source_files:
+        return []
+    # Files alternate between the LLM and pytest, so more threads than both
+    # caps together would only wait on the semaphores
+    max_workers = min(len(source_files), llm_concurrency + test_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(process_file, source_files))
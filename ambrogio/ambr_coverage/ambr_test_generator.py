@@ -1,8 +1,60 @@
+import ast
 import os.path
+import threading
+from itertools import chain, count
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional, Set, Tuple
 from ambrogio.llm_manager import LLMManager
 from ambrogio.repo_manager import RepoPathManager
+from .prompt_builder import DEFAULT_PROMPT_TOKEN_BUDGET, PromptBuilder
+
+CODE_FENCE = "```"
+
+
+def extract_code(response: str) -> str:
+    """Get the Python code of a response, without markdown code fences.
+
+    Args:
+        response: Text generated by the model
+
+    Returns:
+        The content of the first fenced code block, or of the whole response
+        if it is not fenced
+    """
+    start = response.find(CODE_FENCE)
+    if start == -1:
+        return response.strip()
+    # Skip the language tag following the opening fence
+    start = response.find("\n", start)
+    if start == -1:
+        return ""
+    end = response.find(CODE_FENCE, start)
+    if end == -1:
+        return response[start:].strip()
+    return response[start:end].strip()
+
+
+def is_test_module_complete(text: str) -> bool:
+    """Tell whether a streamed response already holds a whole test module.
+
+    Models asked for bare code often fence it anyway and explain it
+    afterwards; once the fenced block is closed and parses, the rest of the
+    response is not needed.
+
+    Args:
+        text: Text generated so far
+
+    Returns:
+        True once a closed code block holding valid Python arrived
+    """
+    start = text.find(CODE_FENCE)
+    if start == -1 or text.find(CODE_FENCE, start + len(CODE_FENCE)) == -1:
+        return False
+    try:
+        ast.parse(extract_code(text))
+    except SyntaxError:
+        return False
+    return True
 
 
 class AmbrogioTestGenerator:
@@ -10,14 +62,57 @@ class AmbrogioTestGenerator:
 
     def __init__(
         self,
+        prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
     ):
         """Initialize the test generator.
 
         Args:
-            base_path: Base path for the project
+            prompt_token_budget: Maximum number of tokens of source context
+                                 and error output put in a prompt
         """
         self.base_path = RepoPathManager.get_instance().path()
         self.llm_manager = LLMManager.get_instance()
+        self.prompt_builder = PromptBuilder(
+            count_tokens=self.llm_manager.count_tokens,
+            token_budget=prompt_token_budget,
+        )
+        self._reserved_test_paths: Set[Path] = set()
+        self._reserved_test_paths_lock = threading.Lock()
+
+    def reserve_test_file_path(self, source_file_path: Path) -> Path:
+        """Pick a new test file path for a source file, unique within the run.
+
+        The usual ``tests/test_ambr_<name>`` path is preferred. If it is taken,
+        on disk or by another file of the run, the source path relative to the
+        repository is spelled out, e.g. ``tests/test_ambr_pkg_sub_utils.py``,
+        followed by a counter if needed.
+
+        Args:
+            source_file_path: The source file the tests are generated for
+
+        Returns:
+            A path that does not exist yet and was not handed out before
+        """
+        # TODO infer this from the repo
+        test_dir = self.base_path / "tests"
+        try:
+            relative = Path(source_file_path).resolve().relative_to(self.base_path)
+        except ValueError:
+            relative = Path(source_file_path.name)
+        stem = f"test_ambr_{'_'.join(relative.with_suffix('').parts)}"
+        candidates = chain(
+            [f"test_ambr_{source_file_path.name}", f"{stem}.py"],
+            (f"{stem}_{index}.py" for index in count(2)),
+        )
+        with self._reserved_test_paths_lock:
+            for candidate in candidates:
+                test_file_path = test_dir / candidate
+                if (
+                    test_file_path not in self._reserved_test_paths
+                    and not test_file_path.exists()
+                ):
+                    self._reserved_test_paths.add(test_file_path)
+                    return test_file_path
 
     def generate_and_save_tests(
         self,
@@ -49,6 +144,7 @@ class AmbrogioTestGenerator:
         os.makedirs(os.path.dirname(test_file), exist_ok=True)
         with open(test_file, "w") as f:
             f.write(test_content)
+        RepoPathManager.get_discovery().update([test_file])
         return test_file, test_content
 
     def clean_and_save_tests(
@@ -72,6 +168,7 @@ class AmbrogioTestGenerator:
         os.makedirs(os.path.dirname(test_file), exist_ok=True)
         with open(test_file, "w") as f:
             f.write(test_content)
+        RepoPathManager.get_discovery().update([test_file])
         return test_file, test_content
 
     def generate_test_file(
@@ -85,7 +182,8 @@ class AmbrogioTestGenerator:
 
         This method reads the specified source file and generates a test file that aims to cover the lines
         of code that are not yet covered by existing tests. If a test file already exists at the given
-        path, it will be read; otherwise, a new test file will be created in the 'tests' directory.
+        path, it will be read; a path that does not exist yet is used for the new test file; otherwise,
+        a new test file path is reserved with reserve_test_file_path.
 
         Args:
             source_file_path (Path): The path to the source file for which to generate tests.
@@ -104,10 +202,9 @@ class AmbrogioTestGenerator:
             with open(test_file_path, "r") as f:
                 test_code = f.read()
         else:
-            # TODO infer this from the repo
-            test_dir = self.base_path / "tests"
-            test_dir.mkdir(exist_ok=True)
-            test_file_path = test_dir / f"test_ambr_{source_file_path.name}"
+            test_file_path = test_file_path or self.reserve_test_file_path(
+                source_file_path
+            )
             test_code = None
 
         # Generate test content
@@ -170,10 +267,15 @@ class AmbrogioTestGenerator:
         start_line = target_range[0]
         end_line = target_range[-1]
 
+        # Only send the code the targeted lines depend on, not the whole file
+        source_context = self.prompt_builder.build_source_context(
+            source_code, start_line, end_line
+        )
+
         base_prompt = f"""Generate a SINGLE pytest test case for {source_file_path}. Focus ONLY on testing lines {start_line}-{end_line}.
 
-{source_file_path} contains this code:
-{source_code}
+Relevant excerpts of {source_file_path}:
+{source_context}
 
 Generate ONE pytest test case with these requirements:
 
@@ -207,14 +309,14 @@ Generate ONE pytest test case with these requirements:
         if test_execution_error:
             prompt = f"""Fix the test for {source_file_path}, focusing ONLY on lines {start_line}-{end_line}.
 
-Original source code:
-{source_code}
+Relevant excerpts of the original source code:
+{source_context}
 
 Previous test code that failed:
-{test_code}
+{self.prompt_builder.build_test_context(test_code or "", test_execution_error)}
 
 Test execution error:
-{test_execution_error}
+{self.prompt_builder.truncate_error(test_execution_error)}
 
 Generate ONE fixed pytest test case with these requirements:
 
@@ -256,14 +358,10 @@ Generate ONE fixed pytest test case with these requirements:
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0.7,
+                stop_condition=is_test_module_complete,
             )
 
-            # Clean up any markdown code blocks
-            test_content = (
-                test_content.replace("```python", "").replace("```", "").strip()
-            )
-
-            return test_content
+            return extract_code(test_content)
 
         except Exception as e:
             return f"# Error generating tests: {str(e)}"
@@ -320,7 +418,7 @@ Generate ONE fixed pytest test case with these requirements:
 {test_code}
 
 Removing the unit tests that are failing based on this error message:
-{test_execution_error}
+{self.prompt_builder.truncate_error(test_execution_error)}
 
 # CLEANUP REQUIREMENTS
 - Remove only the failing tests
@@ -343,13 +441,10 @@ Output ONLY valid python code:
                     {"role": "user", "content": base_prompt},
                 ],
                 temperature=0.7,
+                stop_condition=is_test_module_complete,
             )
 
-            test_content = (
-                test_content.replace("```python", "").replace("```", "").strip()
-            )
-
-            return test_content
+            return extract_code(test_content)
 
         except Exception as e:
             return f"# Error generating tests: {str(e)}"
@@ -0,0 +1,371 @@
+"""Builds compact source excerpts for test generation prompts."""
+
+import ast
+import re
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# Default maximum number of tokens of source context put in a prompt
+DEFAULT_PROMPT_TOKEN_BUDGET = 4000
+
+# Share of the budget given to the error output of a failed test run
+ERROR_BUDGET_SHARE = 0.25
+
+Definition = ast.stmt
+LineRange = Tuple[int, int]
+
+
+class PromptBuilder:
+    """Extracts the parts of a source file a test for some lines depends on.
+
+    Instead of the whole module, a prompt gets the import block, the
+    innermost function or class enclosing the targeted lines, and the
+    signatures of the module-level functions, classes and methods it calls.
+    Context is added by priority until the token budget is spent.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+    ):
+        """Initialize the prompt builder.
+
+        Args:
+            count_tokens: Function returning the number of tokens of a text
+            token_budget: Maximum number of tokens of source context
+        """
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+
+    def build_source_context(
+        self, source_code: str, start_line: int, end_line: int
+    ) -> str:
+        """Get the source context needed to test a range of lines.
+
+        Args:
+            source_code: Code of the whole source file
+            start_line: First targeted line
+            end_line: Last targeted line
+
+        Returns:
+            The excerpt of the source file to put in the prompt. Each snippet
+            is preceded by a comment giving its line range in the file.
+        """
+        try:
+            tree = ast.parse(source_code)
+        except SyntaxError:
+            return self._truncate(source_code, self.token_budget)
+        lines = source_code.splitlines()
+
+        # The target comes first: without it the prompt is useless
+        target_range = self._get_target_range(tree, start_line, end_line)
+        target = self._render(
+            lines, self._get_class_headers(tree, target_range) + [target_range]
+        )
+        budget = self.token_budget - self.count_tokens(target)
+        if budget < 0:
+            return self._truncate(
+                self._render(lines, [(start_line, end_line)]), self.token_budget
+            )
+
+        sections = []
+        imports = self._render(lines, self._get_import_ranges(tree))
+        if imports and self.count_tokens(imports) <= budget:
+            sections.append(imports)
+            budget -= self.count_tokens(imports)
+
+        signatures = []
+        for signature in self._get_called_signatures(tree, lines, target_range):
+            tokens = self.count_tokens(signature)
+            if tokens > budget:
+                break
+            signatures.append(signature)
+            budget -= tokens
+        if signatures:
+            sections.append("\n".join(signatures))
+
+        sections.append(target)
+        return "\n\n".join(sections)
+
+    def build_test_context(self, test_code: str, error: Optional[str]) -> str:
+        """Get the parts of a failed test module needed to fix it.
+
+        Keeps the tests named in the error output, or the first tests when
+        none is, the import block and the module-level fixtures, helpers and
+        constants those tests use.
+
+        Args:
+            test_code: Code of the whole test module
+            error: Output of the failed test run
+
+        Returns:
+            The excerpt of the test module to put in the prompt, each snippet
+            preceded by a comment giving its line range in the file
+        """
+        try:
+            tree = ast.parse(test_code)
+        except SyntaxError:
+            return self._truncate(test_code, self.token_budget)
+        lines = test_code.splitlines()
+
+        tests = [node for node in tree.body if self._is_test(node)]
+        failing = [node for node in tests if self._is_named_in(node, error or "")]
+        budget = self.token_budget
+        kept: List[Definition] = []
+        for node in failing or tests:
+            tokens = self.count_tokens(self._render(lines, [self._get_range(node)]))
+            if tokens > budget:
+                break
+            kept.append(node)
+            budget -= tokens
+        if not kept:
+            return self._truncate(test_code, self.token_budget)
+
+        imports = self._render(lines, self._get_import_ranges(tree))
+        if imports and self.count_tokens(imports) <= budget:
+            budget -= self.count_tokens(imports)
+        else:
+            imports = ""
+
+        used = {
+            name.id if isinstance(name, ast.Name) else name.arg
+            for node in kept
+            for name in ast.walk(node)
+            if isinstance(name, (ast.Name, ast.arg))
+        }
+        for node in tree.body:
+            if self._is_test(node) or isinstance(node, (ast.Import, ast.ImportFrom)):
+                continue
+            if not used & self._get_defined_names(node):
+                continue
+            tokens = self.count_tokens(self._render(lines, [self._get_range(node)]))
+            if tokens <= budget:
+                kept.append(node)
+                budget -= tokens
+
+        kept.sort(key=lambda node: node.lineno)
+        body = self._render(lines, [self._get_range(node) for node in kept])
+        return "\n\n".join(section for section in [imports, body] if section)
+
+    def truncate_error(self, error: Optional[str]) -> Optional[str]:
+        """Keep the end of an error output, where the failure is, within budget.
+
+        Args:
+            error: Output of the failed test run
+
+        Returns:
+            The error output, trimmed from the start if it is too long
+        """
+        if not error:
+            return error
+        budget = int(self.token_budget * ERROR_BUDGET_SHARE)
+        if self.count_tokens(error) <= budget:
+            return error
+        kept: Deque[str] = deque()
+        # Each line is counted once, with its newline
+        used = 0
+        for line in reversed(error.splitlines()):
+            used += self.count_tokens(line + "\n")
+            if used > budget:
+                break
+            kept.appendleft(line)
+        return "\n".join(["[...]", *kept])
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Keep the first lines of a text that fit the budget."""
+        if self.count_tokens(text) <= budget:
+            return text
+        kept: List[str] = []
+        used = 0
+        for line in text.splitlines():
+            used += self.count_tokens(line + "\n")
+            if used > budget:
+                break
+            kept.append(line)
+        return "\n".join(kept + ["# [...]"])
+
+    @staticmethod
+    def _get_start(node: Definition) -> int:
+        """Get the first line of a statement, decorators included."""
+        decorators = getattr(node, "decorator_list", [])
+        return min([node.lineno] + [d.lineno for d in decorators])
+
+    @classmethod
+    def _get_range(cls, node: Definition) -> LineRange:
+        """Get the lines of a statement, decorators included."""
+        return cls._get_start(node), node.end_lineno
+
+    @staticmethod
+    def _is_test(node: Definition) -> bool:
+        """Tell whether a module-level statement is a pytest test or test class."""
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return node.name.startswith("test")
+        return isinstance(node, ast.ClassDef) and node.name.startswith("Test")
+
+    @staticmethod
+    def _is_named_in(node: Definition, error: str) -> bool:
+        """Tell whether a test, or a method of a test class, is named in an error."""
+        names = [node.name]
+        if isinstance(node, ast.ClassDef):
+            names += [
+                member.name
+                for member in node.body
+                if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+        return any(re.search(rf"\b{re.escape(name)}\b", error) for name in names)
+
+    @staticmethod
+    def _get_defined_names(node: Definition) -> Set[str]:
+        """Get the names a module-level statement binds."""
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return {node.name}
+        return {
+            target.id
+            for target in ast.walk(node)
+            if isinstance(target, ast.Name) and isinstance(target.ctx, ast.Store)
+        }
+
+    @classmethod
+    def _get_target_range(
+        cls, tree: ast.Module, start_line: int, end_line: int
+    ) -> LineRange:
+        """Find the lines of the innermost definition enclosing the target.
+
+        Falls back to the top-level statements overlapping the target when
+        it is not inside a single function or class.
+        """
+        enclosing = None
+        for node in ast.walk(tree):
+            if not isinstance(
+                node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            ):
+                continue
+            if cls._get_start(node) <= start_line and end_line <= node.end_lineno:
+                if enclosing is None or node.lineno > enclosing.lineno:
+                    enclosing = node
+        if enclosing is not None:
+            return cls._get_start(enclosing), enclosing.end_lineno
+
+        overlapping = [
+            node
+            for node in tree.body
+            if cls._get_start(node) <= end_line and start_line <= node.end_lineno
+        ]
+        if not overlapping:
+            return start_line, end_line
+        return cls._get_start(overlapping[0]), overlapping[-1].end_lineno
+
+    @classmethod
+    def _get_class_headers(
+        cls, tree: ast.Module, target_range: LineRange
+    ) -> List[LineRange]:
+        """Get the header lines of the classes enclosing the target, outermost first."""
+        start, end = target_range
+        return [
+            (cls._get_start(node), node.lineno)
+            for node in ast.walk(tree)
+            if isinstance(node, ast.ClassDef)
+            and cls._get_start(node) < start
+            and end <= node.end_lineno
+        ]
+
+    @classmethod
+    def _get_import_ranges(cls, tree: ast.Module) -> List[LineRange]:
+        """Get the lines of the module-level imports, merging adjacent ones."""
+        ranges: List[LineRange] = []
+        for node in tree.body:
+            if not isinstance(node, (ast.Import, ast.ImportFrom)):
+                continue
+            start = cls._get_start(node)
+            if ranges and ranges[-1][1] + 1 == start:
+                ranges[-1] = (ranges[-1][0], node.end_lineno)
+            else:
+                ranges.append((start, node.end_lineno))
+        return ranges
+
+    @classmethod
+    def _get_definitions(cls, tree: ast.Module) -> Dict[str, List[Definition]]:
+        """Index module-level functions and classes, and methods, by name."""
+        definitions: Dict[str, List[Definition]] = {}
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                definitions.setdefault(node.name, []).append(node)
+            if isinstance(node, ast.ClassDef):
+                for member in node.body:
+                    if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        definitions.setdefault(member.name, []).append(member)
+        return definitions
+
+    @classmethod
+    def _get_signature_range(cls, node: Definition) -> LineRange:
+        """Get the lines of a definition up to, but excluding, its body."""
+        body_start = node.body[0].lineno
+        if (
+            isinstance(node.body[0], ast.Expr)
+            and isinstance(node.body[0].value, ast.Constant)
+            and isinstance(node.body[0].value.value, str)
+        ):
+            # Keep the docstring, it describes the behaviour the test relies on
+            body_start = node.body[0].end_lineno + 1
+        return cls._get_start(node), max(node.lineno, body_start - 1)
+
+    def _get_called_signatures(
+        self, tree: ast.Module, lines: List[str], target_range: LineRange
+    ) -> List[str]:
+        """Render the signatures of the definitions called from the target."""
+        start, end = target_range
+        called: List[str] = []
+        seen: Set[str] = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not start <= node.lineno <= end:
+                continue
+            func = node.func
+            name = (
+                func.id
+                if isinstance(func, ast.Name)
+                else func.attr
+                if isinstance(func, ast.Attribute)
+                else None
+            )
+            if name and name not in seen:
+                seen.add(name)
+                called.append(name)
+
+        definitions = self._get_definitions(tree)
+        signatures = []
+        for name in called:
+            for node in definitions.get(name, []):
+                node_start = self._get_start(node)
+                if start <= node_start and node.end_lineno <= end:
+                    continue  # Already part of the target
+                ranges = [self._get_signature_range(node)]
+                if isinstance(node, ast.ClassDef):
+                    ranges += [
+                        self._get_signature_range(member)
+                        for member in node.body
+                        if isinstance(member, ast.FunctionDef)
+                        and member.name == "__init__"
+                    ]
+                signatures.append(self._render(lines, ranges, ellipsis=True))
+        return signatures
+
+    @staticmethod
+    def _render(
+        lines: List[str], ranges: List[LineRange], ellipsis: bool = False
+    ) -> str:
+        """Join line ranges of the source, each headed by its position.
+
+        Args:
+            lines: Lines of the source file
+            ranges: Inclusive, 1-based line ranges to render
+            ellipsis: Whether to stand in for the elided body of definitions
+        """
+        snippets = []
+        for start, end in ranges:
+            snippet = "\n".join(lines[start - 1 : end])
+            if ellipsis:
+                indent = len(lines[start - 1]) - len(lines[start - 1].lstrip())
+                snippet += "\n" + " " * (indent + 4) + "..."
+            snippets.append(f"# lines {start}-{end}\n{snippet}")
+        return "\n".join(snippets)
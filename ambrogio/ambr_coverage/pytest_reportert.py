@@ -2,9 +2,10 @@ import sys
 import traceback
 from functools import wraps
 from io import StringIO
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from _pytest.reports import CollectReport, TestReport
+if TYPE_CHECKING:
+    from _pytest.reports import CollectReport, TestReport
 
 
 class PytestReporter:
@@ -60,7 +61,7 @@ class PytestReporter:
             formatted += f"\nTraceback:\n{tb}"
         return formatted
 
-    def pytest_collectreport(self, report: CollectReport):
+    def pytest_collectreport(self, report: "CollectReport"):
         """Process the collection report from pytest.
 
         This method is called when pytest collects a report. If the report indicates
@@ -78,7 +79,7 @@ class PytestReporter:
             error_msg = str(report.longrepr)
             self.errors.append(self._format_error(error_msg, str(tb) if tb else None))
 
-    def pytest_runtest_logreport(self, report: TestReport):
+    def pytest_runtest_logreport(self, report: "TestReport"):
         """Handle the logging of test report results.
 
         This method processes the test report and captures error messages
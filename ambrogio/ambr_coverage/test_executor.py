@@ -0,0 +1,211 @@
+"""Runs pytest in isolated worker subprocesses."""
+
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+WORKER_SCRIPT = Path(__file__).with_name("test_worker.py")
+
+# Number of trailing output lines reported when a worker dies without results
+CRASH_OUTPUT_LINES = 50
+
+# Default wall-clock limit of a generated test run, in seconds
+DEFAULT_TEST_TIMEOUT = 60.0
+
+# Explanations of the signals a worker is killed with when it overruns a limit
+LIMIT_SIGNALS = {
+    getattr(signal, "SIGXCPU", None): "it exceeded its CPU time limit",
+    getattr(signal, "SIGKILL", None): "it was killed, e.g. for running out of memory",
+}
+
+
+@dataclass
+class TestRunResult:
+    """Outcome of one pytest run in a worker subprocess."""
+
+    __test__ = False  # Not a pytest test class, despite its name
+
+    exit_code: int
+    errors: List[str] = field(default_factory=list)
+    output: str = ""
+
+    @property
+    def passed(self) -> bool:
+        """Whether every collected test passed."""
+        return self.exit_code == 0
+
+
+class TestExecutor:
+    """Runs pytest in a fresh interpreter for every run.
+
+    Each run imports the code under test from scratch, so regenerated tests
+    and modules are never stale, global state cannot leak between runs, and a
+    test that crashes its interpreter only fails its own run. Runs may be
+    requested from several threads; at most ``max_workers`` execute at once.
+
+    Limited runs are killed, with every process they started, once they
+    exceed the wall-clock timeout. Their address space and CPU time are
+    capped as well, where the platform supports it.
+    """
+
+    __test__ = False  # Not a pytest test class, despite its name
+
+    def __init__(
+        self,
+        repo_path: Path,
+        max_workers: int = 1,
+        timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+        memory_limit: Optional[int] = None,
+    ):
+        """Initialize the executor.
+
+        Args:
+            repo_path: Repository root, used as working directory of the runs
+            max_workers: Maximum number of worker subprocesses at once
+            timeout: Wall-clock limit of a limited run in seconds, or None
+            memory_limit: Address space limit of a limited run in megabytes,
+                          or None
+
+        Raises:
+            ValueError: If max_workers is lower than 1
+        """
+        if max_workers < 1:
+            raise ValueError(f"Test workers must be at least 1, got {max_workers}")
+        self.repo_path = Path(repo_path)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._semaphore = threading.BoundedSemaphore(max_workers)
+
+    def run(
+        self,
+        pytest_args: Sequence[str],
+        coverage_data_file: Optional[Path] = None,
+        limited: bool = True,
+        record_contexts: bool = False,
+    ) -> TestRunResult:
+        """Run pytest in a worker subprocess and wait for its results.
+
+        Args:
+            pytest_args: Arguments passed to pytest, e.g. test file paths
+            coverage_data_file: If given, the run is measured with coverage
+                                and its data saved to this file
+            limited: Whether the timeout and resource limits apply, which
+                     they should for generated tests but not for the
+                     project's own suite
+            record_contexts: Whether the coverage of each test is labelled
+                             with its pytest node id
+
+        Returns:
+            The exit code and errors reported by pytest, plus the run output.
+            Overruns are reported as errors too.
+        """
+        timeout = self.timeout if limited else None
+        with tempfile.TemporaryDirectory(prefix="ambrogio-") as tmp_dir:
+            result_file = Path(tmp_dir) / "result.json"
+            command = [
+                sys.executable,
+                str(WORKER_SCRIPT),
+                "--result-file",
+                str(result_file),
+            ]
+            if coverage_data_file:
+                command += [
+                    "--coverage-data-file",
+                    str(coverage_data_file),
+                    "--coverage-source",
+                    str(self.repo_path),
+                ]
+                if record_contexts:
+                    command.append("--coverage-contexts")
+            if limited and self.memory_limit:
+                command += ["--memory-limit", str(self.memory_limit)]
+            if timeout:
+                # A backstop should this process die before killing the worker
+                command += ["--cpu-limit", str(math.ceil(timeout) + 1)]
+            command += ["--", *map(str, pytest_args)]
+
+            with self._semaphore:
+                returncode, output, timed_out = self._run_worker(command, timeout)
+            if timed_out:
+                return self._crash_result(
+                    returncode,
+                    output,
+                    f"the test run timed out after {timeout:g} seconds and was "
+                    "killed; a test probably loops forever or waits on "
+                    "something that never happens",
+                )
+
+            try:
+                with open(result_file) as f:
+                    results = json.load(f)
+            except (OSError, ValueError):
+                reason = LIMIT_SIGNALS.get(-returncode) if returncode < 0 else None
+                return self._crash_result(returncode, output, reason)
+        return TestRunResult(
+            exit_code=results["exit_code"], errors=results["errors"], output=output
+        )
+
+    def _run_worker(
+        self, command: List[str], timeout: Optional[float]
+    ) -> Tuple[int, str, bool]:
+        """Run a worker, killing its whole process group if it times out.
+
+        Returns:
+            The exit code, the combined output and whether the run timed out
+        """
+        process = subprocess.Popen(
+            command,
+            cwd=self.repo_path,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            # Own process group, so that processes started by tests die too
+            start_new_session=True,
+        )
+        try:
+            output, _ = process.communicate(timeout=timeout)
+            return process.returncode, output, False
+        except subprocess.TimeoutExpired:
+            self._kill(process)
+            output, _ = process.communicate()
+            return process.returncode, output, True
+        except BaseException:
+            self._kill(process)
+            process.wait()
+            raise
+
+    @staticmethod
+    def _kill(process: subprocess.Popen) -> None:
+        """Kill a worker and every process of its group."""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _crash_result(
+        exit_code: int, output: str, reason: Optional[str] = None
+    ) -> TestRunResult:
+        """Describe a worker that exited without writing its results."""
+        tail = "\n".join(output.splitlines()[-CRASH_OUTPUT_LINES:])
+        message = f"Error: test worker exited with code {exit_code}"
+        if reason:
+            message += f": {reason}"
+        return TestRunResult(
+            exit_code=exit_code or 1,
+            errors=[f"{message}\n{tail}"],
+            output=output,
+        )
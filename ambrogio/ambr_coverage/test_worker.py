@@ -0,0 +1,124 @@
+"""Runs pytest in a fresh interpreter on behalf of TestExecutor.
+
+The worker is started by file path rather than with ``python -m`` so that it
+never imports the ambrogio package, whose LLM dependencies take seconds to
+load. Its results are written as JSON to the file given on the command line,
+leaving stdout and stderr to pytest.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def set_limits(memory_limit: Optional[int], cpu_limit: Optional[int]) -> None:
+    """Cap the address space and CPU time of this process and its children.
+
+    Args:
+        memory_limit: Maximum address space in megabytes, or None for no limit
+        cpu_limit: Maximum CPU time in seconds, or None for no limit
+    """
+    if resource is None:
+        return
+    if memory_limit:
+        size = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    if cpu_limit:
+        # The soft limit sends SIGXCPU, the hard one a second later SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+
+
+class ContextSwitcher:
+    """pytest plugin labelling the coverage of each test with its node id.
+
+    Coverage's own ``dynamic_context = test_function`` labels lines with the
+    test function's qualified name, which pytest cannot be asked to run.
+    Node ids, e.g. ``tests/test_app.py::TestApp::test_run[1]``, can be passed
+    back to pytest as they are.
+    """
+
+    def __init__(self, coverage):
+        """Initialize the plugin.
+
+        Args:
+            coverage: The started coverage measurement
+        """
+        self.coverage = coverage
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        """Attribute everything until the test ends, fixtures included, to it."""
+        self.coverage.switch_context(nodeid)
+
+    def pytest_runtest_logfinish(self, nodeid, location):
+        """Attribute what runs between tests, e.g. collection, to no test."""
+        self.coverage.switch_context("")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run pytest, optionally under coverage, and write the results as JSON.
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        The pytest exit code
+    """
+    parser = argparse.ArgumentParser(description="Ambrogio pytest worker")
+    parser.add_argument("--result-file", required=True)
+    parser.add_argument("--coverage-data-file")
+    parser.add_argument("--coverage-source", action="append", default=[])
+    parser.add_argument("--coverage-contexts", action="store_true")
+    parser.add_argument("--memory-limit", type=int)
+    parser.add_argument("--cpu-limit", type=int)
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    # Running a script puts its own directory first on sys.path: import the
+    # reporter from there, then let the project under test take its place
+    from pytest_reportert import PytestReporter
+
+    sys.path[0] = os.getcwd()
+
+    import pytest
+
+    # Set once pytest is loaded, so that a tight limit fails the tests rather
+    # than the worker startup
+    set_limits(args.memory_limit, args.cpu_limit)
+
+    coverage = None
+    if args.coverage_data_file:
+        from coverage import Coverage
+
+        coverage = Coverage(
+            data_file=args.coverage_data_file,
+            config_file=True,
+            source=args.coverage_source or None,
+        )
+        coverage.start()
+
+    reporter = PytestReporter()
+    plugins = [reporter]
+    if coverage and args.coverage_contexts:
+        plugins.append(ContextSwitcher(coverage))
+    pytest_args = [arg for arg in args.pytest_args if arg != "--"]
+    try:
+        exit_code = int(pytest.main(pytest_args, plugins=plugins))
+    finally:
+        if coverage:
+            coverage.stop()
+            coverage.save()
+
+    with open(args.result_file, "w") as f:
+        json.dump({"exit_code": exit_code, "errors": reporter.errors}, f)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
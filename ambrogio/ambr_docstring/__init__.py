@@ -1,4 +1,29 @@
-from .ambr_docstring import AmbrogioDocstring, DEFAULT_MAX_API_CALLS
-from .node_collector import NodeNeedingDocstring
+from importlib import import_module
 
-__all__ = ["AmbrogioDocstring", "NodeNeedingDocstring", "DEFAULT_MAX_API_CALLS"]
+from .defaults import (
+    DEFAULT_BATCH_TOKEN_BUDGET,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_API_CALLS,
+    DEFAULT_WORKERS,
+)
+
+# Names imported on first access, as their modules load libcst and litellm
+_LAZY_IMPORTS = {
+    "AmbrogioDocstring": ".ambr_docstring",
+    "NodeNeedingDocstring": ".node_collector",
+}
+
+__all__ = [
+    "AmbrogioDocstring",
+    "NodeNeedingDocstring",
+    "DEFAULT_BATCH_TOKEN_BUDGET",
+    "DEFAULT_CONCURRENCY",
+    "DEFAULT_MAX_API_CALLS",
+    "DEFAULT_WORKERS",
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
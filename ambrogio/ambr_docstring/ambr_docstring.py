@@ -1,13 +1,33 @@
+import ast
+import asyncio
+import json
+import os
+import re
+import textwrap
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import libcst as cst
 
-from ambrogio.repo_manager import FileGetter, RepoPathManager
+from ambrogio.repo_manager import FileGetter, GitDiff, RepoPathManager
 from ambrogio.llm_manager import LLMManager
+from ambrogio.telemetry import attribute_to_file, get_telemetry
+from .defaults import (
+    DEFAULT_BATCH_TOKEN_BUDGET,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_API_CALLS,
+    DEFAULT_WORKERS,
+)
 from .node_collector import NodeNeedingDocstring
 
 
+# Triple-quoted string literal, skipping escaped characters
+DOCSTRING_LITERAL = re.compile(r'"""((?:[^"\\]|\\.|"(?!""))*)"""', re.DOTALL)
+
+
 class DocstringTransformer(cst.CSTTransformer):
     """Transform AST to add docstrings to functions and classes."""
 
@@ -15,19 +35,66 @@ class DocstringTransformer(cst.CSTTransformer):
         """Initialize transformer with docstring mapping.
 
         Args:
-            docstring_map: Mapping of function/class names to their generated docstrings
+            docstring_map: Mapping of qualified function/class names, such as
+                           ``MyClass.run``, to their generated docstrings
         """
         self.docstring_map = docstring_map
+        self.current_path: List[str] = []
+        # Indentation of each enclosing block, whatever statement opened it
+        self.indents: List[str] = []
+        self.default_indent = "    "
 
     @staticmethod
-    def _make_docstring(docstring: str) -> cst.SimpleStatementLine:
-        """Create a docstring node."""
+    def _make_docstring(docstring: str, indent: str = "") -> cst.SimpleStatementLine:
+        """Create a docstring node.
+
+        Args:
+            docstring: Generated text containing a triple-quoted docstring
+            indent: Indentation of the body the docstring is added to
+        """
         # Extract just the docstring part from the code block
-        docstring = docstring.split('"""')[1].split('"""')[0].strip()
+        match = DOCSTRING_LITERAL.search(docstring)
+        docstring = (
+            match.group(1) if match else docstring.split('"""')[1].split('"""')[0]
+        ).strip()
+        # Re-indent continuation lines to the level of the enclosing body
+        first_line, _, rest = docstring.partition("\n")
+        if rest:
+            rest = textwrap.indent(textwrap.dedent(rest), indent)
+            docstring = f"{first_line}\n{rest}"
         return cst.SimpleStatementLine(
             body=[cst.Expr(value=cst.SimpleString(value=f'"""{docstring}"""'))]
         )
 
+    def visit_Module(self, node: cst.Module) -> None:
+        """Use the module's indentation for blocks that do not set their own."""
+        self.default_indent = node.default_indent
+
+    def visit_IndentedBlock(self, node: cst.IndentedBlock) -> None:
+        """Enter an indented block."""
+        self.indents.append(self.default_indent if node.indent is None else node.indent)
+
+    def leave_IndentedBlock(
+        self, original_node: cst.IndentedBlock, updated_node: cst.IndentedBlock
+    ) -> cst.IndentedBlock:
+        """Leave an indented block."""
+        self.indents.pop()
+        return updated_node
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> None:
+        """Enter the scope of the class body."""
+        self.current_path.append(node.name.value)
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+        """Enter the scope of the function body."""
+        self.current_path.append(node.name.value)
+
+    def _leave_scope(self) -> str:
+        """Leave the innermost scope and return its qualified name."""
+        qualified_name = ".".join(self.current_path)
+        self.current_path.pop()
+        return qualified_name
+
     def leave_ClassDef(
         self, original_node: cst.ClassDef, updated_node: cst.ClassDef
     ) -> cst.CSTNode:
@@ -45,7 +112,7 @@ class DocstringTransformer(cst.CSTTransformer):
         Returns:
             cst.CSTNode: The updated class definition node, potentially with a
             new docstring added."""
-        qualified_name = original_node.name.value
+        qualified_name = self._leave_scope()
         if qualified_name in self.docstring_map and not self._has_docstring(
             updated_node
         ):
@@ -69,7 +136,7 @@ class DocstringTransformer(cst.CSTTransformer):
 
         Returns:
             cst.CSTNode: The updated function definition node, potentially with a new docstring."""
-        qualified_name = original_node.name.value
+        qualified_name = self._leave_scope()
         if qualified_name in self.docstring_map and not self._has_docstring(
             updated_node
         ):
@@ -92,32 +159,106 @@ class DocstringTransformer(cst.CSTTransformer):
     def _add_docstring(self, node: cst.CSTNode, docstring: str) -> cst.CSTNode:
         """Add docstring to a node."""
         if isinstance(node, (cst.FunctionDef, cst.ClassDef)):
-            new_body = [self._make_docstring(docstring)] + list(node.body.body)
+            # The node's own body has been left, only its enclosing blocks remain
+            body_indent = getattr(node.body, "indent", None)
+            indent = "".join(self.indents) + (
+                self.default_indent if body_indent is None else body_indent
+            )
+            new_body = [self._make_docstring(docstring, indent)] + list(node.body.body)
             return node.with_changes(body=node.body.with_changes(body=new_body))
         return node
 
 
-# Default maximum number of OpenAI API calls per run
-DEFAULT_MAX_API_CALLS = 12
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that generates clear and concise Python docstrings."
+)
+
+
+def is_docstring_complete(text: str) -> bool:
+    """Tell whether a streamed response already holds a closed docstring.
+
+    Args:
+        text: Text generated so far
+
+    Returns:
+        True once both the opening and the closing triple quotes arrived
+    """
+    return text.count('"""') >= 2
+
+
+# Size and modification time of a file, its tree, and its nodes missing a
+# docstring with their source code and lines
+ParsedFile = Tuple[
+    Tuple[int, int], cst.Module, Dict[str, str], Dict[str, Tuple[int, int]]
+]
+
+
+@dataclass
+class PendingFile:
+    """A parsed file together with the requests planned for its docstrings.
+
+    Each request maps the names of the nodes it documents to their source code.
+    The tree is only kept when the file was parsed in the main process.
+    """
+
+    file_path: Path
+    tree: Optional[cst.Module]
+    requests: List[Dict[str, str]]
+    docstrings: Dict[str, str] = field(default_factory=dict)
 
 
 class AmbrogioDocstring:
     """Main class for fixing missing docstrings using OpenAI."""
 
-    def __init__(self, max_api_calls: int = 12):
+    def __init__(
+        self,
+        max_api_calls: int = DEFAULT_MAX_API_CALLS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch: bool = False,
+        batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+        changed_only: bool = False,
+        since: Optional[str] = None,
+        workers: int = DEFAULT_WORKERS,
+        cache_trees: bool = False,
+    ):
         """Initialize the docstring fixer.
 
         Args:
             max_api_calls: Maximum number of API calls to make (default: 12)
+            concurrency: Maximum number of API calls in flight at once (default: 1)
+            batch: Whether to document several nodes of a file per API call
+            batch_token_budget: Maximum code tokens packed into one batched call
+            changed_only: Whether to only document functions and classes touched
+                          in the working tree, according to git
+            since: Git reference changes are looked up from (default: HEAD).
+                   Implies changed_only.
+            workers: Number of processes parsing and rewriting files (default: 1)
+            cache_trees: Whether to keep the parsed files across runs, re-parsing
+                         them only once modified, for long-lived processes
+
+        Raises:
+            ValueError: If concurrency or workers is lower than 1
         """
+        if concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+        if workers < 1:
+            raise ValueError(f"Workers must be at least 1, got {workers}")
         self.file_getter = FileGetter()
         self.repo_manager = RepoPathManager.get_instance()
         self.llm_manager = LLMManager.get_instance()
         self.modified_files = []
         self.max_api_calls = max_api_calls
+        self.concurrency = concurrency
+        self.batch = batch
+        self.batch_token_budget = batch_token_budget
+        self.changed_only = changed_only or since is not None
+        self.since = since
+        self.changed_lines: Optional[Dict[str, Optional[Set[int]]]] = None
+        self.workers = workers
         self.api_calls_made = 0
+        self._trees: Optional[Dict[Path, ParsedFile]] = {} if cache_trees else None
 
-    def _generate_docstring(self, code: str, name: str) -> str:
+    async def _generate_docstring(self, code: str, name: str) -> str:
         """Generate docstring using OpenAI API.
 
         Args:
@@ -126,18 +267,12 @@ class AmbrogioDocstring:
 
         Returns:
             Generated docstring
-
-        Raises:
-            RuntimeError: If maximum API calls limit has been reached
         """
 
         # Use LLM manager to generate docstring
-        docstring = self.llm_manager.get_completion(
+        docstring = await self.llm_manager.aget_completion(
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that generates clear and concise Python docstrings.",
-                },
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {
                     "role": "user",
                     "content": f"""Generate a concise but informative docstring for this Python {code}. 
@@ -147,74 +282,391 @@ class AmbrogioDocstring:
             ],
             temperature=0.7,
             max_tokens=500,  # Allow for longer docstrings
+            # Anything after the closing quotes is discarded anyway
+            stop_condition=is_docstring_complete,
         )
 
-        self.api_calls_made += 1
         return docstring.strip()
 
-    def _fix_file_docstrings(self, file_path: Path) -> None:
-        """Fix missing docstrings in a single file.
+    async def _generate_docstring_batch(self, nodes: Dict[str, str]) -> Dict[str, str]:
+        """Generate docstrings for several nodes with a single API call.
 
         Args:
-            file_path: Path to the Python file to fix
+            nodes: Mapping of node names to their source code
+
+        Returns:
+            Mapping of node names to their generated docstrings
         """
-        # Read the file
-        source_code = file_path.read_text()
-        tree = cst.parse_module(source_code)
+        code_blocks = "\n\n".join(f"### {name}\n{code}" for name, code in nodes.items())
+        response = await self.llm_manager.aget_completion(
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"""Generate a concise but informative docstring for each of the Python functions and classes below.
+The docstrings should follow Google style and include Args and Returns sections if applicable.
+Focus on explaining what the code does, not how it does it.
+
+Reply ONLY with a JSON object mapping each name that follows "###" to its docstring text, without the surrounding triple quotes.
+
+{code_blocks}""",
+                },
+            ],
+            temperature=0.7,
+            max_tokens=500 * len(nodes),  # Allow for longer docstrings
+        )
+        docstrings = self._parse_docstring_batch(response, list(nodes))
+        missing = [name for name in nodes if name not in docstrings]
+        if missing:
+            print(f"  No docstring returned for {', '.join(missing)}")
+        return docstrings
 
-        # First pass: collect nodes that need docstrings
-        collector = NodeNeedingDocstring()
+    @staticmethod
+    def _parse_docstring_batch(response: str, names: List[str]) -> Dict[str, str]:
+        """Extract the docstrings of a batched request from the model response.
+
+        The response is expected to hold a JSON object, possibly wrapped in a
+        markdown code block or surrounded by extra text. Python dict literals
+        are accepted as well, and unknown or non-string entries are dropped.
+
+        Args:
+            response: Raw text returned by the model
+            names: Names of the nodes documented by the request
+
+        Returns:
+            Mapping of node names to triple-quoted docstrings
+
+        Raises:
+            ValueError: If no mapping can be parsed from the response
+        """
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end < start:
+            raise ValueError("No JSON object found in the batched response")
+        payload = response[start : end + 1]
+        try:
+            parsed = json.loads(payload)
+        except ValueError:
+            try:
+                parsed = ast.literal_eval(payload)
+            except (ValueError, SyntaxError):
+                raise ValueError("Could not parse the batched response")
+        if not isinstance(parsed, dict):
+            raise ValueError("The batched response is not a mapping")
+
+        docstrings = {}
+        for name in names:
+            docstring = parsed.get(name)
+            if not isinstance(docstring, str) or not docstring.strip():
+                continue
+            docstring = docstring.strip()
+            if not (docstring.startswith('"""') and docstring.endswith('"""')):
+                docstring = AmbrogioDocstring._to_docstring_literal(docstring)
+            docstrings[name] = docstring
+        return docstrings
+
+    @staticmethod
+    def _to_docstring_literal(text: str) -> str:
+        """Quote plain docstring text as a triple-quoted Python literal.
+
+        Backslashes, triple quotes and a trailing quote are escaped, so the
+        literal holds the text unchanged.
+
+        Args:
+            text: Docstring text, as decoded from the batched response
+
+        Returns:
+            The triple-quoted docstring
+        """
+        text = text.replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+        if text.endswith('"'):
+            text = text[:-1] + '\\"'
+        return f'"""{text}"""'
+
+    def _plan_requests(self, nodes: Dict[str, str]) -> List[Dict[str, str]]:
+        """Group the nodes of a file into API requests.
+
+        Without batching every node gets its own request. With batching nodes
+        are packed in order until the code of a request exceeds the token budget.
+
+        Args:
+            nodes: Mapping of node names to their source code
+
+        Returns:
+            The requests, each mapping node names to their source code
+        """
+        if not self.batch:
+            return [{name: code} for name, code in nodes.items()]
+
+        requests, current, current_tokens = [], {}, 0
+        for name, code in nodes.items():
+            tokens = self.llm_manager.count_tokens(code)
+            if current and current_tokens + tokens > self.batch_token_budget:
+                requests.append(current)
+                current, current_tokens = {}, 0
+            current[name] = code
+            current_tokens += tokens
+        if current:
+            requests.append(current)
+        return requests
+
+    @staticmethod
+    def _parse_file(
+        file_path: Path,
+    ) -> Tuple[cst.Module, Dict[str, str], Dict[str, Tuple[int, int]]]:
+        """Parse a file and collect the nodes missing a docstring, with their lines."""
+        source = file_path.read_text()
+        tree = cst.parse_module(source)
+        collector = NodeNeedingDocstring(source)
         tree.visit(collector)
-        nodes_needing_docstrings = collector.nodes_needing_docstrings
+        return tree, collector.nodes_needing_docstrings, collector.node_lines
+
+    @staticmethod
+    def _collect_file_nodes(
+        file_path: Path,
+        changed_lines: Optional[Set[int]] = None,
+        parsed: Optional[ParsedFile] = None,
+    ) -> Tuple[cst.Module, Dict[str, str]]:
+        """Parse a file and collect the nodes missing a docstring.
+
+        Args:
+            file_path: Path to the Python file to analyze
+            changed_lines: If given, only nodes spanning one of these lines are kept
+            parsed: Result of an earlier parse of the unchanged file, if any
+
+        Returns:
+            The parsed module and a mapping of node names to their source code
+        """
+        if parsed is None:
+            tree, nodes, node_lines = AmbrogioDocstring._parse_file(file_path)
+        else:
+            _, tree, nodes, node_lines = parsed
+        if changed_lines is not None:
+
+            def is_touched(name: str) -> bool:
+                # Spans are unknown when ast cannot parse what libcst can,
+                # and documenting too much beats skipping a changed node
+                if name not in node_lines:
+                    return True
+                start, end = node_lines[name]
+                return any(start <= line <= end for line in changed_lines)
+
+            nodes = {name: code for name, code in nodes.items() if is_touched(name)}
+        return tree, nodes
+
+    def _collect_cached_file_nodes(
+        self, file_path: Path, changed_lines: Optional[Set[int]] = None
+    ) -> Tuple[cst.Module, Dict[str, str]]:
+        """Collect the nodes of a file, reusing its tree while it is unchanged."""
+        if self._trees is None:
+            return self._collect_file_nodes(file_path, changed_lines)
+        stat = os.stat(file_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        parsed = self._trees.get(file_path)
+        if parsed is None or parsed[0] != stamp:
+            parsed = (stamp, *self._parse_file(file_path))
+            self._trees[file_path] = parsed
+        return self._collect_file_nodes(file_path, changed_lines, parsed)
+
+    def _iter_file_nodes(
+        self, file_paths: List[str], executor: Optional[Executor]
+    ) -> Iterator[Tuple[str, Optional[cst.Module], Dict[str, str]]]:
+        """Collect the nodes missing a docstring of each file, in order.
+
+        With an executor, files are parsed ahead in worker processes and the
+        files still queued are cancelled once the caller stops iterating.
+
+        Args:
+            file_paths: Repository-relative paths of the files to analyze
+            executor: Process pool to parse files in, or None to parse them here
 
-        if not nodes_needing_docstrings:
-            print("  No missing docstrings found in this file")
+        Yields:
+            The file path, its tree if parsed in this process, and its nodes
+        """
+        jobs = [
+            (
+                self.repo_manager.get_absolute_path(file_path),
+                self.changed_lines.get(file_path) if self.changed_lines else None,
+            )
+            for file_path in file_paths
+        ]
+        if executor is None:
+            for file_path, job in zip(file_paths, jobs):
+                yield (file_path, *self._collect_cached_file_nodes(*job))
             return
 
-        print(f"  Found {len(nodes_needing_docstrings)} items needing docstrings")
+        futures = [executor.submit(_collect_nodes_in_worker, *job) for job in jobs]
+        try:
+            for file_path, future in zip(file_paths, futures):
+                yield file_path, None, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
 
-        docstring_map = {}
-        for name, code in nodes_needing_docstrings.items():
-            if self.api_calls_made >= self.max_api_calls:
-                break
-            docstring = self._generate_docstring(code, name)
-            docstring_map[name] = docstring
-
-        # Second pass: add docstrings
-        transformer = DocstringTransformer(docstring_map)
-        modified_tree = tree.visit(transformer)
-
-        # Write the modified code back to the file
-        modified_code = modified_tree.code
-        print(f"  Writing changes to {file_path}...")
-        file_path.write_text(modified_code)
-        print("  Successfully updated file with new docstrings")
-        self.modified_files.append(str(self.repo_manager.get_relative_path(file_path)))
-
-    def run(self) -> list[str]:
-        """Run the docstring fixer on all files missing docstrings."""
-        files, initial_coverage = self.file_getter.get_files_and_coverage()
-        if not files:
-            print("No files need docstring improvements!")
-            return []
+    def _collect_pending_files(
+        self, files: Dict[str, float], executor: Optional[Executor] = None
+    ) -> List[PendingFile]:
+        """Select the nodes to document across files, within the API call budget.
 
-        print(f"Files missing docstrings: {len(files)}")
+        Args:
+            files: Mapping of relative file paths to their docstring coverage
+            executor: Process pool to parse files in, or None to parse them here
 
-        for file_path, coverage in files.items():
-            if self.api_calls_made >= self.max_api_calls:
+        Returns:
+            The files with at least one node selected for generation
+        """
+        budget = self.max_api_calls - self.api_calls_made
+        pending_files = []
+        for file_path, tree, nodes in self._iter_file_nodes(list(files), executor):
+            if budget <= 0:
                 print(
                     f"Maximum number of API calls ({self.max_api_calls}) reached. "
                     "Increase the limit with --max-api-calls if needed."
                 )
                 break
-            abs_path = self.repo_manager.get_absolute_path(file_path)
             print(
-                f"\nFixing docstrings in {file_path} (current coverage: {coverage:.1f}%)"
+                f"\nFixing docstrings in {file_path} "
+                f"(current coverage: {files[file_path]:.1f}%)"
+            )
+            if not nodes:
+                print("  No missing docstrings found in this file")
+                continue
+
+            print(f"  Found {len(nodes)} items needing docstrings")
+            requests = list(islice(self._plan_requests(nodes), budget))
+            budget -= len(requests)
+            abs_path = self.repo_manager.get_absolute_path(file_path)
+            pending_files.append(PendingFile(abs_path, tree, requests))
+        return pending_files
+
+    async def _generate_docstrings(self, pending_files: List[PendingFile]) -> None:
+        """Run all planned docstring requests with bounded concurrency.
+
+        Failed requests are reported and skipped, so one bad response does
+        not discard the docstrings already generated for other nodes.
+
+        Args:
+            pending_files: Files whose planned requests need to be sent
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate(pending_file: PendingFile, nodes: Dict[str, str]) -> None:
+            async with semaphore:
+                file_path = self.repo_manager.get_relative_path(pending_file.file_path)
+                # Each request runs in its own task, so attribution cannot leak
+                with attribute_to_file(file_path):
+                    try:
+                        with get_telemetry().step(
+                            "generate_docstring", nodes=len(nodes)
+                        ):
+                            if self.batch:
+                                docstrings = await self._generate_docstring_batch(nodes)
+                            else:
+                                ((name, code),) = nodes.items()
+                                docstrings = {
+                                    name: await self._generate_docstring(code, name)
+                                }
+                    except Exception as e:
+                        print(
+                            f"  Failed to generate docstring for {', '.join(nodes)}: {e}"
+                        )
+                        return
+                    finally:
+                        self.api_calls_made += 1
+            pending_file.docstrings.update(docstrings)
+
+        await asyncio.gather(
+            *(
+                generate(pending_file, nodes)
+                for pending_file in pending_files
+                for nodes in pending_file.requests
             )
-            self._fix_file_docstrings(abs_path)
+        )
+
+    def _apply_docstrings(
+        self, pending_files: List[PendingFile], executor: Optional[Executor] = None
+    ) -> None:
+        """Write the generated docstrings back to their files.
+
+        Args:
+            pending_files: Files with the generated docstrings to apply
+            executor: Process pool to render files in, or None to render them here
+        """
+        pending_files = [f for f in pending_files if f.docstrings]
+        if executor is None:
+            codes = (
+                f.tree.visit(DocstringTransformer(f.docstrings)).code
+                for f in pending_files
+            )
+        else:
+            codes = executor.map(
+                _render_file_in_worker,
+                [f.file_path for f in pending_files],
+                [f.docstrings for f in pending_files],
+            )
+
+        for pending_file, code in zip(pending_files, codes):
+            # Write the modified code back to the file
+            file_path = pending_file.file_path
+            print(f"  Writing changes to {file_path}...")
+            file_path.write_text(code)
+            self.file_getter.invalidate(file_path)
+            print("  Successfully updated file with new docstrings")
+            self.modified_files.append(
+                str(self.repo_manager.get_relative_path(file_path))
+            )
+
+    def run(self, paths: Optional[List[str]] = None) -> list[str]:
+        """Run the docstring fixer on all files missing docstrings.
+
+        In changed-only mode, only the Python files touched according to git
+        are analyzed, and only the functions and classes spanning a changed line.
+        Every run has its own API call budget and list of modified files.
+
+        Args:
+            paths: Repository-relative files to document, instead of the whole
+                   repository
+
+        Returns:
+            The repository-relative paths of the modified files
+        """
+        self.modified_files = []
+        self.api_calls_made = 0
+        if self.changed_only:
+            git_diff = GitDiff(self.repo_manager.path())
+            self.changed_lines = git_diff.get_changed_lines(self.since)
+            changed = sorted(self.changed_lines)
+            paths = changed if paths is None else sorted(set(paths) & set(changed))
+            print(f"Changed Python files: {len(paths)}")
+
+        files, initial_coverage = self.file_getter.get_files_and_coverage(paths=paths)
+        if not files:
+            print("No files need docstring improvements!")
+            return []
+
+        print(f"Files missing docstrings: {len(files)}")
+
+        telemetry = get_telemetry()
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            with telemetry.step("collect_nodes", files=len(files)):
+                pending_files = self._collect_pending_files(files, executor)
+            if pending_files:
+                requests = [nodes for f in pending_files for nodes in f.requests]
+                print(
+                    f"\nGenerating {sum(map(len, requests))} docstrings in "
+                    f"{len(requests)} requests (concurrency: {self.concurrency})"
+                )
+                with telemetry.step("generate_docstrings", requests=len(requests)):
+                    asyncio.run(self._generate_docstrings(pending_files))
+
+            with telemetry.step("apply_docstrings"):
+                self._apply_docstrings(pending_files, executor)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
 
         # Show coverage improvement
-        final_stats = self.file_getter.get_coverage_stats()
+        final_stats = self.file_getter.get_coverage_stats(paths=paths)
         improvement = final_stats.coverage_percentage - initial_coverage
 
         improvement_str = f"+{improvement:.1f}%"
@@ -224,3 +676,16 @@ class AmbrogioDocstring:
         print(f"  Coverage: {final_stats.coverage_percentage:.1f}% {improvement_str}")
 
         return self.modified_files
+
+
+def _collect_nodes_in_worker(
+    file_path: Path, changed_lines: Optional[Set[int]]
+) -> Dict[str, str]:
+    """Collect the nodes of a file in a worker process, leaving the tree behind."""
+    return AmbrogioDocstring._collect_file_nodes(file_path, changed_lines)[1]
+
+
+def _render_file_in_worker(file_path: Path, docstring_map: Dict[str, str]) -> str:
+    """Parse a file in a worker process and render it with the given docstrings."""
+    tree = cst.parse_module(file_path.read_text())
+    return tree.visit(DocstringTransformer(docstring_map)).code
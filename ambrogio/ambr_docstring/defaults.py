@@ -0,0 +1,13 @@
+"""Defaults of the docstring mode, importable without its dependencies."""
+
+# Default maximum number of OpenAI API calls per run
+DEFAULT_MAX_API_CALLS = 12
+
+# Default number of docstring requests in flight at the same time
+DEFAULT_CONCURRENCY = 1
+
+# Default number of processes parsing and rewriting files
+DEFAULT_WORKERS = 1
+
+# Default maximum number of code tokens packed into one batched request
+DEFAULT_BATCH_TOKEN_BUDGET = 3000
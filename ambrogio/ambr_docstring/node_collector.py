@@ -1,21 +1,74 @@
-from typing import Dict, List
+import ast
+import textwrap
+from typing import Dict, List, Optional, Tuple, Union
 
 import libcst as cst
 
+DefinitionSpan = Tuple[str, int, int]
+
 
 class NodeNeedingDocstring(cst.CSTVisitor):
-    """Collect nodes that need docstrings."""
+    """Collect nodes that need docstrings.
+
+    When the module source is given, the line span of every collected node is
+    recorded in ``node_lines`` and node code is sliced from the source instead
+    of being re-rendered from the tree.
+    """
 
-    def __init__(self):
-        """Initialize the node collector."""
+    def __init__(self, source: Optional[str] = None):
+        """Initialize the node collector.
+
+        Args:
+            source: Source code of the visited module, used to slice node code
+        """
         super().__init__()
+        self.source_lines = source.splitlines(keepends=True) if source else None
+        self.definition_spans = self._get_definition_spans(source) if source else None
         self.nodes_needing_docstrings: Dict[str, str] = {}
+        self.node_lines: Dict[str, Tuple[int, int]] = {}
         self.current_path: List[str] = []
+        self._definition_index = 0
 
     @staticmethod
-    def get_qualified_name(node_name: str) -> str:
-        """Get fully qualified name for the current node."""
-        return node_name
+    def _get_definition_spans(source: str) -> Optional[List[DefinitionSpan]]:
+        """List the name and line span of every class and function, in source order.
+
+        The builtin ast parser computes line numbers far faster than libcst
+        position metadata, which has to render the whole module to find them.
+
+        Args:
+            source: Source code of the module
+
+        Returns:
+            Name, first line (decorators included) and last line of every
+            definition, or None if the source cannot be parsed.
+        """
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return None
+        definitions = [
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+        definitions.sort(key=lambda node: (node.lineno, node.col_offset))
+        return [
+            (
+                node.name,
+                min([node.lineno] + [d.lineno for d in node.decorator_list]),
+                node.end_lineno,
+            )
+            for node in definitions
+        ]
+
+    def get_qualified_name(self, node_name: str) -> str:
+        """Get fully qualified name for the current node.
+
+        Nested definitions are prefixed with the names of their enclosing
+        classes and functions, e.g. ``Parser.run`` or ``build.helper``.
+        """
+        return ".".join(self.current_path + [node_name])
 
     @staticmethod
     def _has_docstring(node: cst.CSTNode) -> bool:
@@ -29,19 +82,69 @@ class NodeNeedingDocstring(cst.CSTVisitor):
                     return isinstance(stmt.body[0].value, cst.SimpleString)
         return False
 
-    @staticmethod
-    def _get_node_code(node: cst.CSTNode) -> str:
-        """Get the source code of a node."""
-        return cst.Module([node]).code.strip()
+    def _get_node_lines(
+        self, node: Union[cst.ClassDef, cst.FunctionDef]
+    ) -> Optional[Tuple[int, int]]:
+        """Get the first and last line of a node, decorators included, if known.
+
+        Definitions are visited in source order, so every visited node is
+        matched with the next span. A name mismatch disables slicing for the
+        rest of the module rather than risking wrong code.
+        """
+        if not self.definition_spans or self._definition_index >= len(
+            self.definition_spans
+        ):
+            return None
+        name, start, end = self.definition_spans[self._definition_index]
+        self._definition_index += 1
+        if name != node.name.value:
+            self.definition_spans = None
+            return None
+        return start, end
+
+    def _get_node_code(
+        self, node: cst.CSTNode, lines: Optional[Tuple[int, int]] = None
+    ) -> str:
+        """Get the source code of a node.
+
+        The code is sliced from the module source when its position is known,
+        which avoids rendering a new module for every node.
+        """
+        if self.source_lines is None or lines is None:
+            return cst.Module([node]).code.strip()
+        start, end = lines
+        return textwrap.dedent("".join(self.source_lines[start - 1 : end])).strip()
+
+    def _record_node(
+        self, qualified_name: str, node: Union[cst.ClassDef, cst.FunctionDef]
+    ) -> None:
+        """Store the code, and the line span if known, of a visited node.
+
+        Every definition advances the span index, documented or not.
+        """
+        lines = self._get_node_lines(node)
+        if self._has_docstring(node):
+            return
+        self.nodes_needing_docstrings[qualified_name] = self._get_node_code(node, lines)
+        if lines:
+            self.node_lines[qualified_name] = lines
 
     def visit_ClassDef(self, node: cst.ClassDef) -> None:
         """Visit a class definition node."""
-        if not self._has_docstring(node):
-            qualified_name = self.get_qualified_name(node.name.value)
-            self.nodes_needing_docstrings[qualified_name] = self._get_node_code(node)
+        qualified_name = self.get_qualified_name(node.name.value)
+        self._record_node(qualified_name, node)
+        self.current_path.append(node.name.value)
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        """Leave the scope of a class definition node."""
+        self.current_path.pop()
 
     def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
         """Visit a function definition node."""
-        if not self._has_docstring(node):
-            qualified_name = self.get_qualified_name(node.name.value)
-            self.nodes_needing_docstrings[qualified_name] = self._get_node_code(node)
+        qualified_name = self.get_qualified_name(node.name.value)
+        self._record_node(qualified_name, node)
+        self.current_path.append(node.name.value)
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        """Leave the scope of a function definition node."""
+        self.current_path.pop()
@@ -0,0 +1,175 @@
+"""Persistent completion cache for Ambrogio."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# File name of the completion cache inside Ambrogio's cache directory
+CACHE_FILE_NAME = "completions.sqlite"
+
+# Default maximum number of cached completions
+DEFAULT_MAX_ENTRIES = 10_000
+
+# Default maximum age of a cached completion, in seconds (30 days)
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a completion cache."""
+
+    hits: int
+    misses: int
+    entries: int
+
+
+class CompletionCache:
+    """SQLite-backed cache of LLM completions keyed by request content.
+
+    Entries are addressed by a hash of everything that influences the
+    completion, so re-running Ambrogio on unchanged code replays previous
+    answers instead of calling the provider. The cache is bounded both in
+    number of entries (least recently used are dropped first) and in age.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        """Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of completions to keep
+            max_age: Maximum age of a completion in seconds
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS completions_accessed_at "
+                "ON completions (accessed_at)"
+            )
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        api_base: Optional[str],
+        **kwargs: Any,
+    ) -> str:
+        """Build the content address of a completion request.
+
+        Args:
+            model: Model identifier
+            messages: Messages sent to the model
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            api_base: Base URL of the API endpoint
+            **kwargs: Any additional completion arguments
+
+        Returns:
+            A hex digest identifying the request
+        """
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "api_base": api_base,
+                "kwargs": kwargs,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached completion.
+
+        Args:
+            key: Content address returned by make_key
+
+        Returns:
+            The cached completion, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT response FROM completions WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """Store a completion and evict stale or excess entries.
+
+        Args:
+            key: Content address returned by make_key
+            response: Completion text to cache
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM completions WHERE created_at < ?", (now - self.max_age,)
+            )
+            self._connection.execute(
+                """DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        """Remove every cached completion."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM completions")
+
+    def stats(self) -> CacheStats:
+        """Get the cache counters.
+
+        Returns:
+            CacheStats with the hits and misses of this process and the stored entries
+        """
+        with self._lock:
+            (entries,) = self._connection.execute(
+                "SELECT COUNT(*) FROM completions"
+            ).fetchone()
+        return CacheStats(hits=self.hits, misses=self.misses, entries=entries)
@@ -1,7 +1,51 @@
 """LiteLLM manager module for Ambrogio."""
 
-from typing import Optional, Dict, Any, ClassVar
-from litellm import completion
+import asyncio
+import inspect
+import itertools
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterator,
+    Optional,
+)
+from litellm import (
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+    ServiceUnavailableError,
+    Timeout,
+    acompletion,
+    completion,
+    cost_per_token,
+    token_counter,
+)
+
+from ambrogio.llm_cache import CompletionCache
+from ambrogio.rate_limiter import (
+    DEFAULT_MAX_RETRIES,
+    configure_rate_limit,
+    get_backoff_delay,
+    get_rate_limiter,
+)
+from ambrogio.telemetry import get_telemetry
+
+# Errors worth retrying: provider throttling and transient failures
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    Timeout,
+    ServiceUnavailableError,
+    InternalServerError,
+)
+
+# Tells, from the text generated so far, whether the caller has what it needs
+StopCondition = Callable[[str], bool]
 
 
 class LLMManager:
@@ -17,7 +61,15 @@ class LLMManager:
 
     @classmethod
     def initialize(
-        cls, api_key: str, model: str = "gpt-4o-mini", api_base: Optional[str] = None
+        cls,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        api_base: Optional[str] = None,
+        cache_path: Optional[Path] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backend: Optional[Any] = None,
     ) -> "LLMManager":
         """Initialize the LLM manager singleton.
 
@@ -25,13 +77,30 @@ class LLMManager:
             api_key: API key for the LLM provider
             model: Model identifier (default: gpt-3.5-turbo)
             api_base: Optional base URL for the API endpoint
+            cache_path: Optional path of the on-disk completion cache.
+                        If not provided, completions are not cached.
+            requests_per_minute: Optional request quota of the model
+            tokens_per_minute: Optional token quota of the model
+            max_retries: Maximum retries of a throttled or failed request
+            backend: Optional object whose completion and acompletion methods
+                     are called instead of litellm's, e.g. a fake backend
+                     for benchmarks
 
         Returns:
             The singleton instance
         """
         instance = cls()
         if not instance._initialized:
-            instance._init(api_key, model, api_base)
+            instance._init(
+                api_key,
+                model,
+                api_base,
+                cache_path,
+                requests_per_minute,
+                tokens_per_minute,
+                max_retries,
+                backend,
+            )
             instance._initialized = True
         return instance
 
@@ -56,6 +125,11 @@ class LLMManager:
         api_key: str,
         model: str = "gpt-4o-mini",
         api_base: Optional[str] = None,
+        cache_path: Optional[Path] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backend: Optional[Any] = None,
     ) -> None:
         """Internal initialization method.
 
@@ -63,16 +137,421 @@ class LLMManager:
             api_key: API key for the LLM provider
             model: Model identifier (default: gpt-3.5-turbo)
             api_base: Optional base URL for the API endpoint
+            cache_path: Optional path of the on-disk completion cache
+            requests_per_minute: Optional request quota of the model
+            tokens_per_minute: Optional token quota of the model
+            max_retries: Maximum retries of a throttled or failed request
+            backend: Optional replacement of litellm's completion functions
         """
         self.api_key = api_key
         self.model = model
         self.api_base = api_base
+        self.cache = CompletionCache(cache_path) if cache_path else None
+        self.max_retries = max_retries
+        self.backend = backend
+        if requests_per_minute or tokens_per_minute:
+            self.rate_limiter = configure_rate_limit(
+                model, requests_per_minute, tokens_per_minute
+            )
+        else:
+            self.rate_limiter = get_rate_limiter(model)
+
+    def _completion(self, **request: Any) -> Any:
+        """Send a request through the backend, litellm unless replaced."""
+        if self.backend is not None:
+            return self.backend.completion(**request)
+        return completion(**request)
+
+    async def _acompletion(self, **request: Any) -> Any:
+        """Send a request through the backend without blocking the event loop."""
+        if self.backend is not None:
+            return await self.backend.acompletion(**request)
+        return await acompletion(**request)
+
+    def count_tokens(self, text: str) -> int:
+        """Estimate the number of tokens of a text for the configured model.
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Number of tokens according to the model tokenizer
+        """
+        return token_counter(model=self.model, text=text)
+
+    def _get_cache_key(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        use_cache: bool,
+        kwargs: Dict[str, Any],
+    ) -> Optional[str]:
+        """Get the cache key of a request, or None if it must not be cached."""
+        if not use_cache or not self.cache:
+            return None
+        return self.cache.make_key(
+            self.model, messages, temperature, max_tokens, self.api_base, **kwargs
+        )
+
+    def _build_request(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Build the keyword arguments shared by litellm.completion and acompletion."""
+        return dict(
+            model=self.model,
+            messages=messages,
+            api_key=self.api_key,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_base=self.api_base,
+            **kwargs,
+        )
+
+    def _estimate_tokens(
+        self, messages: list[dict[str, str]], max_tokens: Optional[int]
+    ) -> int:
+        """Estimate the tokens of a request, when the rate limiter needs them."""
+        if not self.rate_limiter.limits_tokens:
+            return 0
+        return token_counter(model=self.model, messages=messages) + (max_tokens or 0)
+
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float:
+        """Compute the backoff before retrying a failed attempt.
+
+        Throttling errors also pause the shared rate limiter, so that other
+        threads and tasks wait instead of hitting the same limit.
+        """
+        delay = get_backoff_delay(error, attempt)
+        if isinstance(error, RateLimitError):
+            self.rate_limiter.pause(delay)
+        print(
+            f"  LLM request failed ({type(error).__name__}), "
+            f"retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})"
+        )
+        return delay
+
+    def _record_call(
+        self,
+        started: float,
+        retries: int = 0,
+        cache_hit: bool = False,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        **fields: Any,
+    ) -> None:
+        """Record a completion call in the run telemetry, if enabled.
+
+        Args:
+            started: time.perf_counter() value when the call started
+            retries: Number of failed attempts before the call succeeded
+            cache_hit: Whether the completion was served by the cache
+            prompt_tokens: Tokens of the prompt, if the provider was called
+            completion_tokens: Tokens of the completion, if the provider was called
+            **fields: Further details of the call
+        """
+        telemetry = get_telemetry()
+        if not telemetry.enabled:
+            return
+        cost = None
+        if prompt_tokens is not None and completion_tokens is not None:
+            try:
+                cost = sum(
+                    cost_per_token(
+                        model=self.model,
+                        prompt_tokens=prompt_tokens,
+                        completion_tokens=completion_tokens,
+                    )
+                )
+            except Exception:
+                pass  # Unknown model pricing, e.g. a local model
+        telemetry.record(
+            "llm_call",
+            model=self.model,
+            latency=time.perf_counter() - started,
+            cache_hit=cache_hit,
+            retries=retries,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost,
+            **fields,
+        )
+
+    def _record_response(self, response: Any, started: float, retries: int) -> None:
+        """Record a completion call, with the token usage reported by the provider."""
+        usage = getattr(response, "usage", None)
+        self._record_call(
+            started,
+            retries,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+
+    def _record_stream(
+        self,
+        messages: list[dict[str, str]],
+        text: str,
+        started: float,
+        retries: int,
+        stopped: bool,
+    ) -> None:
+        """Record a streamed completion call, counting its tokens."""
+        if not get_telemetry().enabled:
+            return
+        self._record_call(
+            started,
+            retries,
+            prompt_tokens=token_counter(model=self.model, messages=messages),
+            completion_tokens=self.count_tokens(text),
+            stream=True,
+            stopped=stopped,
+        )
+
+    def _handle_response(
+        self, response: Any, cache_key: Optional[str], estimated_tokens: int = 0
+    ) -> str:
+        """Extract the generated text from a response and cache it if requested."""
+        usage = getattr(response, "usage", None)
+        if usage and getattr(usage, "total_tokens", None):
+            self.rate_limiter.settle(estimated_tokens, usage.total_tokens)
+
+        content = response.choices[0].message.content
+        if cache_key and content is not None:
+            self.cache.set(cache_key, content)
+        return content
+
+    def _get_stream_cache_key(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        use_cache: bool,
+        stop_condition: Optional[StopCondition],
+        kwargs: Dict[str, Any],
+    ) -> Optional[str]:
+        """Get the cache key of a streamed request.
+
+        A stream cut short by a stop condition holds less than the full
+        completion, so the condition is part of the key: its ``cache_key``
+        attribute if it has one, else the module and qualified name of a plain
+        function. Lambdas, closures and other callables may stop differently
+        under the same name, so their streams are not cached.
+        """
+        if stop_condition is not None:
+            name = getattr(stop_condition, "cache_key", None)
+            if name is None:
+                if (
+                    not inspect.isfunction(stop_condition)
+                    or "<lambda>" in stop_condition.__qualname__
+                    or stop_condition.__closure__
+                ):
+                    return None
+                name = f"{stop_condition.__module__}.{stop_condition.__qualname__}"
+            kwargs = dict(kwargs, stop_condition=name)
+        return self._get_cache_key(messages, temperature, max_tokens, use_cache, kwargs)
+
+    @staticmethod
+    def _get_chunk_text(chunk: Any) -> str:
+        """Extract the generated text of a streamed chunk."""
+        choices = getattr(chunk, "choices", None)
+        if not choices:
+            return ""
+        delta = getattr(choices[0], "delta", None)
+        return getattr(delta, "content", None) or ""
+
+    @staticmethod
+    def _close_stream(stream: Any) -> None:
+        """Close the connection of an unfinished stream, ending the generation."""
+        close = getattr(getattr(stream, "completion_stream", None), "close", None)
+        if callable(close):
+            close()
+
+    def _finish_stream(
+        self,
+        messages: list[dict[str, str]],
+        text: str,
+        cache_key: Optional[str],
+        estimated_tokens: int,
+    ) -> None:
+        """Settle the rate limiter and cache the text of a consumed stream."""
+        if estimated_tokens:
+            actual_tokens = token_counter(
+                model=self.model, messages=messages
+            ) + self.count_tokens(text)
+            self.rate_limiter.settle(estimated_tokens, actual_tokens)
+        if cache_key:
+            self.cache.set(cache_key, text)
+
+    def stream_completion(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        stop_condition: Optional[StopCondition] = None,
+        **kwargs: Dict[str, Any],
+    ) -> Iterator[str]:
+        """Stream a completion from LiteLLM, chunk by chunk.
+
+        Once stop_condition returns True for the text received so far, the
+        stream is closed, which ends the generation instead of paying for
+        output the caller does not need. Closing the generator early does the
+        same. Only streams read to their end or to their stop are cached, and
+        only if the stop condition is a named module-level function or has a
+        ``cache_key`` attribute.
+
+        Args:
+            messages: List of message dictionaries, each with 'role' and 'content' keys
+            temperature: Sampling temperature (default: 0.7)
+            max_tokens: Maximum tokens to generate (default: None)
+            use_cache: Whether to serve and store the completion through the
+                       on-disk cache, if one is configured (default: True)
+            stop_condition: Optional function called with the text generated
+                            so far after each chunk
+            **kwargs: Additional arguments to pass to litellm.completion
+
+        Yields:
+            Generated text chunks. A cached completion is yielded at once.
+
+        Raises:
+            Exception: Any error of litellm.completion, once throttling and
+                       transient errors met before the first chunk have
+                       exhausted their retries
+        """
+        kwargs.pop("messages", None)
+        kwargs.pop("stream", None)
+
+        cache_key = self._get_stream_cache_key(
+            messages, temperature, max_tokens, use_cache, stop_condition, kwargs
+        )
+        started = time.perf_counter()
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_call(started, cache_hit=True, stream=True)
+                yield cached
+                return
+
+        request = self._build_request(messages, temperature, max_tokens, kwargs)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        for attempt in itertools.count():
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                stream = self._completion(stream=True, **request)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._get_retry_delay(e, attempt))
+
+        text = ""
+        finished = stopped = False
+        try:
+            for chunk in stream:
+                content = self._get_chunk_text(chunk)
+                if not content:
+                    continue
+                text += content
+                yield content
+                if stop_condition and stop_condition(text):
+                    stopped = True
+                    break
+            finished = True
+        finally:
+            self._close_stream(stream)
+            self._record_stream(
+                messages, text, started, attempt, stopped=stopped or not finished
+            )
+        if finished:
+            self._finish_stream(messages, text, cache_key, estimated_tokens)
+
+    async def astream_completion(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        stop_condition: Optional[StopCondition] = None,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Stream a completion from LiteLLM without blocking the event loop.
+
+        This is the asynchronous counterpart of stream_completion, with the
+        same arguments, caching, rate limiting, retries and exceptions.
+
+        Args:
+            messages: List of message dictionaries, each with 'role' and 'content' keys
+            temperature: Sampling temperature (default: 0.7)
+            max_tokens: Maximum tokens to generate (default: None)
+            use_cache: Whether to serve and store the completion through the
+                       on-disk cache, if one is configured (default: True)
+            stop_condition: Optional function called with the text generated
+                            so far after each chunk
+            **kwargs: Additional arguments to pass to litellm.acompletion
+
+        Yields:
+            Generated text chunks. A cached completion is yielded at once.
+        """
+        kwargs.pop("messages", None)
+        kwargs.pop("stream", None)
+
+        cache_key = self._get_stream_cache_key(
+            messages, temperature, max_tokens, use_cache, stop_condition, kwargs
+        )
+        started = time.perf_counter()
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_call(started, cache_hit=True, stream=True)
+                yield cached
+                return
+
+        request = self._build_request(messages, temperature, max_tokens, kwargs)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        for attempt in itertools.count():
+            await self.rate_limiter.aacquire(estimated_tokens)
+            try:
+                stream = await self._acompletion(stream=True, **request)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._get_retry_delay(e, attempt))
+
+        text = ""
+        finished = stopped = False
+        try:
+            async for chunk in stream:
+                content = self._get_chunk_text(chunk)
+                if not content:
+                    continue
+                text += content
+                yield content
+                if stop_condition and stop_condition(text):
+                    stopped = True
+                    break
+            finished = True
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if callable(aclose):
+                await aclose()
+            self._record_stream(
+                messages, text, started, attempt, stopped=stopped or not finished
+            )
+        if finished:
+            self._finish_stream(messages, text, cache_key, estimated_tokens)
 
     def get_completion(
         self,
         messages: list[dict[str, str]],
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        stop_condition: Optional[StopCondition] = None,
         **kwargs: Dict[str, Any],
     ) -> str:
         """Get completion from LiteLLM.
@@ -83,22 +562,125 @@ class LLMManager:
                               {"role": "user", "content": "Hello"}]
             temperature: Sampling temperature (default: 0.7)
             max_tokens: Maximum tokens to generate (default: None)
+            use_cache: Whether to serve and store the completion through the
+                       on-disk cache, if one is configured (default: True)
+            stop_condition: Optional function called with the text generated
+                            so far; if given, the completion is streamed and
+                            cut short once it returns True
             **kwargs: Additional arguments to pass to litellm.completion
 
         Returns:
             Generated text response
+
+        Raises:
+            Exception: Any error of litellm.completion, once throttling and
+                       transient errors have exhausted their retries
         """
+        if stop_condition is not None:
+            return "".join(
+                self.stream_completion(
+                    messages,
+                    temperature,
+                    max_tokens,
+                    use_cache,
+                    stop_condition,
+                    **kwargs,
+                )
+            )
+
         # Remove messages from kwargs if present to avoid conflicts
         kwargs.pop("messages", None)
 
-        response = completion(
-            model=self.model,
-            messages=messages,
-            api_key=self.api_key,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            api_base=self.api_base,
-            **kwargs,
+        cache_key = self._get_cache_key(
+            messages, temperature, max_tokens, use_cache, kwargs
+        )
+        started = time.perf_counter()
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_call(started, cache_hit=True)
+                return cached
+
+        request = self._build_request(messages, temperature, max_tokens, kwargs)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        for attempt in itertools.count():
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self._completion(**request)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._get_retry_delay(e, attempt))
+        self._record_response(response, started, attempt)
+        return self._handle_response(response, cache_key, estimated_tokens)
+
+    async def aget_completion(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        stop_condition: Optional[StopCondition] = None,
+        **kwargs: Dict[str, Any],
+    ) -> str:
+        """Get completion from LiteLLM without blocking the event loop.
+
+        This is the asynchronous counterpart of get_completion, with the same
+        arguments, caching, rate limiting, retries and exceptions. LiteLLM
+        keeps its provider clients cached per process, so concurrent calls
+        share the same connection pool. Cancelling the awaiting task cancels
+        the underlying request, and a cancelled request is never cached.
+
+        Args:
+            messages: List of message dictionaries, each with 'role' and 'content' keys
+            temperature: Sampling temperature (default: 0.7)
+            max_tokens: Maximum tokens to generate (default: None)
+            use_cache: Whether to serve and store the completion through the
+                       on-disk cache, if one is configured (default: True)
+            stop_condition: Optional function called with the text generated
+                            so far; if given, the completion is streamed and
+                            cut short once it returns True
+            **kwargs: Additional arguments to pass to litellm.acompletion
+
+        Returns:
+            Generated text response
+        """
+        if stop_condition is not None:
+            chunks = []
+            async for chunk in self.astream_completion(
+                messages,
+                temperature,
+                max_tokens,
+                use_cache,
+                stop_condition,
+                **kwargs,
+            ):
+                chunks.append(chunk)
+            return "".join(chunks)
+
+        kwargs.pop("messages", None)
+
+        cache_key = self._get_cache_key(
+            messages, temperature, max_tokens, use_cache, kwargs
         )
+        started = time.perf_counter()
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_call(started, cache_hit=True)
+                return cached
 
-        return response.choices[0].message.content
+        request = self._build_request(messages, temperature, max_tokens, kwargs)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        for attempt in itertools.count():
+            await self.rate_limiter.aacquire(estimated_tokens)
+            try:
+                response = await self._acompletion(**request)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._get_retry_delay(e, attempt))
+        self._record_response(response, started, attempt)
+        return self._handle_response(response, cache_key, estimated_tokens)
@@ -0,0 +1,265 @@
+"""Client-side rate limiting and retry backoff for Ambrogio."""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Default number of retries of a throttled or failed completion request
+DEFAULT_MAX_RETRIES = 5
+
+# Base delay of the exponential backoff, in seconds
+DEFAULT_BASE_DELAY = 1.0
+
+# Maximum delay between two attempts, in seconds
+DEFAULT_MAX_DELAY = 60.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a fixed rate.
+
+    Callers reserve capacity up front and are told how long to wait before
+    using it, which lets the same bucket pace both threads and asyncio tasks.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """Initialize a full bucket.
+
+        Args:
+            capacity: Maximum number of tokens the bucket can hold
+            refill_per_second: Number of tokens added back every second
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take tokens from the bucket, going into debt if needed.
+
+        Args:
+            amount: Number of tokens to take. Requests larger than the bucket
+                    capacity are clamped so that they can eventually proceed.
+
+        Returns:
+            Number of seconds to wait before the reserved tokens are available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated_at) * self.refill_per_second,
+            )
+            self._updated_at = now
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_second
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens that were reserved but not used.
+
+        Args:
+            amount: Number of tokens to give back. Negative amounts charge extra
+                    tokens that were used beyond the reservation.
+        """
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Paces requests and tokens per minute for one model.
+
+    On top of the token buckets, the limiter can be paused when the provider
+    throttles a request, so that every thread and task backs off together
+    instead of each one discovering the limit with its own failed call.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum requests per minute, or None for no limit
+            tokens_per_minute: Maximum prompt and completion tokens per minute,
+                               or None for no limit
+        """
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute
+            else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+            if tokens_per_minute
+            else None
+        )
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether the limiter needs token estimates for its requests."""
+        return self.token_bucket is not None
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve capacity for one request.
+
+        Args:
+            tokens: Estimated prompt and completion tokens of the request
+
+        Returns:
+            Number of seconds to wait before sending the request
+        """
+        delays = [0.0]
+        with self._lock:
+            delays.append(self._paused_until - time.monotonic())
+        if self.request_bucket:
+            delays.append(self.request_bucket.reserve(1))
+        if self.token_bucket and tokens:
+            delays.append(self.token_bucket.reserve(tokens))
+        return max(delays)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block the current thread until a request may be sent.
+
+        Args:
+            tokens: Estimated prompt and completion tokens of the request
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Wait, without blocking the event loop, until a request may be sent.
+
+        Args:
+            tokens: Estimated prompt and completion tokens of the request
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known.
+
+        Args:
+            estimated_tokens: Tokens reserved before sending the request
+            actual_tokens: Tokens reported by the provider
+        """
+        if self.token_bucket and estimated_tokens:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request of this limiter for a while.
+
+        Args:
+            seconds: How long to wait before sending the next request
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def configure_rate_limit(
+    model: str,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> RateLimiter:
+    """Set the request and token quota of a model for the whole process.
+
+    Args:
+        model: Model identifier
+        requests_per_minute: Maximum requests per minute, or None for no limit
+        tokens_per_minute: Maximum tokens per minute, or None for no limit
+
+    Returns:
+        The limiter now shared by every caller of the model
+    """
+    with _rate_limiters_lock:
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        _rate_limiters[model] = limiter
+        return limiter
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """Get the limiter shared by every caller of a model.
+
+    Args:
+        model: Model identifier
+
+    Returns:
+        The configured limiter, or an unlimited one that only applies backoff pauses
+    """
+    with _rate_limiters_lock:
+        return _rate_limiters.setdefault(model, RateLimiter())
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Read the delay requested by the provider from an error's response headers.
+
+    Args:
+        error: Exception raised by the completion call
+
+    Returns:
+        The requested delay in seconds, or None if the provider did not send one
+    """
+    headers = getattr(error, "headers", None)
+    if not headers:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    headers = {str(key).lower(): value for key, value in dict(headers).items()}
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff_delay(
+    error: Exception,
+    attempt: int,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+) -> float:
+    """Compute how long to wait before retrying a failed request.
+
+    The provider's Retry-After header wins when present; otherwise the delay
+    is drawn with full jitter from an exponentially growing window.
+
+    Args:
+        error: Exception raised by the failed attempt
+        attempt: Number of attempts already failed, starting from 0
+        base_delay: Delay window of the first retry, in seconds
+        max_delay: Upper bound of the delay, in seconds
+
+    Returns:
+        Number of seconds to wait
+    """
+    retry_after = get_retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, max_delay) + random.uniform(0, base_delay)
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
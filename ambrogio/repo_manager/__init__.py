@@ -1,7 +1,25 @@
+from importlib import import_module
+
 from .repo_manager import RepoPathManager
-from .file_getter import FileGetter
+from .git_diff import GitDiff
+from .repo_index import RepoIndex
+from .file_discovery import FileDiscovery
+
+# Names imported on first access, as their modules load interrogate
+_LAZY_IMPORTS = {
+    "FileGetter": ".file_getter",
+}
 
 __all__ = [
     "RepoPathManager",
     "FileGetter",
+    "GitDiff",
+    "RepoIndex",
+    "FileDiscovery",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
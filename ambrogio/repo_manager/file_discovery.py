@@ -0,0 +1,336 @@
+"""Gitignore-aware discovery of the Python files of a repository."""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+# Directories never searched, besides hidden ones and virtual environments
+DEFAULT_EXCLUDED_DIRS = frozenset(
+    {"__pycache__", "node_modules", "site-packages", "venv", "env"}
+)
+
+# File marking the root of a virtual environment, whatever its name
+VENV_MARKER = "pyvenv.cfg"
+
+# Size and modification time of a file
+FileStamp = Tuple[int, int]
+
+
+def _translate(pattern: str) -> str:
+    """Translate the glob of a gitignore pattern into a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """One pattern of a .gitignore file."""
+
+    base: str
+    regex: Pattern[str]
+    negated: bool
+    dir_only: bool
+
+    @classmethod
+    def parse(cls, line: str, base: str = "") -> Optional["IgnoreRule"]:
+        """Parse a .gitignore line.
+
+        Args:
+            line: Line of the file
+            base: Repository-relative directory of the file, "" for the root
+
+        Returns:
+            The rule, or None for blank lines and comments
+        """
+        line = line.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        # A slash anywhere but at the end anchors the pattern to its directory
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        return cls(base, re.compile(f"^{regex}$"), negated, dir_only)
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """Tell whether the rule applies to a repository-relative path."""
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1 :]
+        return self.regex.match(rel_path) is not None
+
+
+class GitIgnore:
+    """The .gitignore rules in effect in a directory.
+
+    Rules of deeper .gitignore files come after those of their parents, and
+    the last matching rule decides, as in git.
+    """
+
+    def __init__(self, rules: Sequence[IgnoreRule] = ()):
+        """Initialize the rule set.
+
+        Args:
+            rules: Rules, from the least to the most specific
+        """
+        self.rules = tuple(rules)
+
+    @classmethod
+    def from_patterns(cls, patterns: Sequence[str]) -> "GitIgnore":
+        """Build rules from gitignore patterns relative to the repository root."""
+        rules = (IgnoreRule.parse(pattern) for pattern in patterns)
+        return cls(rule for rule in rules if rule)
+
+    def child(self, dir_path: str, rel_dir: str) -> "GitIgnore":
+        """Get the rules in effect in a directory, adding its own .gitignore.
+
+        Args:
+            dir_path: Path of the directory
+            rel_dir: Repository-relative path of the directory, "" for the root
+        """
+        try:
+            with open(os.path.join(dir_path, ".gitignore"), encoding="utf-8") as f:
+                lines = f.readlines()
+        except (OSError, UnicodeDecodeError):
+            return self
+        rules = [IgnoreRule.parse(line, rel_dir) for line in lines]
+        return GitIgnore(self.rules + tuple(rule for rule in rules if rule))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Tell whether a repository-relative path is ignored."""
+        ignored = False
+        for rule in self.rules:
+            if rule.matches(rel_path, is_dir):
+                ignored = not rule.negated
+        return ignored
+
+
+def _is_walked_dir(entry_path: str, name: str, excluded_dirs: Sequence[str]) -> bool:
+    """Tell whether a directory is searched, ignore rules aside."""
+    return (
+        not name.startswith(".")
+        and name not in excluded_dirs
+        and not os.path.exists(os.path.join(entry_path, VENV_MARKER))
+    )
+
+
+def iter_python_files(
+    root: str,
+    excluded_dirs: Sequence[str] = DEFAULT_EXCLUDED_DIRS,
+    exclude: Sequence[str] = (),
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Walk the Python files of a repository lazily, directory by directory.
+
+    Hidden, excluded and ignored directories, as well as virtual
+    environments, are skipped without being descended into, so that the
+    walk only pays for the files it yields. Stopping the iteration stops
+    the walk.
+
+    Args:
+        root: Repository root
+        excluded_dirs: Names of directories to skip, besides hidden ones
+        exclude: Gitignore patterns of further paths to skip, relative to root
+
+    Yields:
+        The repository-relative path, with "/" separators, and the directory
+        entry of each file
+    """
+    stack: List[Tuple[str, str, GitIgnore]] = [
+        (str(root), "", GitIgnore.from_patterns(exclude))
+    ]
+    while stack:
+        dir_path, rel_dir, ignore = stack.pop()
+        ignore = ignore.child(dir_path, rel_dir)
+        try:
+            with os.scandir(dir_path) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith("."):
+                continue
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if _is_walked_dir(
+                    entry.path, name, excluded_dirs
+                ) and not ignore.is_ignored(rel_path, True):
+                    subdirs.append((entry.path, rel_path, ignore))
+            elif name.endswith(".py") and not ignore.is_ignored(rel_path, False):
+                yield rel_path, entry
+        stack.extend(reversed(subdirs))
+
+
+class FileDiscovery:
+    """Cached listing of the Python files of a repository.
+
+    The tree is walked once, on first use, recording the size and
+    modification time of every file, and every consumer reads that listing
+    instead of walking the tree again. Files written or removed in the
+    meantime are re-stated one by one with update, while refresh walks the
+    tree again to pick up changes made by others.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        exclude: Sequence[str] = (),
+        excluded_dirs: Sequence[str] = DEFAULT_EXCLUDED_DIRS,
+    ):
+        """Initialize the discovery, without walking the tree yet.
+
+        Args:
+            root: Repository root
+            exclude: Gitignore patterns of paths to skip, relative to root
+            excluded_dirs: Names of directories to skip, besides hidden ones
+        """
+        self.root = Path(root)
+        self.exclude = tuple(exclude)
+        self.excluded_dirs = frozenset(excluded_dirs)
+        self._files: Optional[Dict[str, FileStamp]] = None
+        self._lock = threading.Lock()
+
+    def _scan(self) -> Dict[str, FileStamp]:
+        """Walk the tree and stat every file found."""
+        files = {}
+        for rel_path, entry in iter_python_files(
+            str(self.root), self.excluded_dirs, self.exclude
+        ):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def get_files(self) -> Dict[str, FileStamp]:
+        """Get the files of the repository, walking the tree on first use.
+
+        Returns:
+            Mapping of repository-relative paths, with "/" separators, to
+            their size and modification time
+        """
+        with self._lock:
+            if self._files is None:
+                self._files = self._scan()
+            return dict(self._files)
+
+    def refresh(self) -> Set[str]:
+        """Walk the tree again.
+
+        Returns:
+            The paths of the files added, modified or removed since the
+            previous listing, empty on the first walk
+        """
+        files = self._scan()
+        with self._lock:
+            previous, self._files = self._files, files
+        if previous is None:
+            return set()
+        return {
+            path
+            for path in previous.keys() | files.keys()
+            if previous.get(path) != files.get(path)
+        }
+
+    def _is_discovered(self, rel_path: str) -> bool:
+        """Tell whether the walk would list a file, without walking the tree."""
+        parts = rel_path.split("/")
+        if not parts[-1].endswith(".py") or parts[-1].startswith("."):
+            return False
+        ignore = GitIgnore.from_patterns(self.exclude)
+        dir_path, rel_dir = str(self.root), ""
+        for name in parts[:-1]:
+            ignore = ignore.child(dir_path, rel_dir)
+            dir_path = os.path.join(dir_path, name)
+            rel_dir = f"{rel_dir}/{name}" if rel_dir else name
+            if not _is_walked_dir(
+                dir_path, name, self.excluded_dirs
+            ) or ignore.is_ignored(rel_dir, True):
+                return False
+        ignore = ignore.child(dir_path, rel_dir)
+        return not ignore.is_ignored(rel_path, False)
+
+    def update(self, paths: Iterable[Union[str, Path]]) -> None:
+        """Re-stat files written or removed since the tree was walked.
+
+        Args:
+            paths: Absolute or repository-relative paths of the files
+        """
+        with self._lock:
+            if self._files is None:
+                return
+            for path in paths:
+                rel_path = Path(os.path.relpath(self.root / path, self.root)).as_posix()
+                try:
+                    stat = os.stat(self.root / rel_path)
+                except OSError:
+                    self._files.pop(rel_path, None)
+                    continue
+                if rel_path in self._files or self._is_discovered(rel_path):
+                    self._files[rel_path] = (stat.st_size, stat.st_mtime_ns)
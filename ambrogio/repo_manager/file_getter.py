@@ -1,5 +1,7 @@
+import os
 from dataclasses import dataclass
-from typing import Dict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 
 from interrogate import config, coverage
 
@@ -15,11 +17,20 @@ class CoverageResult:
 
 
 class FileGetter:
-    """Class to analyze Python files in the repository for missing docstrings."""
+    """Class to analyze Python files in the repository for missing docstrings.
+
+    Files are taken from the repository's shared discovery, which also
+    provides their size and modification time. Interrogate results are cached
+    per file and keyed by them, so every file is parsed once per run and later
+    reports only re-parse the files that were modified in between.
+    """
 
     def __init__(self):
         """Initialize FileGetter with repo path manager."""
         self.repo_manager = RepoPathManager.get_instance()
+        self._file_results: Dict[
+            str, Tuple[Tuple[int, int], Optional[coverage.InterrogateFileResult]]
+        ] = {}
 
     @staticmethod
     def _get_interrogate_config() -> config.InterrogateConfig:
@@ -38,45 +49,138 @@ class FileGetter:
             ignore_semiprivate=True,  # Ignore _semiprivate objects
         )
 
-    def _run_interrogate(self) -> coverage.InterrogateResults:
+    def _get_file_result(
+        self,
+        interrogate_coverage: coverage.InterrogateCoverage,
+        filename: str,
+        signature: Optional[Tuple[int, int]] = None,
+    ) -> Optional[coverage.InterrogateFileResult]:
+        """Get the interrogate result of a file, reusing it while the file is unchanged.
+
+        Args:
+            interrogate_coverage: Interrogate instance configured for the run
+            filename: Absolute path of the file to analyze
+            signature: Size and modification time of the file, stated if not given
+
+        Returns:
+            The file result, or None if the file has nothing to document.
+        """
+        if signature is None:
+            stat = os.stat(filename)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._file_results.get(filename)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        # Private interrogate API, tested against interrogate 1.7; releases
+        # without it fall back to the slower public run on the single file
+        get_file_coverage = getattr(interrogate_coverage, "_get_file_coverage", None)
+        if get_file_coverage is not None:
+            result = get_file_coverage(filename)
+        else:
+            file_results = (
+                coverage.InterrogateCoverage(
+                    paths=[filename], conf=interrogate_coverage.config
+                )
+                .get_coverage()
+                .file_results
+            )
+            result = file_results[0] if file_results else None
+        self._file_results[filename] = (signature, result)
+        return result
+
+    def _run_interrogate(
+        self, paths: Optional[List[str]] = None
+    ) -> coverage.InterrogateResults:
         """Run interrogate with standard configuration.
 
+        Args:
+            paths: Repository-relative files to analyze. Defaults to the files
+                   listed by the repository's discovery.
+
         Returns:
             InterrogateResults containing coverage analysis.
+
+        Raises:
+            ValueError: If interrogate cannot analyze one of the paths
         """
-        repo_path = self.repo_manager.path()
         conf = self._get_interrogate_config()
-        interrogate_coverage = coverage.InterrogateCoverage(
-            paths=[str(repo_path)], conf=conf
-        )
-        return interrogate_coverage.get_coverage()
+        if paths is None:
+            root = self.repo_manager.path()
+            files = {
+                str(root / rel_path): stamp
+                for rel_path, stamp in self.repo_manager.get_discovery()
+                .get_files()
+                .items()
+            }
+            interrogate_coverage = coverage.InterrogateCoverage(
+                paths=[str(root)], conf=conf
+            )
+        else:
+            paths = [str(self.repo_manager.get_absolute_path(p)) for p in paths]
+            interrogate_coverage = coverage.InterrogateCoverage(paths=paths, conf=conf)
+            try:
+                filenames = (
+                    interrogate_coverage.get_filenames_from_paths() if paths else []
+                )
+            except SystemExit:
+                # interrogate exits on paths it cannot analyze, e.g. non-Python files
+                raise ValueError(f"Invalid paths for interrogate: {paths}") from None
+            files = dict.fromkeys(filenames)
+
+        results = coverage.InterrogateResults()
+        results.file_results = [
+            result
+            for result in (
+                self._get_file_result(interrogate_coverage, filename, signature)
+                for filename, signature in files.items()
+            )
+            if result
+        ]
+        results.combine()
+        return results
+
+    def invalidate(self, file_path: Union[str, Path]) -> None:
+        """Forget the cached result of a file, e.g. after rewriting it.
 
-    def get_coverage_stats(self) -> CoverageResult:
+        Args:
+            file_path: Absolute or repository-relative path of the file
+        """
+        abs_path = self.repo_manager.get_absolute_path(file_path)
+        self._file_results.pop(str(abs_path), None)
+        self.repo_manager.get_discovery().update([abs_path])
+
+    def get_coverage_stats(self, paths: Optional[List[str]] = None) -> CoverageResult:
         """Get current docstring coverage statistics for the repository.
 
+        Args:
+            paths: Repository-relative files to analyze. Defaults to the whole repository.
+
         Returns:
             CoverageResult containing the coverage percentage and count of missing docstrings.
         """
-        results = self._run_interrogate()
+        results = self._run_interrogate(paths)
         return CoverageResult(
             coverage_percentage=results.perc_covered, missing_count=results.missing
         )
 
     def get_files_and_coverage(
-        self, min_coverage: float = 100.0
+        self, min_coverage: float = 100.0, paths: Optional[List[str]] = None
     ) -> (Dict[str, float], float):
         """Retrieve files with coverage below a specified threshold and overall coverage percentage.
 
         Args:
             min_coverage (float): The minimum coverage percentage threshold. Files with coverage below this
                                   value will be included in the results. Defaults to 100.0.
+            paths (Optional[List[str]]): Repository-relative files to analyze. Defaults to the whole
+                                         repository.
 
         Returns:
             Tuple[Dict[str, float], float]: A dictionary mapping file paths to their coverage percentages
                                              for files below the threshold, and the overall coverage percentage
                                              of the results."""
 
-        results = self._run_interrogate()
+        results = self._run_interrogate(paths)
 
         # Collect files below threshold
         files_below_threshold = []
@@ -0,0 +1,151 @@
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+# Matches the new-file side of a unified diff hunk header, e.g. "@@ -3,2 +4,5 @@"
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# Escape sequences git uses in quoted paths, besides octal bytes like "\303"
+QUOTED_PATH_ESCAPE = re.compile(rb"\\([0-7]{3}|.)")
+PATH_ESCAPES = {
+    b"a": b"\a",
+    b"b": b"\b",
+    b"f": b"\f",
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"v": b"\v",
+}
+
+
+class GitDiff:
+    """Find the Python files and lines changed in a git working tree.
+
+    Only plain git plumbing is used: ``git diff`` against a reference for
+    tracked files and ``git ls-files`` for untracked ones. Paths are relative
+    to the given repository path, which may be a subdirectory of the git root.
+    """
+
+    def __init__(self, repo_path: Path):
+        """Initialize the diff reader.
+
+        Args:
+            repo_path: Directory the changes are looked up in
+        """
+        self.repo_path = Path(repo_path)
+
+    def _git(self, *args: str) -> str:
+        """Run a git command in the repository and return its output.
+
+        Raises:
+            ValueError: If git is not available or the command fails.
+        """
+        try:
+            result = subprocess.run(
+                # Spell out non-ASCII paths instead of escaping their bytes
+                ["git", "-c", "core.quotePath=false", *args],
+                cwd=self.repo_path,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        except FileNotFoundError:
+            raise ValueError("git is required to look up changed files")
+        except subprocess.CalledProcessError as e:
+            raise ValueError(f"git {args[0]} failed: {e.stderr.strip()}")
+        return result.stdout
+
+    @staticmethod
+    def _unquote_path(path: str) -> str:
+        """Undo the C-style quoting git applies to paths with special characters.
+
+        Args:
+            path: Path as printed by git, e.g. ``"b/we\\"ird.py"``
+
+        Returns:
+            The path itself
+        """
+        if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+            return path
+
+        def unescape(match: re.Match) -> bytes:
+            escaped = match.group(1)
+            if len(escaped) == 3:
+                return bytes([int(escaped, 8)])
+            return PATH_ESCAPES.get(escaped, escaped)
+
+        raw = QUOTED_PATH_ESCAPE.sub(unescape, path[1:-1].encode("utf-8"))
+        return raw.decode("utf-8", "surrogateescape")
+
+    @staticmethod
+    def _parse_diff(diff: str) -> Dict[str, Set[int]]:
+        """Extract the changed lines of each file from a zero-context diff.
+
+        Args:
+            diff: Output of ``git diff --unified=0`` with the default ``b/``
+                  prefix on new-file paths
+
+        Returns:
+            Mapping of file paths to the changed line numbers in their new version.
+            Pure deletions mark the line they happened at.
+        """
+        changed_lines: Dict[str, Set[int]] = {}
+        current: Optional[Set[int]] = None
+        for line in diff.splitlines():
+            if line.startswith("+++ "):
+                path = GitDiff._unquote_path(line[4:])
+                if path == "/dev/null":
+                    current = None
+                else:
+                    current = changed_lines.setdefault(path.removeprefix("b/"), set())
+            elif current is not None and line.startswith("@@"):
+                match = HUNK_HEADER.match(line)
+                if not match:
+                    continue
+                start = int(match.group(1))
+                count = int(match.group(2)) if match.group(2) is not None else 1
+                current.update(range(max(start, 1), start + max(count, 1)))
+        return changed_lines
+
+    def get_changed_lines(
+        self, since: Optional[str] = None
+    ) -> Dict[str, Optional[Set[int]]]:
+        """Get the Python files changed since a reference, with their changed lines.
+
+        Args:
+            since: Git reference to compare the working tree with. Defaults to
+                   HEAD, i.e. staged and unstaged changes.
+
+        Returns:
+            Mapping of repository-relative file paths to their changed line
+            numbers. Untracked files map to None, meaning the whole file.
+
+        Raises:
+            ValueError: If git fails, e.g. because the reference does not exist.
+        """
+        diff = self._git(
+            "diff",
+            "--unified=0",
+            "--no-color",
+            "--no-ext-diff",
+            # Whatever diff.noprefix or diff.mnemonicPrefix say
+            "--src-prefix=a/",
+            "--dst-prefix=b/",
+            "--relative",
+            since or "HEAD",
+            "--",
+            "*.py",
+        )
+        changed: Dict[str, Optional[Set[int]]] = dict(self._parse_diff(diff))
+        untracked = self._git(
+            "ls-files", "-z", "--others", "--exclude-standard", "--", "*.py"
+        )
+        for path in untracked.split("\0"):
+            if path:
+                changed[path] = None
+        return {
+            str(Path(path)): lines
+            for path, lines in changed.items()
+            if (self.repo_path / path).is_file()
+        }
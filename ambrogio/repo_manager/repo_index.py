@@ -0,0 +1,306 @@
+"""Persistent index of the Python files of a repository."""
+
+import ast
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .file_discovery import FileDiscovery
+
+# File, in the Ambrogio cache directory, holding the repository index
+INDEX_FILE_NAME = "repo_index.json"
+
+# Version of the index format, bumped whenever the extracted data changes
+INDEX_VERSION = 1
+
+# Statement fields holding nested statements, where definitions and imports live
+BODY_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+@dataclass
+class IndexEntry:
+    """What the index knows about one Python file."""
+
+    stamp: Tuple[int, int]
+    hash: str
+    exports: List[str] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+    signatures: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def module_name(rel_path: str) -> str:
+    """Get the dotted module name of a repository-relative file path."""
+    parts = list(Path(rel_path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _get_signature(node: ast.AST) -> str:
+    """Render the header of a function or class definition."""
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(base) for base in node.bases + node.keywords)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+
+def _iter_statements(tree: ast.Module) -> Iterator[ast.AST]:
+    """Walk the statements of a module, nested ones included, but no expressions.
+
+    Definitions and imports are statements, so skipping expressions, which
+    make up most of a tree, loses none of them.
+    """
+    stack = list(reversed(tree.body))
+    while stack:
+        node = stack.pop()
+        yield node
+        for name in BODY_FIELDS:
+            children = getattr(node, name, None)
+            if children:
+                stack.extend(reversed(children))
+
+
+def parse_file(rel_path: str, content: bytes, stamp: Tuple[int, int]) -> IndexEntry:
+    """Extract the exports, imports and signatures of a file in one walk.
+
+    Relative imports are resolved against the package of the file, so that
+    every import is recorded with its absolute dotted name.
+
+    Args:
+        rel_path: Repository-relative path of the file
+        content: Content of the file
+        stamp: Size and modification time of the file
+
+    Returns:
+        The index entry of the file, with the error if it cannot be parsed
+    """
+    entry = IndexEntry(stamp=stamp, hash=hashlib.sha256(content).hexdigest())
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError) as e:
+        entry.error = str(e)
+        return entry
+
+    package = module_name(rel_path).split(".")
+    if not rel_path.endswith("__init__.py"):
+        package = package[:-1]
+    imports = set()
+    for node in _iter_statements(tree):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            entry.exports.append(node.name)
+            entry.signatures.append(_get_signature(node))
+        elif isinstance(node, ast.Import):
+            imports.update(name.name for name in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            # One dot is the file's package, each further dot its parent
+            base = (
+                package[: max(0, len(package) - node.level + 1)] if node.level else []
+            )
+            module = ".".join(base + ([node.module] if node.module else []))
+            for name in node.names:
+                imports.add(f"{module}.{name.name}" if module else name.name)
+    entry.imports = sorted(imports)
+    return entry
+
+
+class RepoIndex:
+    """Index of the exports, imports and signatures of a repository's files.
+
+    The index is kept on disk in Ambrogio's cache directory and updated
+    incrementally: files whose size and modification time did not change
+    are not read again, and files touched without a content change are not
+    parsed again. Summaries are rendered from the index, optionally limited
+    to a subtree or to the import neighbourhood of a file.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        index_path: Optional[Path] = None,
+        discovery: Optional[FileDiscovery] = None,
+    ):
+        """Initialize the index, loading it from disk if present.
+
+        Args:
+            repo_path: Repository root
+            index_path: File the index is persisted to, or None to keep it
+                        in memory only
+            discovery: Listing of the files to index, shared with other
+                       consumers, or None to walk the repository on its own
+        """
+        self.repo_path = Path(repo_path)
+        self.index_path = Path(index_path) if index_path else None
+        self.discovery = discovery or FileDiscovery(self.repo_path)
+        self.entries: Dict[str, IndexEntry] = self._load()
+        self._import_graph: Optional[Dict[str, Set[str]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, IndexEntry]:
+        """Read the persisted index, ignoring it if unreadable or outdated."""
+        if not self.index_path:
+            return {}
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+            if saved.get("version") != INDEX_VERSION:
+                return {}
+            return {
+                path: IndexEntry(**dict(entry, stamp=tuple(entry["stamp"])))
+                for path, entry in saved["files"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save(self) -> None:
+        """Persist the index atomically."""
+        if not self.index_path:
+            return
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "files": {
+                        path: vars(entry) for path, entry in self.entries.items()
+                    },
+                },
+                f,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    def update(self) -> bool:
+        """Bring the index up to date with the files listed by the discovery.
+
+        Returns:
+            Whether any entry changed
+        """
+        with self._lock:
+            changed = False
+            seen = set()
+            for rel_path, stamp in self.discovery.get_files().items():
+                seen.add(rel_path)
+                entry = self.entries.get(rel_path)
+                if entry is not None and entry.stamp == stamp:
+                    continue
+                try:
+                    content = (self.repo_path / rel_path).read_bytes()
+                except OSError:
+                    continue
+                if (
+                    entry is not None
+                    and entry.hash == hashlib.sha256(content).hexdigest()
+                ):
+                    entry.stamp = stamp
+                else:
+                    self.entries[rel_path] = parse_file(rel_path, content, stamp)
+                changed = True
+
+            for rel_path in set(self.entries) - seen:
+                del self.entries[rel_path]
+                changed = True
+            if changed:
+                self._import_graph = None
+                self._save()
+            return changed
+
+    def _get_import_graph(self) -> Dict[str, Set[str]]:
+        """Link every file to the indexed files it imports or is imported by.
+
+        The graph is kept until the next update changes the index.
+        """
+        if self._import_graph is not None:
+            return self._import_graph
+        modules = {module_name(path): path for path in self.entries}
+        graph: Dict[str, Set[str]] = {path: set() for path in self.entries}
+        for path, entry in self.entries.items():
+            for name in entry.imports:
+                # "pkg.mod.func" is provided by the longest indexed prefix
+                parts = name.split(".")
+                while parts and ".".join(parts) not in modules:
+                    parts.pop()
+                target = modules.get(".".join(parts)) if parts else None
+                if target and target != path:
+                    graph[path].add(target)
+                    graph[target].add(path)
+        self._import_graph = graph
+        return graph
+
+    def get_neighbourhood(self, rel_path: str, depth: int = 1) -> Set[str]:
+        """Get the files within some import hops of a file, in either direction.
+
+        Args:
+            rel_path: Repository-relative path of the file
+            depth: Maximum number of import hops
+
+        Returns:
+            The paths of the neighbourhood, the file itself included
+
+        Raises:
+            ValueError: If the file is not indexed
+        """
+        rel_path = str(Path(rel_path))
+        if rel_path not in self.entries:
+            raise ValueError(f"File {rel_path} is not in the repository index")
+        graph = self._get_import_graph()
+        distances = {rel_path: 0}
+        queue = deque([rel_path])
+        while queue:
+            path = queue.popleft()
+            if distances[path] == depth:
+                continue
+            for neighbour in graph[path]:
+                if neighbour not in distances:
+                    distances[neighbour] = distances[path] + 1
+                    queue.append(neighbour)
+        return set(distances)
+
+    def render(
+        self,
+        subtree: Optional[str] = None,
+        neighbours_of: Optional[str] = None,
+        depth: int = 1,
+    ) -> str:
+        """Render the structure summary of the indexed files.
+
+        Args:
+            subtree: Only include files below this repository-relative directory
+            neighbours_of: Only include this file and the files within depth
+                           import hops of it
+            depth: Number of import hops of the neighbourhood
+
+        Returns:
+            The exports and imports of each file, in path order
+        """
+        paths = sorted(self.entries)
+        if subtree:
+            # Index keys are POSIX paths on every platform
+            prefix = Path(subtree).as_posix()
+            paths = [p for p in paths if p == prefix or p.startswith(prefix + "/")]
+        if neighbours_of:
+            neighbourhood = self.get_neighbourhood(neighbours_of, depth)
+            paths = [p for p in paths if p in neighbourhood]
+
+        structure = [f"Repository Root: {self.repo_path}"]
+        for path in paths:
+            entry = self.entries[path]
+            if entry.error:
+                structure.append(f"\nFile: {path} (Error: {entry.error})")
+                continue
+            structure.append(f"\nFile: {path}")
+            if entry.exports:
+                structure.append("  Exports:")
+                structure.extend(f"    - {name}" for name in sorted(entry.exports))
+            if entry.imports:
+                structure.append("  Imports:")
+                structure.extend(f"    - {name}" for name in entry.imports)
+        return "\n".join(structure)
@@ -1,5 +1,11 @@
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Sequence, Tuple, Union
+
+from .file_discovery import FileDiscovery, iter_python_files
+from .repo_index import INDEX_FILE_NAME, RepoIndex
+
+# Directory, relative to the repository root, where Ambrogio keeps its state
+CACHE_DIR_NAME = ".ambrogio"
 
 
 class RepoPathManager:
@@ -31,6 +37,9 @@ class RepoPathManager:
 
     _instance: Optional["RepoPathManager"] = None
     _repo_path: Optional[Path] = None
+    _exclude: Tuple[str, ...] = ()
+    _discovery: Optional[FileDiscovery] = None
+    _index: Optional[RepoIndex] = None
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -55,15 +64,22 @@ class RepoPathManager:
         return cls._instance
 
     @classmethod
-    def initialize(cls, path: Optional[str] = None) -> None:
+    def initialize(
+        cls, path: Optional[str] = None, exclude: Optional[Sequence[str]] = None
+    ) -> None:
         """Initialize the repository path.
 
         Args:
             path: Optional path to repository root. If not provided, will attempt to detect.
+            exclude: Optional gitignore patterns of paths to leave out of every
+                     file listing, on top of the repository's .gitignore files.
 
         Raises:
             ValueError: If the path doesn't exist or is not a valid repository.
         """
+        cls._exclude = tuple(exclude or ())
+        cls._discovery = None
+        cls._index = None
         if path:
             # Convert to absolute path and resolve any symlinks
             repo_path = Path(path).resolve()
@@ -74,16 +90,12 @@ class RepoPathManager:
             if not repo_path.is_dir():
                 raise ValueError(f"Path is not a directory: {repo_path}")
 
-            # Check for valid project markers
-            has_git = (repo_path / ".git").exists()
-            has_poetry = (repo_path / "pyproject.toml").exists()
-            has_python = any(
-                p
-                for p in repo_path.glob("**/*.py")
-                if ".venv" not in str(p) and "__pycache__" not in str(p)
-            )
-
-            if has_git or has_poetry or has_python:
+            # Check for valid project markers, searching for Python files last
+            if (
+                (repo_path / ".git").exists()
+                or (repo_path / "pyproject.toml").exists()
+                or cls._has_python_files(repo_path, cls._exclude)
+            ):
                 cls._repo_path = repo_path
             else:
                 raise ValueError(
@@ -102,15 +114,27 @@ class RepoPathManager:
 
             # If no markers found, check for Python files
             cwd = Path.cwd()
-            if any(
-                p
-                for p in cwd.glob("**/*.py")
-                if ".venv" not in str(p) and "__pycache__" not in str(p)
-            ):
+            if cls._has_python_files(cwd, cls._exclude):
                 cls._repo_path = cwd
             else:
                 raise ValueError("Current directory is not a valid repository")
 
+    @staticmethod
+    def _has_python_files(path: Path, exclude: Sequence[str] = ()) -> bool:
+        """Check whether a directory holds a Python file that is not ignored.
+
+        The walk prunes hidden, ignored and virtual environment directories
+        without descending into them, and stops at the first file found.
+
+        Args:
+            path: Directory to search.
+            exclude: Gitignore patterns of further paths to skip.
+
+        Returns:
+            bool: True if a Python file was found.
+        """
+        return next(iter_python_files(str(path), exclude=exclude), None) is not None
+
     @classmethod
     def path(cls) -> Path:
         """Get the repository root path.
@@ -159,96 +183,88 @@ class RepoPathManager:
         """
         return cls.path() / Path(relative_path)
 
-    def get_repo_structure(self) -> str:
+    @classmethod
+    def cache_dir(cls) -> Path:
+        """Get the directory where Ambrogio keeps its cached state.
+
+        The directory is created on first use, together with a .gitignore
+        that keeps it out of version control.
+
+        Returns:
+            Path: The absolute path to the cache directory.
+
+        Raises:
+            ValueError: If repo path not initialized.
+        """
+        cache_dir = cls.path() / CACHE_DIR_NAME
+        if not cache_dir.is_dir():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            (cache_dir / ".gitignore").write_text("*\n")
+        return cache_dir
+
+    @classmethod
+    def get_discovery(cls) -> FileDiscovery:
+        """Get the listing of the repository's Python files shared by every consumer.
+
+        The tree is walked on first use after initialize, honouring the
+        repository's .gitignore files and the configured excludes.
+
+        Returns:
+            FileDiscovery: The file discovery of the current repository.
+
+        Raises:
+            ValueError: If repo path not initialized.
+        """
+        repo_path = cls.path()
+        if cls._discovery is None or cls._discovery.root != repo_path:
+            cls._discovery = FileDiscovery(repo_path, cls._exclude)
+        return cls._discovery
+
+    @classmethod
+    def get_index(cls) -> RepoIndex:
+        """Get the up-to-date index of the repository's Python files.
+
+        The index is loaded from the cache directory on first use and kept
+        in memory afterwards; every call re-stats the files listed by the
+        shared discovery, so edits made outside Ambrogio are seen, and only
+        parses the changed ones. New files appear once the discovery is
+        refreshed.
+
+        Returns:
+            RepoIndex: The index of the current repository.
+
+        Raises:
+            ValueError: If repo path not initialized.
+        """
+        repo_path = cls.path()
+        if cls._index is None or cls._index.repo_path != repo_path:
+            cls._index = RepoIndex(
+                repo_path, cls.cache_dir() / INDEX_FILE_NAME, cls.get_discovery()
+            )
+        discovery = cls.get_discovery()
+        discovery.update(list(discovery.get_files()))
+        cls._index.update()
+        return cls._index
+
+    def get_repo_structure(
+        self,
+        subtree: Optional[str] = None,
+        neighbours_of: Optional[str] = None,
+        depth: int = 1,
+    ) -> str:
         """Get a string representation of the repository structure.
 
+        Args:
+            subtree: Only include files below this repository-relative directory.
+            neighbours_of: Only include this repository-relative file and the
+                           files importing it or imported by it.
+            depth: Number of import hops included around neighbours_of.
+
         Returns:
             str: A string containing information about the repository structure,
                  including Python files, their exports (classes/functions), and imports.
+
+        Raises:
+            ValueError: If neighbours_of is not an indexed Python file.
         """
-        import ast
-        from typing import Set, List
-
-        def extract_imports(tree: ast.AST) -> Set[str]:
-            """Extracts imported module names from an Abstract Syntax Tree (AST).
-
-            This function traverses the given AST and collects all the names of
-            modules and symbols that are imported using `import` and `from ... import`
-            statements. The imported names are returned as a set to ensure uniqueness.
-
-            Args:
-                tree (ast.AST): The root node of the AST to be analyzed.
-
-            Returns:
-                Set[str]: A set containing the names of all imported modules and symbols."""
-            imports = set()
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.add(name.name)
-                elif isinstance(node, ast.ImportFrom):
-                    module = node.module if node.module else ""
-                    for name in node.names:
-                        if module:
-                            imports.add(f"{module}.{name.name}")
-                        else:
-                            imports.add(name.name)
-            return imports
-
-        def extract_exports(tree: ast.AST) -> List[str]:
-            """Extracts the names of all classes and functions defined in an AST.
-
-            This function traverses an Abstract Syntax Tree (AST) and collects the names of
-            all class and function definitions. The extracted names can be used to identify
-            the exported members of a module.
-
-            Args:
-                tree (ast.AST): The Abstract Syntax Tree to traverse.
-
-            Returns:
-                List[str]: A list of names of classes and functions found in the AST."""
-            exports = []
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
-                    exports.append(node.name)
-            return exports
-
-        structure = []
-        structure.append(f"Repository Root: {self.path}")
-
-        # Find all Python files
-        for py_file in self.path.rglob("*.py"):
-            # Skip virtual environments and hidden directories
-            if any(
-                part.startswith(".") or part in {"venv", "env", "__pycache__"}
-                for part in py_file.parts
-            ):
-                continue
-
-            try:
-                rel_path = self.get_relative_path(py_file)
-                with open(py_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                # Parse the file
-                tree = ast.parse(content)
-
-                # Extract information
-                imports = extract_imports(tree)
-                exports = extract_exports(tree)
-
-                # Add to structure string
-                structure.append(f"\nFile: {rel_path}")
-                if exports:
-                    structure.append("  Exports:")
-                    for export in sorted(exports):
-                        structure.append(f"    - {export}")
-                if imports:
-                    structure.append("  Imports:")
-                    for import_stmt in sorted(imports):
-                        structure.append(f"    - {import_stmt}")
-
-            except Exception as e:
-                structure.append(f"\nFile: {rel_path} (Error: {str(e)})")
-
-        return "\n".join(structure)
+        return self.get_index().render(subtree, neighbours_of, depth)
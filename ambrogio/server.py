@@ -0,0 +1,318 @@
+"""Long-lived server answering docstring and coverage requests over a Unix socket."""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ambrogio.ambr_coverage.ambr_coverage import CoverageAnalyzer
+from ambrogio.ambr_coverage.ambr_pipeline import create_test_pipeline, run_file_pipeline
+from ambrogio.ambr_coverage.ambr_test_generator import AmbrogioTestGenerator
+from ambrogio.ambr_coverage.prompt_builder import DEFAULT_PROMPT_TOKEN_BUDGET
+from ambrogio.ambr_coverage.test_executor import DEFAULT_TEST_TIMEOUT, TestExecutor
+from ambrogio.ambr_docstring import AmbrogioDocstring
+from ambrogio.ambr_docstring.defaults import (
+    DEFAULT_BATCH_TOKEN_BUDGET,
+    DEFAULT_MAX_API_CALLS,
+)
+from ambrogio.repo_manager import RepoPathManager
+from ambrogio.telemetry import get_telemetry
+
+# Socket, in the Ambrogio cache directory, the server listens on by default
+SOCKET_FILE_NAME = "server.sock"
+
+# Suffixes of the files requests may name
+PYTHON_SUFFIXES = (".py", ".pyi")
+
+# Seconds a connection may stay idle before the server closes it
+CONNECTION_TIMEOUT = 300
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server handling each connection in its own thread."""
+
+    daemon_threads = True
+    # Idle connections must not delay the shutdown
+    block_on_close = False
+
+
+class AmbrogioServer:
+    """Serves docstring and coverage requests for individual files.
+
+    Everything a CLI invocation builds from scratch is kept between requests:
+    the LLM manager and its cache, the repository's file listing and index,
+    interrogate results, parsed libcst trees, the coverage baseline and the
+    compiled test pipeline. Requests are JSON objects, one per line, answered
+    with one JSON line each. Every connection is served by its own thread, so
+    "status" and "shutdown" answer at once, while docstring and coverage work
+    is done one request at a time:
+
+        {"command": "docstring", "files": ["pkg/module.py"]}
+        {"command": "coverage", "file": "pkg/module.py"}
+        {"command": "status"}
+        {"command": "shutdown"}
+
+    Answers hold "ok", the "result" or the "error", and the "seconds" spent.
+    RepoPathManager and LLMManager must be initialized beforehand.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[Path] = None,
+        max_api_calls: int = DEFAULT_MAX_API_CALLS,
+        batch: bool = False,
+        batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+        max_iterations: int = 3,
+        prompt_token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+        llm_concurrency: int = 1,
+        test_workers: int = 1,
+        test_timeout: Optional[float] = DEFAULT_TEST_TIMEOUT,
+        test_memory_limit: Optional[int] = None,
+    ):
+        """Initialize the server, without listening yet.
+
+        Args:
+            socket_path: Unix socket to listen on, defaulting to
+                         SOCKET_FILE_NAME in the cache directory
+            max_api_calls: Maximum number of API calls per docstring request
+            batch: Whether to document several nodes of a file per API call
+            batch_token_budget: Maximum code tokens packed into one batched call
+            max_iterations: Maximum number of test generation attempts per file
+            prompt_token_budget: Maximum tokens of source context per prompt
+            llm_concurrency: Maximum number of docstring calls in flight at once
+            test_workers: Maximum number of test runs in flight at once
+            test_timeout: Wall-clock limit of a generated test run in seconds
+            test_memory_limit: Memory limit of a generated test run in megabytes
+        """
+        self.repo_manager = RepoPathManager.get_instance()
+        self.socket_path = socket_path or (
+            RepoPathManager.cache_dir() / SOCKET_FILE_NAME
+        )
+        self.docstring = AmbrogioDocstring(
+            max_api_calls=max_api_calls,
+            concurrency=llm_concurrency,
+            batch=batch,
+            batch_token_budget=batch_token_budget,
+            cache_trees=True,
+        )
+        self.coverage_analyzer = CoverageAnalyzer(
+            TestExecutor(
+                self.repo_manager.path(),
+                test_workers,
+                timeout=test_timeout,
+                memory_limit=test_memory_limit,
+            )
+        )
+        self.test_generator = AmbrogioTestGenerator(
+            prompt_token_budget=prompt_token_budget
+        )
+        self.graph = create_test_pipeline(
+            max_iterations,
+            prompt_token_budget=prompt_token_budget,
+            coverage_analyzer=self.coverage_analyzer,
+            test_generator=self.test_generator,
+        )
+        self.requests_served = 0
+        self.started = time.time()
+        # Serializes the requests sharing the docstring fixer and the pipeline
+        self._work_lock = threading.Lock()
+        self._served_lock = threading.Lock()
+        self._commands: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "docstring": self.handle_docstring,
+            "coverage": self.handle_coverage,
+            "status": self.handle_status,
+        }
+
+    def _get_relative_paths(self, paths: List[str]) -> List[str]:
+        """Validate requested files and make their paths repository-relative.
+
+        Raises:
+            ValueError: If a file is outside the repository, does not exist or
+                        is not a Python file
+        """
+        relative_paths = []
+        for path in paths:
+            if Path(path).suffix not in PYTHON_SUFFIXES:
+                raise ValueError(f"Not a Python file: {path}")
+            relative = self.repo_manager.get_relative_path(
+                self.repo_manager.get_absolute_path(path)
+            )
+            if not self.repo_manager.get_absolute_path(relative).is_file():
+                raise ValueError(f"File not found: {path}")
+            relative_paths.append(relative.as_posix())
+        return relative_paths
+
+    def warm_up(self) -> None:
+        """Walk the repository and index it before the first request."""
+        RepoPathManager.get_index()
+        self.docstring.file_getter.get_coverage_stats()
+
+    def handle_docstring(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Document the functions and classes of some files missing docstrings.
+
+        Args:
+            request: Request with the repository-relative "files" to document
+
+        Returns:
+            The repository-relative paths of the modified files
+        """
+        paths = self._get_relative_paths(request.get("files") or [])
+        if not paths:
+            raise ValueError("Docstring requests need a non-empty 'files' list")
+        with self._work_lock:
+            # The editor may have changed the files since they were last listed
+            RepoPathManager.get_discovery().update(paths)
+            return {"modified_files": self.docstring.run(paths)}
+
+    def handle_coverage(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate a test for the missing statements of a source file.
+
+        The coverage baseline is only re-measured where files changed since
+        the previous request.
+
+        Args:
+            request: Request with the repository-relative source "file"
+
+        Returns:
+            The missing statements before the request, whether a passing test
+            was generated and its repository-relative path
+        """
+        path = self._get_relative_paths([request.get("file") or ""])[0]
+        source_file = self.repo_manager.get_absolute_path(path)
+        with self._work_lock:
+            return self._generate_missing_test(source_file)
+
+    def _generate_missing_test(self, source_file: Path) -> Dict[str, Any]:
+        """Measure the coverage of a source file and test what is missing."""
+        self.coverage_analyzer.analyze_coverage()
+        missing = self.coverage_analyzer.missing_statements.get(str(source_file), 0)
+        result = {"missing_statements": missing, "success": True, "test_file": None}
+        if missing:
+            _, success, test_file = run_file_pipeline(
+                self.graph, self.test_generator, source_file
+            )
+            result["success"] = success
+            if success and test_file:
+                result["test_file"] = str(
+                    self.repo_manager.get_relative_path(test_file)
+                )
+        return result
+
+    def handle_status(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Describe the server and what it keeps in memory."""
+        return {
+            "repo_path": str(self.repo_manager.path()),
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "requests_served": self.requests_served,
+            "files": len(RepoPathManager.get_discovery().get_files()),
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a request, turning errors into error answers.
+
+        Args:
+            request: Decoded request
+
+        Returns:
+            The answer to send back
+        """
+        started = time.perf_counter()
+        command = request.get("command") if isinstance(request, dict) else None
+        try:
+            if command not in self._commands:
+                raise ValueError(f"Unknown command: {command}")
+            with get_telemetry().step("server_request", command=command):
+                result = self._commands[command](request)
+            answer = {"ok": True, "result": result}
+        except Exception as e:
+            answer = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        with self._served_lock:
+            self.requests_served += 1
+        answer["seconds"] = time.perf_counter() - started
+        return answer
+
+    def serve_forever(self) -> None:
+        """Listen on the socket until a shutdown request or an interrupt.
+
+        Raises:
+            RuntimeError: If another server already answers on the socket
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = CONNECTION_TIMEOUT
+
+            def handle(self) -> None:
+                try:
+                    for line in self.rfile:
+                        if line.strip():
+                            self.answer(line)
+                except OSError:
+                    # The client left, or the connection stayed idle too long
+                    pass
+
+            def answer(self, line: bytes) -> None:
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    answer = {"ok": False, "error": f"Invalid JSON: {e}"}
+                else:
+                    if isinstance(request, dict) and (
+                        request.get("command") == "shutdown"
+                    ):
+                        self.wfile.write(b'{"ok": true, "result": null}\n')
+                        # Blocks until serve_forever, in another thread, returns
+                        self.server.shutdown()
+                        return
+                    answer = server.handle(request)
+                self.wfile.write(json.dumps(answer).encode() + b"\n")
+
+        if self.socket_path.exists():
+            # Connecting succeeds even while a live server is busy with a request
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                try:
+                    client.connect(str(self.socket_path))
+                except OSError:
+                    # Left behind by a server that did not shut down cleanly
+                    self.socket_path.unlink()
+                else:
+                    raise RuntimeError(
+                        f"A server already listens on {self.socket_path}"
+                    )
+        with _ThreadingUnixServer(str(self.socket_path), Handler) as unix:
+            os.chmod(self.socket_path, 0o600)
+            print(f"Ambrogio server listening on {self.socket_path}")
+            try:
+                unix.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+        print("Ambrogio server stopped")
+
+
+def send_request(
+    socket_path: Path, request: Dict[str, Any], timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Send a request to a running server and wait for its answer.
+
+    Args:
+        socket_path: Unix socket the server listens on
+        request: Request, e.g. {"command": "docstring", "files": ["a.py"]}
+        timeout: Seconds to wait for the answer, or None to wait indefinitely
+
+    Returns:
+        The decoded answer
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
@@ -0,0 +1,248 @@
+"""Machine-readable run telemetry for Ambrogio."""
+
+import contextvars
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Source file the records of the current thread or task are attributed to
+_current_file: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "ambrogio_telemetry_file", default=None
+)
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Get a nearest-rank percentile of some values.
+
+    Args:
+        values: Measured values, in any order
+        percent: Percentile to compute, between 0 and 100
+
+    Returns:
+        The percentile, or None if there are no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class LatencyStats:
+    """Count and latency percentiles of a kind of operation, in seconds."""
+
+    count: int
+    p50: Optional[float]
+    p95: Optional[float]
+
+    @classmethod
+    def from_values(cls, values: List[float]) -> "LatencyStats":
+        """Summarize measured latencies."""
+        return cls(len(values), percentile(values, 50), percentile(values, 95))
+
+
+@dataclass
+class TelemetrySummary:
+    """Aggregates of the records of a run."""
+
+    llm_calls: LatencyStats
+    cache_hits: int
+    retries: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    covered_lines: int
+    steps: Dict[str, LatencyStats] = field(default_factory=dict)
+    tokens_per_file: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def cost_per_covered_line(self) -> Optional[float]:
+        """LLM cost of each line newly covered by generated tests."""
+        if not self.covered_lines:
+            return None
+        return self.cost / self.covered_lines
+
+
+class Telemetry:
+    """Thread-safe recorder of LLM calls and pipeline steps.
+
+    Every record is appended as one JSON object per line to the telemetry
+    file, with its kind, a timestamp and the source file it was attributed
+    to, and kept in memory for the summary printed at exit. A recorder
+    without a file is disabled and ignores records.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """Initialize the recorder, truncating the telemetry file.
+
+        Args:
+            path: Path of the JSONL file, or None to disable telemetry
+        """
+        self.path = Path(path) if path else None
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether records are kept."""
+        return self.path is not None
+
+    def record(self, kind: str, **fields: Any) -> None:
+        """Record an event.
+
+        Args:
+            kind: Kind of event, e.g. ``llm_call`` or ``step``
+            **fields: JSON-serializable details of the event
+        """
+        if not self.enabled:
+            return
+        record = {"kind": kind, "time": time.time()}
+        if "file" not in fields:
+            fields["file"] = _current_file.get()
+        record.update(fields)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.records.append(record)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def step(self, name: str, **fields: Any) -> Iterator[None]:
+        """Time a step of a pipeline and record it once done.
+
+        Args:
+            name: Name of the step
+            **fields: JSON-serializable details of the step
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(
+                "step",
+                name=name,
+                latency=time.perf_counter() - started,
+                ok=ok,
+                **fields,
+            )
+
+    def summarize(self) -> TelemetrySummary:
+        """Aggregate the records of the run."""
+        with self._lock:
+            records = list(self.records)
+        calls = [r for r in records if r["kind"] == "llm_call"]
+        requests = [r for r in calls if not r.get("cache_hit")]
+
+        step_latencies: Dict[str, List[float]] = {}
+        for r in records:
+            if r["kind"] == "step":
+                step_latencies.setdefault(r["name"], []).append(r["latency"])
+
+        tokens_per_file: Dict[str, int] = {}
+        for r in requests:
+            if r.get("file"):
+                tokens_per_file[r["file"]] = (
+                    tokens_per_file.get(r["file"], 0)
+                    + (r.get("prompt_tokens") or 0)
+                    + (r.get("completion_tokens") or 0)
+                )
+
+        return TelemetrySummary(
+            llm_calls=LatencyStats.from_values([r["latency"] for r in requests]),
+            cache_hits=len(calls) - len(requests),
+            retries=sum(r.get("retries", 0) for r in requests),
+            prompt_tokens=sum(r.get("prompt_tokens") or 0 for r in requests),
+            completion_tokens=sum(r.get("completion_tokens") or 0 for r in requests),
+            cost=sum(r.get("cost") or 0.0 for r in requests),
+            covered_lines=sum(
+                r["covered_lines"] for r in records if r["kind"] == "coverage"
+            ),
+            steps={
+                name: LatencyStats.from_values(values)
+                for name, values in step_latencies.items()
+            },
+            tokens_per_file=tokens_per_file,
+        )
+
+    def print_summary(self) -> None:
+        """Print the aggregates of the run, if telemetry is enabled."""
+        if not self.enabled:
+            return
+        summary = self.summarize()
+
+        def latency(stats: LatencyStats) -> str:
+            if not stats.count:
+                return f"{stats.count}"
+            return f"{stats.count}, p50 {stats.p50:.2f}s, p95 {stats.p95:.2f}s"
+
+        print(f"\n📈 Telemetry written to {self.path}")
+        print(
+            f"  LLM calls: {latency(summary.llm_calls)} "
+            f"({summary.cache_hits} cache hits, {summary.retries} retries)"
+        )
+        print(
+            f"  Tokens: {summary.prompt_tokens} prompt, "
+            f"{summary.completion_tokens} completion, cost ${summary.cost:.4f}"
+        )
+        for name, stats in summary.steps.items():
+            print(f"  Step {name}: {latency(stats)}")
+        for file_path, tokens in sorted(summary.tokens_per_file.items()):
+            print(f"  {file_path}: {tokens} tokens")
+        if summary.cost_per_covered_line is not None:
+            print(
+                f"  Covered lines: {summary.covered_lines}, "
+                f"${summary.cost_per_covered_line:.4f} per line"
+            )
+
+
+@contextmanager
+def attribute_to_file(file_path: Any) -> Iterator[None]:
+    """Attribute the records of the current thread or task to a source file.
+
+    Args:
+        file_path: Source file being processed
+    """
+    token = _current_file.set(str(file_path) if file_path else None)
+    try:
+        yield
+    finally:
+        _current_file.reset(token)
+
+
+_telemetry = Telemetry()
+_telemetry_lock = threading.Lock()
+
+
+def configure_telemetry(path: Optional[Path]) -> Telemetry:
+    """Set where the telemetry of the whole process is written.
+
+    Args:
+        path: Path of the JSONL file, or None to disable telemetry
+
+    Returns:
+        The recorder now shared by every component
+    """
+    global _telemetry
+    with _telemetry_lock:
+        _telemetry = Telemetry(path)
+        return _telemetry
+
+
+def get_telemetry() -> Telemetry:
+    """Get the recorder shared by every component of the process."""
+    with _telemetry_lock:
+        return _telemetry
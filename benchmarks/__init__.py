@@ -0,0 +1,7 @@
+"""Benchmarks of Ambrogio's hot paths, run with a fake LLM backend."""
+
+import os
+
+# Use litellm's bundled model prices instead of fetching them at import time,
+# which would add network latency to every benchmark run
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
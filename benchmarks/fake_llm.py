@@ -0,0 +1,133 @@
+"""Deterministic fake completion backend for Ambrogio benchmarks."""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List
+
+import litellm
+
+# Characters per streamed chunk, small enough for stop conditions to matter
+STREAM_CHUNK_SIZE = 16
+
+# Names of the nodes of a batched docstring request, each following "###"
+BATCH_NODE_NAME = re.compile(r"^### (\S+)$", re.MULTILINE)
+
+CANNED_DOCSTRING = (
+    "Run the operation on the given values.\n\n"
+    "Args:\n    value: Input value\n\n"
+    "Returns:\n    The computed result"
+)
+
+CANNED_TEST = """```python
+import pytest
+
+
+def test_generated():
+    assert True
+```
+This test checks that the module can be exercised."""
+
+
+class FakeLLMBackend:
+    """Replaces litellm's completion functions behind LLMManager.
+
+    Responses are canned by request type: docstrings, batched docstrings as
+    JSON, and a passing test module for test generation and cleanup. Every
+    call waits for a fixed latency and fails with the given probability,
+    drawn from a seeded generator so that runs are reproducible.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        """Initialize the backend.
+
+        Args:
+            latency: Seconds each call takes before responding
+            failure_rate: Probability of a call raising a retryable error
+            seed: Seed of the failure draws
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def respond(messages: List[Dict[str, str]]) -> str:
+        """Get the canned response of a request.
+
+        Args:
+            messages: Messages of the request
+
+        Returns:
+            The text the fake model generates
+        """
+        system = messages[0]["content"] if messages else ""
+        prompt = messages[-1]["content"] if messages else ""
+        if "docstring" not in system:
+            return CANNED_TEST
+        names = BATCH_NODE_NAME.findall(prompt)
+        if "JSON object" in prompt and names:
+            return json.dumps({name: CANNED_DOCSTRING for name in names})
+        return f'"""{CANNED_DOCSTRING}\n"""\nThis docstring describes the function.'
+
+    def _should_fail(self) -> bool:
+        """Count a call and draw whether it fails."""
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+            return failed
+
+    def _raise(self, model: str) -> None:
+        """Raise the error of a failed call."""
+        raise litellm.ServiceUnavailableError(
+            "Fake backend failure", llm_provider="fake", model=model
+        )
+
+    @staticmethod
+    def _chunks(text: str) -> List[SimpleNamespace]:
+        """Split a response into streamed chunks shaped like litellm's."""
+        return [
+            SimpleNamespace(
+                choices=[
+                    SimpleNamespace(
+                        delta=SimpleNamespace(content=text[i : i + STREAM_CHUNK_SIZE])
+                    )
+                ]
+            )
+            for i in range(0, len(text), STREAM_CHUNK_SIZE)
+        ]
+
+    def completion(self, **request: Any) -> Any:
+        """Stand in for litellm.completion."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self._should_fail():
+            self._raise(request["model"])
+        text = self.respond(request["messages"])
+        if request.pop("stream", False):
+            return iter(self._chunks(text))
+        return litellm.completion(**request, mock_response=text)
+
+    async def acompletion(self, **request: Any) -> Any:
+        """Stand in for litellm.acompletion."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._should_fail():
+            self._raise(request["model"])
+        text = self.respond(request["messages"])
+        if request.pop("stream", False):
+            return self._astream(self._chunks(text))
+        return await litellm.acompletion(**request, mock_response=text)
+
+    @staticmethod
+    async def _astream(chunks: List[SimpleNamespace]) -> AsyncIterator[Any]:
+        """Yield streamed chunks asynchronously."""
+        for chunk in chunks:
+            yield chunk
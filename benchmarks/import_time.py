@@ -0,0 +1,160 @@
+"""Measure the import time of Ambrogio's entry points with python -X importtime.
+
+Each entry point is imported in a fresh interpreter, and must neither take
+longer than in a previous run nor load the dependencies of the other mode.
+Run from the repository root:
+
+    python -m benchmarks.import_time --json imports.json
+    python -m benchmarks.import_time --baseline imports.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from benchmarks.regressions import DEFAULT_MAX_REGRESSION, find_regressions
+
+# Dependencies of docstring mode and of coverage mode
+DOCSTRING_PACKAGES = frozenset({"libcst", "interrogate"})
+COVERAGE_PACKAGES = frozenset({"langgraph", "pytest", "_pytest"})
+LLM_PACKAGES = frozenset({"litellm"})
+
+
+@dataclass(frozen=True)
+class EntryPoint:
+    """Module imported to start a command, and the packages it must not load."""
+
+    module: str
+    forbidden: FrozenSet[str]
+
+
+ENTRY_POINTS: Dict[str, EntryPoint] = {
+    # What every command, --help included, pays before parsing arguments
+    "cli": EntryPoint(
+        "ambrogio.__main__",
+        DOCSTRING_PACKAGES | COVERAGE_PACKAGES | LLM_PACKAGES | {"coverage"},
+    ),
+    "docstring": EntryPoint(
+        "ambrogio.ambr_docstring.ambr_docstring", COVERAGE_PACKAGES | {"coverage"}
+    ),
+    "coverage": EntryPoint("ambrogio.ambr_coverage.ambr_pipeline", DOCSTRING_PACKAGES),
+}
+
+
+@dataclass
+class ImportResult:
+    """Best import time of an entry point, and the forbidden packages it loaded."""
+
+    name: str
+    seconds: float
+    forbidden_loaded: List[str]
+
+
+def measure_import(module: str) -> Tuple[float, Set[str]]:
+    """Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Dotted name of the module
+
+    Returns:
+        The total import time in seconds and the names of the loaded modules
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented name>"
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3:
+            continue
+        cumulative, name = parts[1].strip(), parts[2]
+        if not cumulative.isdigit():
+            continue
+        loaded.add(name.strip())
+        # Indentation marks nested imports, already counted by their parent
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1e6, loaded
+
+
+def run_entry_point(name: str, repeat: int) -> ImportResult:
+    """Time an entry point over several fresh interpreters.
+
+    Args:
+        name: Name of the entry point in ENTRY_POINTS
+        repeat: Number of imports, the fastest being kept
+
+    Returns:
+        The best time and the forbidden packages loaded
+    """
+    entry_point = ENTRY_POINTS[name]
+    timings = []
+    forbidden_loaded: Set[str] = set()
+    for _ in range(repeat):
+        seconds, loaded = measure_import(entry_point.module)
+        timings.append(seconds)
+        forbidden_loaded.update(loaded & entry_point.forbidden)
+    return ImportResult(name, min(timings), sorted(forbidden_loaded))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Time the entry points and print their results.
+
+    Returns:
+        1 if an entry point loaded a forbidden package or regressed against
+        the baseline, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Ambrogio import time benchmark")
+    parser.add_argument(
+        "--entry-points",
+        nargs="+",
+        choices=list(ENTRY_POINTS),
+        default=list(ENTRY_POINTS),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="Results of a previous run")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    results = []
+    failures = []
+    for name in args.entry_points:
+        result = run_entry_point(name, args.repeat)
+        results.append(result)
+        print(f"  {name:<10} {result.seconds:>7.3f}s  {ENTRY_POINTS[name].module}")
+        if result.forbidden_loaded:
+            failures.append(f"{name} loads {', '.join(result.forbidden_loaded)}")
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                [{"name": r.name, "seconds": r.seconds} for r in results], indent=2
+            )
+        )
+    if args.baseline:
+        failures.extend(
+            f"Regression: {regression}"
+            for regression in find_regressions(
+                [asdict(r) for r in results],
+                args.baseline,
+                args.max_regression,
+                label=lambda entry: entry["name"],
+            )
+        )
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""Compare benchmark timings with the results of a previous run."""
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+# Default slowdown over the baseline tolerated before failing, as a ratio
+DEFAULT_MAX_REGRESSION = 0.2
+
+
+def find_regressions(
+    results: Iterable[Dict[str, Any]],
+    baseline_path: Path,
+    max_regression: float,
+    label: Callable[[Dict[str, Any]], str],
+) -> List[str]:
+    """Compare results with a previous run.
+
+    Args:
+        results: Results of this run, each with its "seconds" and the fields
+                 label reads
+        baseline_path: JSON file written by a previous run with --json
+        max_regression: Tolerated slowdown, as a ratio of the baseline time
+        label: Function naming a result, matching it with the baseline
+
+    Returns:
+        A description of each result slower than tolerated
+    """
+    baseline = {
+        label(entry): entry["seconds"]
+        for entry in json.loads(baseline_path.read_text())
+    }
+    regressions = []
+    for result in results:
+        name, seconds = label(result), result["seconds"]
+        previous = baseline.get(name)
+        if previous and seconds > previous * (1 + max_regression):
+            regressions.append(f"{name}: {seconds:.3f}s, was {previous:.3f}s")
+    return regressions
@@ -0,0 +1,197 @@
+"""Measure the throughput of Ambrogio's hot paths without a real LLM provider.
+
+Every benchmark runs on a fresh copy of a synthetic repository, with
+LLMManager backed by FakeLLMBackend, and reports the best wall-clock time
+of its repeats. Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --sizes 10 1000 --json results.json
+    python -m benchmarks.run_benchmarks --baseline results.json
+
+With a baseline, the run fails if a benchmark got slower than allowed.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ambrogio.ambr_coverage.ambr_pipeline import run_pipelines
+from ambrogio.ambr_docstring import AmbrogioDocstring
+from ambrogio.llm_manager import LLMManager
+from ambrogio.repo_manager import FileGetter, RepoPathManager
+
+from benchmarks.fake_llm import FakeLLMBackend
+from benchmarks.regressions import DEFAULT_MAX_REGRESSION, find_regressions
+from benchmarks.synthetic_repo import create_synthetic_repo
+
+# Default numbers of source files of the synthetic repositories
+DEFAULT_SIZES = [10, 1000, 10000]
+
+
+@dataclass
+class BenchmarkResult:
+    """Best time of a benchmark on a repository size."""
+
+    name: str
+    files: int
+    seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        """Throughput of the benchmark."""
+        return self.files / self.seconds if self.seconds else float("inf")
+
+
+def bench_file_getter(repo_path: Path, args: argparse.Namespace) -> None:
+    """Compute the docstring coverage of every file."""
+    FileGetter().get_files_and_coverage()
+
+
+def bench_repo_structure(repo_path: Path, args: argparse.Namespace) -> None:
+    """Summarize the exports and imports of every file."""
+    RepoPathManager.get_instance().get_repo_structure()
+
+
+def warm_repo_structure(repo_path: Path, args: argparse.Namespace) -> None:
+    """Build the persisted repository index, then forget the in-memory one."""
+    RepoPathManager.get_index()
+    RepoPathManager._index = None
+
+
+def bench_docstring(repo_path: Path, args: argparse.Namespace) -> None:
+    """Document the files missing docstrings, within the API call budget."""
+    AmbrogioDocstring(
+        max_api_calls=args.max_api_calls, concurrency=args.concurrency
+    ).run()
+
+
+def bench_pipeline(repo_path: Path, args: argparse.Namespace) -> None:
+    """Measure coverage, then generate and run a test for the least covered file.
+
+    run_pipeline would pick a random file, fully covered ones included, so
+    the ranked entry point keeps the measured work the same across runs.
+    """
+    run_pipelines(max_iterations=1, max_files=1, repo_path=repo_path)
+
+
+BENCHMARKS: Dict[str, Callable[[Path, argparse.Namespace], None]] = {
+    "file_getter": bench_file_getter,
+    "repo_structure": bench_repo_structure,
+    "repo_structure_warm": bench_repo_structure,
+    "docstring": bench_docstring,
+    "pipeline": bench_pipeline,
+}
+
+# Untimed preparation of a benchmark, run on its copy of the repository
+SETUPS: Dict[str, Callable[[Path, argparse.Namespace], None]] = {
+    "repo_structure_warm": warm_repo_structure,
+}
+
+
+def run_benchmark(
+    name: str, template: Path, files: int, args: argparse.Namespace
+) -> BenchmarkResult:
+    """Time a benchmark on fresh copies of a synthetic repository.
+
+    Args:
+        name: Name of the benchmark in BENCHMARKS
+        template: Synthetic repository, left untouched
+        files: Number of source files of the repository
+        args: Command line arguments
+
+    Returns:
+        The best time of the repeats
+    """
+    timings = []
+    for _ in range(args.repeat):
+        repo_path = template.with_name(f"{template.name}-{name}")
+        shutil.rmtree(repo_path, ignore_errors=True)
+        shutil.copytree(template, repo_path)
+        try:
+            RepoPathManager.initialize(str(repo_path))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                if name in SETUPS:
+                    SETUPS[name](repo_path, args)
+                started = time.perf_counter()
+                BENCHMARKS[name](repo_path, args)
+            timings.append(time.perf_counter() - started)
+        finally:
+            shutil.rmtree(repo_path, ignore_errors=True)
+    return BenchmarkResult(name, files, min(timings))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks and print their results.
+
+    Returns:
+        1 if a benchmark regressed against the baseline, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Ambrogio benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per fake LLM call"
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a fake LLM call failing",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of failures")
+    parser.add_argument("--max-api-calls", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="Results of a previous run")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    backend = FakeLLMBackend(args.latency, args.failure_rate, args.seed)
+    LLMManager.initialize(api_key="fake", backend=backend)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ambrogio-bench-") as work_dir:
+        for size in args.sizes:
+            started = time.perf_counter()
+            template = create_synthetic_repo(Path(work_dir) / f"repo-{size}", size)
+            print(
+                f"Created a repository of {size} files in "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+            for name in args.benchmarks:
+                result = run_benchmark(name, template, size, args)
+                results.append(result)
+                print(
+                    f"  {name:<15} {result.seconds:>9.3f}s "
+                    f"{result.files_per_second:>12.1f} files/s"
+                )
+    print(f"Fake LLM backend: {backend.calls} calls, {backend.failures} failures")
+
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2))
+    if args.baseline:
+        regressions = find_regressions(
+            [asdict(r) for r in results],
+            args.baseline,
+            args.max_regression,
+            label=lambda entry: f"{entry['name']} on {entry['files']} files",
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Synthetic Python repositories for Ambrogio benchmarks."""
+
+from pathlib import Path
+
+# Number of modules per package of a synthetic repository
+FILES_PER_PACKAGE = 100
+
+# Number of modules with a test file, so that the test suite stays small
+TESTED_FILES = 10
+
+MODULE_TEMPLATE = """import math
+from typing import List
+
+
+def scale_{index}(values: List[float], factor: float) -> List[float]:
+    if factor == 0:
+        return [0.0 for _ in values]
+    return [value * factor for value in values]
+
+
+def norm_{index}(values: List[float]) -> float:
+    total = 0.0
+    for value in values:
+        total += value * value
+    return math.sqrt(total)
+
+
+class Accumulator{index}:
+    def __init__(self, start: float = 0.0):
+        self.total = start
+
+    def add(self, value: float) -> float:
+        if value < 0:
+            raise ValueError("Only positive values are accepted")
+        self.total += value
+        return self.total
+"""
+
+TEST_TEMPLATE = """from {module} import scale_{index}
+
+
+def test_scale_{index}():
+    assert scale_{index}([1.0, 2.0], 2.0) == [2.0, 4.0]
+"""
+
+
+def module_name(index: int) -> str:
+    """Get the dotted name of the index-th module of a synthetic repository."""
+    return f"pkg_{index // FILES_PER_PACKAGE:03d}.module_{index:05d}"
+
+
+def create_synthetic_repo(root: Path, file_count: int) -> Path:
+    """Write a repository of similar modules missing docstrings and tests.
+
+    Modules are spread over packages of FILES_PER_PACKAGE files. Only the
+    first TESTED_FILES modules get a test, which covers part of them.
+
+    Args:
+        root: Directory to create the repository in
+        file_count: Number of source modules
+
+    Returns:
+        The repository root
+    """
+    root = Path(root)
+    (root / "tests").mkdir(parents=True, exist_ok=True)
+    (root / "pyproject.toml").write_text('[project]\nname = "synthetic"\n')
+    for index in range(file_count):
+        package, module = module_name(index).split(".")
+        package_dir = root / package
+        if not package_dir.is_dir():
+            package_dir.mkdir()
+            (package_dir / "__init__.py").write_text("")
+        (package_dir / f"{module}.py").write_text(MODULE_TEMPLATE.format(index=index))
+        if index < TESTED_FILES:
+            (root / "tests" / f"test_{module}.py").write_text(
+                TEST_TEMPLATE.format(module=module_name(index), index=index)
+            )
+    return root
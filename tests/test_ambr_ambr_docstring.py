@@ -1,7 +1,17 @@
+import ast
+import json
+import sys
+
 import libcst as cst
 import pytest
 
-from ambrogio.ambr_docstring.ambr_docstring import DocstringTransformer
+from ambrogio.ambr_docstring.ambr_docstring import (
+    AmbrogioDocstring,
+    DocstringTransformer,
+)
+from ambrogio.llm_manager import LLMManager
+from ambrogio.repo_manager import RepoPathManager
+from ambrogio.repo_manager.file_getter import CoverageResult
 
 
 @pytest.fixture
@@ -37,6 +47,145 @@ def test_leave_ClassDef_adds_docstring(transformer):
     updated_node = cst.ClassDef(
         name=cst.Name(value="MyClass"), body=cst.IndentedBlock(body=[])
     )
+    transformer.visit_ClassDef(original_node)
     modified_node = transformer.leave_ClassDef(original_node, updated_node)
     assert isinstance(modified_node, cst.ClassDef)
     assert modified_node.body.body[0].body[0].value.value == '"""This is MyClass."""'
+
+
+def test_run_concurrently_honours_max_api_calls(tmp_path, mocker):
+    """Test that concurrent generation never exceeds the API call budget.
+
+    The file contains three undocumented functions while only two API calls
+    are allowed, so exactly two docstrings must be written even though the
+    concurrency allows all requests to be in flight at once.
+
+    Args:
+        tmp_path: Temporary directory used as repository root.
+        mocker: The pytest-mock fixture used to stub the LLM and interrogate."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text(
+        "def first():\n    pass\n\n\ndef second():\n    pass\n\n\ndef third():\n    pass\n"
+    )
+    RepoPathManager.initialize(str(tmp_path))
+    llm_manager = mocker.Mock()
+    llm_manager.aget_completion = mocker.AsyncMock(
+        return_value='"""Generated docstring."""'
+    )
+    mocker.patch.object(LLMManager, "get_instance", return_value=llm_manager)
+
+    ambrogio = AmbrogioDocstring(max_api_calls=2, concurrency=4)
+    ambrogio.file_getter = mocker.Mock()
+    ambrogio.file_getter.get_files_and_coverage.return_value = ({"module.py": 0.0}, 0.0)
+    ambrogio.file_getter.get_coverage_stats.return_value = CoverageResult(50.0, 1)
+
+    assert ambrogio.run() == ["module.py"]
+    assert llm_manager.aget_completion.await_count == 2
+    assert ambrogio.api_calls_made == 2
+    assert source_file.read_text().count('"""Generated docstring."""') == 2
+
+
+def test_run_with_workers_stops_collecting_at_the_budget(tmp_path, mocker, capsys):
+    """Test that files parsed and rendered in worker processes honour the budget.
+
+    Three files hold two undocumented functions each while three API calls
+    are allowed: the first file is fully documented, the second partially,
+    and the third is never reached.
+
+    Args:
+        tmp_path: Temporary directory used as repository root.
+        mocker: The pytest-mock fixture used to stub the LLM and interrogate.
+        capsys: The pytest fixture capturing the printed budget message."""
+    names = ["a.py", "b.py", "c.py"]
+    for name in names:
+        (tmp_path / name).write_text(
+            "def first():\n    pass\n\n\ndef second():\n    pass\n"
+        )
+    RepoPathManager.initialize(str(tmp_path))
+    llm_manager = mocker.Mock()
+    llm_manager.aget_completion = mocker.AsyncMock(
+        return_value='"""Generated docstring."""'
+    )
+    mocker.patch.object(LLMManager, "get_instance", return_value=llm_manager)
+
+    ambrogio = AmbrogioDocstring(max_api_calls=3, workers=2)
+    ambrogio.file_getter = mocker.Mock()
+    ambrogio.file_getter.get_files_and_coverage.return_value = (
+        dict.fromkeys(names, 0.0),
+        0.0,
+    )
+    ambrogio.file_getter.get_coverage_stats.return_value = CoverageResult(50.0, 3)
+
+    assert ambrogio.run() == ["a.py", "b.py"]
+    assert llm_manager.aget_completion.await_count == 3
+    written = [
+        (tmp_path / name).read_text().count('"""Generated docstring."""')
+        for name in names
+    ]
+    assert written == [2, 1, 0]
+    assert "Maximum number of API calls (3) reached" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(
+    sys.version_info >= (3, 12), reason="ast parses PEP 695 from Python 3.12"
+)
+def test_changed_lines_keep_nodes_without_known_span(tmp_path):
+    """Test that nodes of a source the ast parser rejects are kept as touched."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text(
+        "def first[T](x: T):\n    return x\n\n\ndef second():\n    pass\n"
+    )
+    _, nodes = AmbrogioDocstring._collect_file_nodes(source_file, {5})
+    assert sorted(nodes) == ["first", "second"]
+
+
+def test_parse_docstring_batch_handles_wrapped_json():
+    """Test that batched responses are parsed despite markdown and stray entries.
+
+    Raises:
+        AssertionError: If the expected docstrings are not extracted."""
+    response = """Here are the docstrings:
+```json
+{"first": "Do the first thing.", "second": "", "unknown": "Ignored."}
+```"""
+    docstrings = AmbrogioDocstring._parse_docstring_batch(response, ["first", "second"])
+    assert docstrings == {"first": '"""Do the first thing."""'}
+
+
+def test_batched_docstrings_keep_quotes_and_backslashes():
+    """Test that quotes and backslashes of batched docstrings survive as written."""
+    texts = {
+        "quoted": 'Return the value of "name"',
+        "pattern": "Match digits with \\d+, escaped like \\",
+    }
+    docstrings = AmbrogioDocstring._parse_docstring_batch(
+        json.dumps(texts), list(texts)
+    )
+    source = "def quoted():\n    pass\n\n\ndef pattern():\n    pass\n"
+    code = cst.parse_module(source).visit(DocstringTransformer(docstrings)).code
+
+    tree = ast.parse(code)
+    assert {node.name: ast.get_docstring(node) for node in tree.body} == texts
+
+
+def test_transformer_indents_docstrings_like_the_body():
+    """Test that continuation lines follow the real indentation of the body."""
+    docstring = '"""Summary.\n\nDetails."""'
+    source = "if True:\n    def nested():\n        pass\n\n\nclass Two:\n  def run(self):\n    pass\n"
+    transformer = DocstringTransformer({"nested": docstring, "Two.run": docstring})
+    code = cst.parse_module(source).visit(transformer).code
+
+    assert '        """Summary.\n\n        Details."""\n        pass' in code
+    assert '    """Summary.\n\n    Details."""\n    pass' in code
+
+
+def test_transformer_matches_qualified_names():
+    """Test that same-named methods of different classes get their own docstrings."""
+    source = (
+        "class First:\n    def run(self):\n        pass\n\n\n"
+        "class Second:\n    def run(self):\n        pass\n"
+    )
+    transformer = DocstringTransformer({"Second.run": '"""Run the second."""'})
+    code = cst.parse_module(source).visit(transformer).code
+    assert code.count('"""Run the second."""') == 1
+    assert code.index('"""Run the second."""') > code.index("class Second")
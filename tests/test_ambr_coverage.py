@@ -0,0 +1,82 @@
+from ambrogio.ambr_coverage.ambr_coverage import CoverageAnalyzer
+from ambrogio.repo_manager import RepoPathManager
+
+
+def test_analyze_coverage_reuses_data_of_unchanged_files(tmp_path, mocker):
+    """Test that the suite only re-runs once a file it depends on changes."""
+    (tmp_path / "module.py").write_text("def double(x):\n    return x * 2\n")
+    (tmp_path / "test_module.py").write_text(
+        "from module import double\n\ndef test_double():\n    assert double(2) == 4\n"
+    )
+    RepoPathManager.initialize(str(tmp_path))
+
+    analyzer = CoverageAnalyzer()
+    run = mocker.spy(analyzer.test_executor, "run")
+    coverage = analyzer.analyze_coverage()
+    assert coverage[str(tmp_path / "module.py")] == 100.0
+    assert not analyzer.reused_baseline
+
+    assert analyzer.analyze_coverage() == coverage
+    assert analyzer.reused_baseline
+    assert run.call_count == 1
+
+    (tmp_path / "module.py").write_text(
+        "def double(x):\n    return x + x  # same result\n"
+    )
+    analyzer.analyze_coverage()
+    assert not analyzer.reused_baseline
+    assert run.call_count == 2
+
+
+def test_uncovered_lines_are_memoized_until_the_data_changes(tmp_path, mocker):
+    """Test that source files are only re-analyzed once the coverage data changes."""
+    (tmp_path / "module.py").write_text("def double(x):\n    return x * 2\n")
+    (tmp_path / "test_module.py").write_text(
+        "import module\n\ndef test_import():\n    pass\n"
+    )
+    RepoPathManager.initialize(str(tmp_path))
+
+    analyzer = CoverageAnalyzer()
+    analyzer.analyze_coverage()
+    analysis2 = mocker.spy(analyzer.coverage, "analysis2")
+    module = tmp_path / "module.py"
+    assert analyzer.get_uncovered_lines(module) == [2]
+    assert analyzer.get_uncovered_lines(module) == [2]
+    assert analysis2.call_count == 0
+
+    (tmp_path / "test_double.py").write_text(
+        "from module import double\n\ndef test_double():\n    assert double(2) == 4\n"
+    )
+    data_file = tmp_path / "run.coverage"
+    assert analyzer.test_executor.run(
+        [str(tmp_path / "test_double.py")], coverage_data_file=data_file
+    ).passed
+    analyzer.merge_coverage(data_file)
+    assert analyzer.get_uncovered_lines(module) == []
+    assert analysis2.call_count == 1
+
+
+def test_changed_sources_only_rerun_the_tests_executing_them(tmp_path, mocker):
+    """Test that editing a source file re-runs only the tests that execute it."""
+    (tmp_path / "first.py").write_text("def one():\n    return 1\n")
+    (tmp_path / "second.py").write_text("def two():\n    return 2\n")
+    (tmp_path / "test_first.py").write_text(
+        "from first import one\n\ndef test_one():\n    assert one() == 1\n"
+    )
+    (tmp_path / "test_second.py").write_text(
+        "from second import two\n\ndef test_two():\n    assert two() == 2\n"
+    )
+    RepoPathManager.initialize(str(tmp_path))
+
+    analyzer = CoverageAnalyzer()
+    analyzer.analyze_coverage()
+    run = mocker.spy(analyzer.test_executor, "run")
+    (tmp_path / "first.py").write_text(
+        "def one(flag=True):\n    if flag:\n        return 1\n"
+    )
+    coverage = analyzer.analyze_coverage()
+
+    assert analyzer.refreshed_files == ["first.py"]
+    assert run.call_args.args[0] == ["test_first.py::test_one"]
+    assert coverage[str(tmp_path / "first.py")] == 100.0
+    assert coverage[str(tmp_path / "second.py")] == 100.0
@@ -0,0 +1,80 @@
+import pytest
+
+from ambrogio.ambr_coverage.ambr_coverage import CoverageAnalyzer
+from ambrogio.repo_manager import FileDiscovery, FileGetter, RepoPathManager
+from ambrogio.repo_manager.file_discovery import iter_python_files
+
+
+def test_discovery_honours_gitignore_and_prunes_environments(tmp_path):
+    """Test that ignored files and directories and virtual environments are skipped."""
+    (tmp_path / ".gitignore").write_text(
+        "# generated code\n*_pb2.py\n!keep_pb2.py\nbuild/\n/top.py\n"
+    )
+    for rel_path in [
+        "main.py",
+        "top.py",
+        "api_pb2.py",
+        "keep_pb2.py",
+        "build/out.py",
+        "pkg/top.py",
+        "pkg/build.py",
+        "pkg/local.py",
+        "pkg/nested/tmp_cache.py",
+        "myenv/lib/site.py",
+        "node_modules/tool.py",
+        ".hidden/secret.py",
+    ]:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text("")
+    (tmp_path / "myenv" / "pyvenv.cfg").write_text("")
+    (tmp_path / "pkg" / ".gitignore").write_text("local.py\nnested/tmp_*\n")
+
+    assert sorted(path for path, _ in iter_python_files(str(tmp_path))) == [
+        "keep_pb2.py",
+        "main.py",
+        "pkg/build.py",
+        "pkg/top.py",
+    ]
+
+
+def test_initialize_rejects_directory_with_only_ignored_python_files(
+    tmp_path, monkeypatch
+):
+    """Test that initialize accepts a plain project but not an ignored one."""
+    monkeypatch.setattr(RepoPathManager, "_repo_path", None)
+    (tmp_path / "venv").mkdir()
+    (tmp_path / "venv" / "module.py").write_text("")
+    (tmp_path / ".gitignore").write_text("*.py\n")
+    (tmp_path / "script.py").write_text("")
+
+    with pytest.raises(ValueError):
+        RepoPathManager.initialize(str(tmp_path))
+
+    (tmp_path / ".gitignore").write_text("")
+    RepoPathManager.initialize(str(tmp_path))
+    assert RepoPathManager.path() == tmp_path.resolve()
+
+
+def test_discovery_walks_once_for_every_consumer(tmp_path, mocker):
+    """Test that docstrings, the index and coverage share one walk of the tree."""
+    (tmp_path / "module.py").write_text("def double(x):\n    return x * 2\n")
+    (tmp_path / "generated").mkdir()
+    (tmp_path / "generated" / "schema.py").write_text("def load():\n    pass\n")
+    RepoPathManager.initialize(str(tmp_path), exclude=["generated/"])
+    scan = mocker.spy(FileDiscovery, "_scan")
+
+    files, _ = FileGetter().get_files_and_coverage()
+    structure = RepoPathManager.get_instance().get_repo_structure()
+    stamps = CoverageAnalyzer()._get_file_stamps()
+
+    assert scan.call_count == 1
+    assert list(files) == ["module.py"]
+    assert "module.py" in structure and "schema.py" not in structure
+    assert list(stamps) == ["module.py"]
+
+    discovery = RepoPathManager.get_discovery()
+    (tmp_path / "test_module.py").write_text("def test_double():\n    pass\n")
+    discovery.update([tmp_path / "test_module.py"])
+    (tmp_path / "module.py").unlink()
+    assert discovery.refresh() == {"module.py"}
+    assert list(discovery.get_files()) == ["test_module.py"]
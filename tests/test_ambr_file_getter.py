@@ -0,0 +1,41 @@
+import pytest
+from interrogate.coverage import InterrogateCoverage
+
+from ambrogio.repo_manager import FileGetter, RepoPathManager
+
+
+def test_coverage_report_only_reparses_modified_files(tmp_path, mocker):
+    """Test that repeated reports reuse cached results of unchanged files.
+
+    Args:
+        tmp_path: Temporary directory used as repository root.
+        mocker: The pytest-mock fixture used to count interrogate parses.
+
+    Raises:
+        AssertionError: If unchanged files are parsed again."""
+    (tmp_path / "documented.py").write_text('def a():\n    """Doc."""\n')
+    (tmp_path / "undocumented.py").write_text("def b():\n    pass\n")
+    RepoPathManager.initialize(str(tmp_path))
+    file_getter = FileGetter()
+
+    files, coverage = file_getter.get_files_and_coverage()
+    assert files == {"undocumented.py": 0.0}
+    assert coverage == 50.0
+
+    parse = mocker.spy(InterrogateCoverage, "_get_file_coverage")
+    (tmp_path / "undocumented.py").write_text('def b():\n    """Doc."""\n')
+    file_getter.invalidate("undocumented.py")
+
+    stats = file_getter.get_coverage_stats()
+    assert stats.coverage_percentage == 100.0
+    assert parse.call_count == 1
+
+
+def test_interrogate_exit_becomes_value_error(tmp_path):
+    """Test that a non-Python path raises instead of exiting the process."""
+    (tmp_path / "module.py").write_text("def a():\n    pass\n")
+    (tmp_path / "notes.txt").write_text("not python\n")
+    RepoPathManager.initialize(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        FileGetter().get_coverage_stats(["notes.txt"])
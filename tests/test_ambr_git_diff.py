@@ -0,0 +1,71 @@
+import subprocess
+
+from ambrogio.repo_manager.git_diff import GitDiff
+
+
+def test_get_changed_lines_reports_modified_and_untracked_files(tmp_path):
+    """Test that tracked changes map to their lines and untracked files to None.
+
+    Args:
+        tmp_path: Temporary directory turned into a git repository.
+
+    Raises:
+        AssertionError: If the changed files or lines are not reported."""
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init")
+    (tmp_path / "module.py").write_text("a = 1\nb = 2\nc = 3\n")
+    (tmp_path / "unchanged.py").write_text("x = 1\n")
+    git("add", ".")
+    git(
+        "-c",
+        "user.name=test",
+        "-c",
+        "user.email=test@example.com",
+        "commit",
+        "-m",
+        "init",
+    )
+
+    (tmp_path / "module.py").write_text("a = 1\nb = 20\nc = 3\nd = 4\n")
+    (tmp_path / "new.py").write_text("y = 1\n")
+
+    assert GitDiff(tmp_path).get_changed_lines() == {
+        "module.py": {2, 4},
+        "new.py": None,
+    }
+
+
+def test_get_changed_lines_ignores_prefix_config_and_quoting(tmp_path):
+    """Test that diff.noprefix and quoted file names do not hide changes."""
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init")
+    git("config", "diff.noprefix", "true")
+    names = ["café.py", 'we"ird.py']
+    for name in names:
+        (tmp_path / name).write_text("a = 1\n")
+    git("add", ".")
+    git(
+        "-c",
+        "user.name=test",
+        "-c",
+        "user.email=test@example.com",
+        "commit",
+        "-m",
+        "init",
+    )
+
+    for name in names:
+        (tmp_path / name).write_text("a = 2\n")
+    (tmp_path / "new\tfile.py").write_text("y = 1\n")
+
+    assert GitDiff(tmp_path).get_changed_lines() == {
+        "café.py": {1},
+        'we"ird.py': {1},
+        "new\tfile.py": None,
+    }
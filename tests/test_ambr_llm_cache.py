@@ -0,0 +1,41 @@
+import pytest
+
+from ambrogio.llm_cache import CompletionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture that provides a CompletionCache holding at most two entries.
+
+    Args:
+        tmp_path: Temporary directory where the cache database is created.
+
+    Returns:
+        CompletionCache: An empty cache stored under tmp_path."""
+    return CompletionCache(tmp_path / "cache" / "completions.sqlite", max_entries=2)
+
+
+def test_completion_cache_hits_misses_and_eviction(cache):
+    """Test that the cache counts lookups and drops the least recently used entry.
+
+    Args:
+        cache: An empty CompletionCache limited to two entries.
+
+    Raises:
+        AssertionError: If lookups or eviction do not behave as expected."""
+    messages = [{"role": "user", "content": "Hello"}]
+    key = CompletionCache.make_key("gpt-4o-mini", messages, 0.7, None, None)
+    other_key = CompletionCache.make_key("gpt-4o-mini", messages, 0.2, None, None)
+    assert key != other_key
+
+    assert cache.get(key) is None
+    cache.set(key, "Hi")
+    cache.set(other_key, "Hey")
+    assert cache.get(key) == "Hi"
+
+    cache.set("third", "Hello")
+    assert cache.get(other_key) is None
+    assert cache.get(key) == "Hi"
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
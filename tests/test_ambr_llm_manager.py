@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from litellm import RateLimitError
+
+from ambrogio.llm_manager import LLMManager
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_manager(monkeypatch):
+    """Fixture that gives each test its own LLMManager singleton.
+
+    The process-wide instance is restored afterwards, so later tests do not
+    inherit a mocked backend or a cache stored in a deleted tmp_path.
+
+    Args:
+        monkeypatch: The pytest fixture used to swap the singleton."""
+    monkeypatch.setattr(LLMManager, "_instance", None)
+
+
+def test_aget_completion_reuses_cached_completion(tmp_path, mocker):
+    """Test that aget_completion calls the provider once and then hits the cache.
+
+    Args:
+        tmp_path: Temporary directory where the completion cache is created.
+        mocker: The pytest-mock fixture used to stub litellm.acompletion.
+
+    Raises:
+        AssertionError: If the second call reaches the provider."""
+    response = mocker.MagicMock()
+    response.choices[0].message.content = "Hello!"
+    acompletion = mocker.patch(
+        "ambrogio.llm_manager.acompletion", mocker.AsyncMock(return_value=response)
+    )
+    manager = LLMManager()
+    manager._init("key", cache_path=tmp_path / "completions.sqlite")
+    messages = [{"role": "user", "content": "Hi"}]
+
+    assert asyncio.run(manager.aget_completion(messages)) == "Hello!"
+    assert asyncio.run(manager.aget_completion(messages)) == "Hello!"
+    assert acompletion.await_count == 1
+
+
+def test_get_completion_retries_rate_limit_errors(mocker):
+    """Test that a throttled call is retried after the delay asked by the provider.
+
+    Args:
+        mocker: The pytest-mock fixture used to stub litellm.completion and sleep.
+
+    Raises:
+        AssertionError: If the call is not retried or the delay is ignored."""
+    response = mocker.MagicMock()
+    response.choices[0].message.content = "Hello!"
+    throttled = RateLimitError(
+        "Too many requests", "openai", "gpt-4o-mini", headers={"retry-after": "7"}
+    )
+    completion = mocker.patch(
+        "ambrogio.llm_manager.completion", side_effect=[throttled, response]
+    )
+    sleep = mocker.patch("ambrogio.llm_manager.time.sleep")
+    manager = LLMManager()
+    manager._init("key", model="retry-test-model")
+
+    assert manager.get_completion([{"role": "user", "content": "Hi"}]) == "Hello!"
+    assert completion.call_count == 2
+    assert 7 <= sleep.call_args_list[0].args[0] < 8
+
+
+def test_stream_completion_stops_once_the_condition_is_met(tmp_path):
+    """Test that a stream is cut short by its stop condition and then cached."""
+    manager = LLMManager()
+    manager._init("key", cache_path=tmp_path / "completions.sqlite")
+    messages = [{"role": "user", "content": "Hi"}]
+
+    def has_greeting(text):
+        return "Hello" in text
+
+    chunks = list(
+        manager.stream_completion(
+            messages,
+            stop_condition=has_greeting,
+            mock_response="Hello there, this sentence is never read",
+        )
+    )
+    text = "".join(chunks)
+
+    assert len(chunks) > 1
+    assert text.startswith("Hello")
+    assert not text.endswith("read")
+    assert (
+        manager.get_completion(
+            messages,
+            stop_condition=has_greeting,
+            mock_response="Hello there, this sentence is never read",
+        )
+        == text
+    )
+
+
+def test_backend_replaces_litellm(mocker):
+    """Test that a configured backend serves completions instead of litellm."""
+    litellm_completion = mocker.patch("ambrogio.llm_manager.completion")
+    backend = mocker.MagicMock()
+    backend.completion.return_value.choices[0].message.content = "Hello!"
+    manager = LLMManager()
+    manager._init("key", backend=backend)
+
+    assert manager.get_completion([{"role": "user", "content": "Hi"}]) == "Hello!"
+    assert backend.completion.call_count == 1
+    assert not litellm_completion.called
+
+
+def test_stream_cache_key_skips_unnamed_stop_conditions(tmp_path):
+    """Test that lambdas and closures bypass the cache instead of sharing a key."""
+    manager = LLMManager()
+    manager._init("key", cache_path=tmp_path / "completions.sqlite")
+    messages = [{"role": "user", "content": "Hi"}]
+
+    def get_key(stop_condition):
+        return manager._get_stream_cache_key(
+            messages, 0.7, None, True, stop_condition, {}
+        )
+
+    def make_condition(word):
+        return lambda text: word in text
+
+    def has_word(text):
+        return "word" in text
+
+    assert get_key(make_condition("Hello")) is None
+    assert get_key(lambda text: True) is None
+    assert get_key(has_word) is not None
+    hello, bye = make_condition("Hello"), make_condition("Bye")
+    hello.cache_key, bye.cache_key = "contains:Hello", "contains:Bye"
+    assert get_key(hello) not in (None, get_key(bye))
@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+
+def test_cli_entry_point_does_not_import_mode_dependencies():
+    """Test that importing the CLI loads neither the LLM nor either mode's stack."""
+    code = (
+        "import sys, ambrogio.__main__\n"
+        "heavy = {'litellm', 'libcst', 'interrogate', 'langgraph', 'pytest', 'coverage'}\n"
+        "print(sorted(heavy & set(sys.modules)))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert completed.stdout.strip() == "[]"
@@ -18,7 +18,36 @@ def test_visit_class_def(node_collector, mocker):
 
     node_collector.visit_ClassDef(mock_class_def)
     assert "TestClass" not in node_collector.nodes_needing_docstrings
+    node_collector.leave_ClassDef(mock_class_def)
 
     mock_class_def.body.body[0].body[0].value = None
     node_collector.visit_ClassDef(mock_class_def)
     assert "TestClass" in node_collector.nodes_needing_docstrings
+
+
+def test_node_code_is_sliced_from_source():
+    source = "class Outer:\n    @property\n    def value(self):\n        return 1\n"
+    collector = NodeNeedingDocstring(source)
+    cst.parse_module(source).visit(collector)
+
+    assert collector.nodes_needing_docstrings["Outer.value"] == (
+        "@property\ndef value(self):\n    return 1"
+    )
+    assert collector.nodes_needing_docstrings["Outer"] == source.strip()
+    assert collector.node_lines == {"Outer": (1, 4), "Outer.value": (2, 4)}
+
+
+def test_same_named_methods_get_distinct_keys():
+    source = (
+        "class First:\n    def run(self):\n        pass\n\n\n"
+        "class Second:\n    def run(self):\n        pass\n"
+    )
+    collector = NodeNeedingDocstring(source)
+    cst.parse_module(source).visit(collector)
+
+    assert set(collector.nodes_needing_docstrings) == {
+        "First",
+        "First.run",
+        "Second",
+        "Second.run",
+    }
@@ -0,0 +1,97 @@
+from ambrogio.ambr_coverage.prompt_builder import PromptBuilder
+
+SOURCE = '''import os
+from pathlib import Path
+
+
+def helper(value: int) -> int:
+    """Double a value."""
+    return value * 2
+
+
+def unrelated():
+    return os.getcwd()
+
+
+class Runner:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def run(self):
+        if self.path.exists():
+            return helper(1)
+        return helper(2)
+'''
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_source_context_keeps_only_what_the_target_needs():
+    builder = PromptBuilder(count_tokens=count_words, token_budget=1000)
+    context = builder.build_source_context(SOURCE, 19, 21)
+
+    assert "import os\nfrom pathlib import Path" in context
+    assert (
+        'def helper(value: int) -> int:\n    """Double a value."""\n    ...' in context
+    )
+    assert "    def run(self):\n        if self.path.exists():" in context
+    assert "# lines 14-14\nclass Runner:\n# lines 18-21" in context
+    assert "unrelated" not in context
+    assert "return value * 2" not in context
+
+
+def test_source_context_respects_token_budget():
+    builder = PromptBuilder(count_tokens=count_words, token_budget=22)
+    context = builder.build_source_context(SOURCE, 19, 21)
+
+    assert "def run(self):" in context
+    assert "import os" not in context
+    assert "def helper" not in context
+
+
+def test_truncate_error_keeps_the_end():
+    builder = PromptBuilder(count_tokens=count_words, token_budget=20)
+    error = "\n".join(f"line {i}" for i in range(100))
+
+    assert builder.truncate_error(error) == "[...]\nline 98\nline 99"
+
+
+TEST_MODULE = """import pytest
+
+from pkg.module import Runner
+
+LIMIT = 3
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return Runner(tmp_path)
+
+
+def make_path(tmp_path):
+    return tmp_path / "file"
+
+
+def test_run_returns_two(runner):
+    assert runner.run() == LIMIT
+
+
+def test_run_with_file(tmp_path):
+    make_path(tmp_path).write_text("")
+    assert Runner(tmp_path).run() == 2
+"""
+
+
+def test_test_context_keeps_the_failing_test_and_what_it_uses():
+    builder = PromptBuilder(count_tokens=count_words, token_budget=1000)
+    error = "FAILED tests/test_module.py::test_run_returns_two - assert 4 == 3"
+    context = builder.build_test_context(TEST_MODULE, error)
+
+    assert "import pytest\n# lines 3-3\nfrom pkg.module import Runner" in context
+    assert "LIMIT = 3" in context
+    assert "@pytest.fixture\ndef runner(tmp_path):" in context
+    assert "def test_run_returns_two(runner):" in context
+    assert "test_run_with_file" not in context
+    assert "make_path" not in context
@@ -0,0 +1,61 @@
+import os
+
+from ambrogio.repo_manager import RepoPathManager, repo_index
+from ambrogio.repo_manager.repo_index import RepoIndex
+
+
+def test_index_only_parses_changed_files_and_persists(tmp_path, mocker):
+    """Test that a reloaded index re-parses only the files whose content changed."""
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n")
+    (tmp_path / "b.py").write_text("class Two:\n    pass\n")
+    (tmp_path / ".venv").mkdir()
+    (tmp_path / ".venv" / "ignored.py").write_text("def hidden(): ...\n")
+    RepoIndex(tmp_path, tmp_path / "index.json").update()
+
+    # Touched without a content change, then really changed
+    os.utime(tmp_path / "a.py", ns=(0, 0))
+    (tmp_path / "b.py").write_text(
+        "class Two:\n    def three(self, x: int) -> int:\n        return x\n"
+    )
+    parse_file = mocker.spy(repo_index, "parse_file")
+    index = RepoIndex(tmp_path, tmp_path / "index.json")
+
+    assert index.update()
+    assert [call.args[0] for call in parse_file.call_args_list] == ["b.py"]
+    assert sorted(index.entries) == ["a.py", "b.py"]
+    assert index.entries["b.py"].signatures == [
+        "class Two",
+        "def three(self, x: int) -> int",
+    ]
+    assert not index.update()
+
+
+def test_render_filters_subtree_and_import_neighbourhood(tmp_path):
+    """Test that the summary can be limited to a subtree or to import neighbours."""
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "sub" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "core.py").write_text("def run():\n    pass\n")
+    (tmp_path / "pkg" / "sub" / "uses_core.py").write_text("from ..core import run\n")
+    (tmp_path / "pkg" / "other.py").write_text("import json\n")
+    index = RepoIndex(tmp_path)
+    index.update()
+
+    neighbourhood = index.render(neighbours_of="pkg/core.py")
+    subtree = index.render(subtree="pkg/sub")
+
+    assert "File: pkg/sub/uses_core.py" in neighbourhood
+    assert "    - pkg.core.run" in neighbourhood
+    assert "pkg/other.py" not in neighbourhood
+    assert "File: pkg/sub/__init__.py" in subtree
+    assert "pkg/core.py" not in subtree
+
+
+def test_get_index_sees_files_edited_outside_ambrogio(tmp_path):
+    """Test that the shared index re-parses a listed file changed on disk."""
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n")
+    RepoPathManager.initialize(str(tmp_path))
+    assert "one" in RepoPathManager.get_index().render()
+
+    (tmp_path / "a.py").write_text("def renamed_one():\n    return 1\n")
+    assert "renamed_one" in RepoPathManager.get_index().render()
@@ -0,0 +1,99 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from ambrogio.ambr_docstring import AmbrogioDocstring
+from ambrogio.llm_manager import LLMManager
+from ambrogio.repo_manager import RepoPathManager
+from ambrogio.server import AmbrogioServer, send_request
+
+
+def test_server_answers_requests_until_shutdown(tmp_path, mocker):
+    """Test that one server process documents files across requests and stops."""
+    (tmp_path / "module.py").write_text("def first():\n    pass\n")
+    RepoPathManager.initialize(str(tmp_path))
+    llm_manager = mocker.Mock()
+    llm_manager.aget_completion = mocker.AsyncMock(
+        return_value='"""Generated docstring."""'
+    )
+    mocker.patch.object(LLMManager, "get_instance", return_value=llm_manager)
+
+    socket_path = tmp_path / "ambrogio.sock"
+    server = AmbrogioServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    # The socket file exists from bind, slightly before the server listens
+    while not socket_path.exists():
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    # An editor keeping its connection open must not block other clients
+    idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    idle.connect(str(socket_path))
+    request = {"command": "docstring", "files": ["module.py"]}
+    answer = send_request(socket_path, request, timeout=30)
+    assert answer["ok"], answer
+    assert answer["result"] == {"modified_files": ["module.py"]}
+    assert send_request(socket_path, request, timeout=30)["result"] == {
+        "modified_files": []
+    }
+    assert not send_request(socket_path, {"command": "unknown"})["ok"]
+    (tmp_path / "notes.txt").write_text("not python\n")
+    answer = send_request(socket_path, {"command": "docstring", "files": ["notes.txt"]})
+    assert not answer["ok"] and "Not a Python file" in answer["error"]
+    with pytest.raises(RuntimeError):
+        AmbrogioServer(socket_path).serve_forever()
+    assert send_request(socket_path, {"command": "status"})["result"]["files"] == 1
+
+    assert send_request(socket_path, {"command": "shutdown"}, timeout=30)["ok"]
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert not socket_path.exists()
+    idle.close()
+
+
+def test_cached_trees_are_reparsed_only_once_modified(tmp_path, mocker):
+    """Test that a long-lived docstring fixer keeps the trees of unchanged files."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text("def first():\n    pass\n")
+    RepoPathManager.initialize(str(tmp_path))
+    mocker.patch.object(LLMManager, "get_instance")
+    parse_file = mocker.spy(AmbrogioDocstring, "_parse_file")
+    ambrogio = AmbrogioDocstring(cache_trees=True)
+
+    first_tree, nodes = ambrogio._collect_cached_file_nodes(source_file)
+    assert ambrogio._collect_cached_file_nodes(source_file)[0] is first_tree
+    assert list(nodes) == ["first"]
+    assert parse_file.call_count == 1
+
+    source_file.write_text("def first():\n    pass\n\n\ndef second():\n    pass\n")
+    assert list(ambrogio._collect_cached_file_nodes(source_file)[1]) == [
+        "first",
+        "second",
+    ]
+    assert parse_file.call_count == 2
+
+
+def test_server_replaces_a_stale_socket(tmp_path, mocker):
+    """Test that a socket left behind by a dead server does not block startup."""
+    (tmp_path / "module.py").write_text("def first():\n    pass\n")
+    RepoPathManager.initialize(str(tmp_path))
+    mocker.patch.object(LLMManager, "get_instance")
+    socket_path = tmp_path / "ambrogio.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+
+    server = AmbrogioServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    while True:
+        try:
+            answer = send_request(socket_path, {"command": "shutdown"}, timeout=30)
+            break
+        except OSError:
+            time.sleep(0.01)
+    assert answer["ok"]
+    thread.join(timeout=30)
+    assert not thread.is_alive()
@@ -0,0 +1,41 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from ambrogio.telemetry import Telemetry, attribute_to_file
+
+
+def test_telemetry_writes_jsonl_and_summarizes(tmp_path):
+    """Test that records are attributed per thread and aggregated at exit."""
+    telemetry = Telemetry(tmp_path / "run.jsonl")
+
+    def process(file_path):
+        with attribute_to_file(file_path), telemetry.step("generate_test"):
+            for latency in (1.0, 3.0):
+                telemetry.record(
+                    "llm_call",
+                    latency=latency,
+                    prompt_tokens=10,
+                    completion_tokens=5,
+                    cost=0.5,
+                    retries=1,
+                )
+            telemetry.record("llm_call", latency=0.0, cache_hit=True)
+        telemetry.record("coverage", file=file_path, covered_lines=2)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(process, ["a.py", "b.py"]))
+    summary = telemetry.summarize()
+
+    lines = (tmp_path / "run.jsonl").read_text().splitlines()
+    assert len(lines) == 10
+    assert {json.loads(line)["kind"] for line in lines} == {
+        "llm_call",
+        "step",
+        "coverage",
+    }
+    assert summary.llm_calls.count == 4
+    assert (summary.llm_calls.p50, summary.llm_calls.p95) == (1.0, 3.0)
+    assert (summary.cache_hits, summary.retries) == (2, 4)
+    assert summary.tokens_per_file == {"a.py": 30, "b.py": 30}
+    assert summary.steps["generate_test"].count == 2
+    assert summary.cost_per_covered_line == 0.5
@@ -0,0 +1,48 @@
+from ambrogio.ambr_coverage.test_executor import TestExecutor
+
+
+def test_run_reports_failures_and_sees_fresh_code(tmp_path):
+    """Test that each run re-imports the code under test in a new interpreter."""
+    (tmp_path / "module.py").write_text("VALUE = 1\n")
+    test_file = tmp_path / "test_module.py"
+    test_file.write_text(
+        "from module import VALUE\n\ndef test_value():\n    assert VALUE == 2\n"
+    )
+    executor = TestExecutor(tmp_path)
+
+    result = executor.run([str(test_file)])
+    assert not result.passed
+    assert "assert 1 == 2" in result.errors[0]
+
+    (tmp_path / "module.py").write_text("VALUE = 2\n")
+    assert executor.run([str(test_file)]).passed
+
+
+def test_run_survives_crashing_tests(tmp_path):
+    """Test that a test killing its interpreter only fails its own run."""
+    test_file = tmp_path / "test_crash.py"
+    test_file.write_text("import os\n\ndef test_crash():\n    os._exit(3)\n")
+
+    result = TestExecutor(tmp_path).run([str(test_file)])
+    assert result.exit_code == 3
+    assert "test worker exited with code 3" in result.errors[0]
+
+
+def test_run_kills_tests_that_overrun_the_timeout(tmp_path):
+    """Test that a hanging test is killed and reported instead of stalling."""
+    test_file = tmp_path / "test_hang.py"
+    test_file.write_text("def test_hang():\n    while True:\n        pass\n")
+
+    result = TestExecutor(tmp_path, timeout=3).run([str(test_file)])
+    assert not result.passed
+    assert "timed out after 3 seconds" in result.errors[0]
+
+
+def test_run_caps_memory(tmp_path):
+    """Test that a test allocating too much memory fails instead of thrashing."""
+    test_file = tmp_path / "test_memory.py"
+    test_file.write_text("def test_memory():\n    data = bytearray(4 * 1024**3)\n")
+
+    result = TestExecutor(tmp_path, memory_limit=1024).run([str(test_file)])
+    assert not result.passed
+    assert "MemoryError" in result.errors[0]
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from ambrogio.ambr_coverage.ambr_test_generator import (
+    AmbrogioTestGenerator,
+    extract_code,
+    is_test_module_complete,
+)
+from ambrogio.llm_manager import LLMManager
+from ambrogio.repo_manager import RepoPathManager
+
+
+def test_reserve_test_file_path_is_unique(tmp_path, mocker):
+    """Test that same-named source files get distinct, unused test files."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_ambr_utils.py").write_text("")
+    RepoPathManager.initialize(str(tmp_path))
+    mocker.patch.object(LLMManager, "get_instance", return_value=mocker.Mock())
+
+    generator = AmbrogioTestGenerator()
+    first = generator.reserve_test_file_path(tmp_path / "pkg" / "utils.py")
+    second = generator.reserve_test_file_path(tmp_path / "pkg" / "utils.py")
+    other = generator.reserve_test_file_path(tmp_path / "main.py")
+
+    assert first == tmp_path / "tests" / "test_ambr_pkg_utils.py"
+    assert second == tmp_path / "tests" / "test_ambr_pkg_utils_2.py"
+    assert other == tmp_path / "tests" / "test_ambr_main.py"
+    assert Path(first).parent.is_dir()
+
+
+def test_test_module_is_complete_once_its_code_block_parses():
+    """Test that streaming stops at a closed, parseable code block."""
+    code = "def test_one():\n    assert 1\n"
+    response = f"```python\n{code}```\nThis test checks that"
+
+    assert not is_test_module_complete(f"```python\n{code}")
+    assert not is_test_module_complete("```python\ndef test_one(:\n```")
+    assert is_test_module_complete(response)
+    assert extract_code(response) == code.strip()
+    assert extract_code(code) == code.strip()